@@ -0,0 +1,463 @@
+import argparse
+import configparser
+import datetime
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from database import create_pool, dialect_of
+from main import PAGE_SIZE, KeysetPager
+from models import MOTIVOS_DESPLAZAMIENTO, AlbergueDTO, CiudadDTO, RefugiadoDTO, VoluntarioDTO
+from profiling import percentile
+from repositories import (
+    CityRepository, RefugeeRepository, ReportRepository, ShelterRepository, VolunteerRepository
+)
+
+# Filas por transacción al generar datos
+GENERATE_CHUNK_SIZE = 5000
+
+DEPARTMENTS = {
+    "Antioquia": ["Medellín", "Bello", "Itagüí", "Apartadó", "Turbo", "Rionegro"],
+    "Atlántico": ["Barranquilla", "Soledad", "Malambo"],
+    "Bogotá D.C.": ["Bogotá"],
+    "Bolívar": ["Cartagena", "Magangué", "El Carmen de Bolívar"],
+    "Cauca": ["Popayán", "Santander de Quilichao", "El Tambo"],
+    "Chocó": ["Quibdó", "Riosucio", "Bojayá"],
+    "Córdoba": ["Montería", "Tierralta", "Montelíbano"],
+    "Cesar": ["Valledupar", "Aguachica"],
+    "Meta": ["Villavicencio", "Granada", "Puerto Gaitán"],
+    "Nariño": ["Pasto", "Tumaco", "Ipiales"],
+    "Norte de Santander": ["Cúcuta", "Ocaña", "Tibú"],
+    "Putumayo": ["Mocoa", "Puerto Asís"],
+    "Santander": ["Bucaramanga", "Barrancabermeja", "Floridablanca"],
+    "Valle del Cauca": ["Cali", "Buenaventura", "Palmira", "Tuluá"],
+}
+
+FIRST_NAMES = [
+    "María", "José", "Luis", "Ana", "Carlos", "Luz", "Juan", "Carmen", "Jorge", "Rosa",
+    "Andrés", "Diana", "Pedro", "Gloria", "Miguel", "Sandra", "Julián", "Paola", "Camilo", "Yolanda",
+]
+LAST_NAMES = [
+    "Rodríguez", "Gómez", "González", "Martínez", "García", "López", "Hernández", "Sánchez",
+    "Ramírez", "Pérez", "Díaz", "Muñoz", "Rojas", "Moreno", "Jiménez", "Álvarez", "Romero",
+    "Valencia", "Mosquera", "Palacios",
+]
+PROFESSIONS = [
+    "Médico", "Enfermera", "Psicólogo", "Trabajador social", "Docente", "Abogado",
+    "Nutricionista", "Logística", "Cocinero", "Conductor",
+]
+
+# Tablas que borra --reset, en orden compatible con las llaves foráneas
+RESET_TABLES = [
+    "candidatos_duplicados", "claves_refugiados",
+    "refugiados", "voluntarios", "albergues", "ciudades",
+    "resumen_refugiados_origen", "resumen_voluntarios_profesion",
+]
+
+
+def summarize(seconds):
+    # Microsegundos por operación
+    micros = [value * 1e6 for value in seconds]
+    return {
+        "operaciones": len(micros),
+        "mediana_us": round(statistics.median(micros), 1),
+        "p95_us": round(percentile(micros, 0.95), 1),
+        "media_us": round(statistics.mean(micros), 1),
+    }
+
+
+def timed(timings, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    timings.append(time.perf_counter() - start)
+    return result
+
+
+def any_city_id(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(id_ciudad) FROM ciudades")
+    city_id = cursor.fetchone()[0]
+    cursor.close()
+    if city_id is None:
+        raise RuntimeError("Se necesita al menos una ciudad para el benchmark")
+    return city_id
+
+
+class SyntheticData:
+    # Genera ciudades, albergues, refugiados y voluntarios verosímiles y
+    # reproducibles: la misma semilla produce siempre los mismos datos. Los
+    # refugiados se concentran en pocas ciudades (pesos 1/rango), como ocurre
+    # con las ciudades receptoras reales.
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+
+    def cities(self, count):
+        base = [(department, city) for department, cities in DEPARTMENTS.items() for city in cities]
+        for i in range(count):
+            department, city = base[i % len(base)]
+            if i >= len(base):
+                city = f"{city} {i // len(base) + 1}"
+            yield CiudadDTO(
+                departamento=department,
+                ciudad=city,
+                localidad=f"Localidad {self.rng.randint(1, 20)}",
+                cantidad_de_habitantes=self.rng.randint(5_000, 8_000_000)
+            )
+
+    def shelters(self, city_ids, per_city=3):
+        for city_id in city_ids:
+            for i in range(self.rng.randint(0, per_city * 2)):
+                yield AlbergueDTO(
+                    nombre=f"Albergue {self.rng.choice(LAST_NAMES)} {city_id}-{i + 1}",
+                    id_ciudad=city_id,
+                    direccion_del_albergue=f"Calle {self.rng.randint(1, 200)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}",
+                    personas_albergadas=0,
+                    ciudad_de_procedencia="",
+                    capacidad=self.rng.randint(50, 1500)
+                )
+
+    def person_name(self):
+        return (f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} "
+                f"{self.rng.choice(LAST_NAMES)}")
+
+    def identification(self, i, offset):
+        # Única y con aspecto de cédula: el multiplicador es primo y no divide a 9e9
+        return str(1_000_000_000 + ((i + offset) * 104_729) % 9_000_000_000)
+
+    def refugees(self, count, city_ids, shelters_by_city):
+        cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(city_ids) + 1)))
+        for i in range(count):
+            name = self.person_name()
+            refuge_city = self.rng.choices(city_ids, cum_weights=cum_weights)[0]
+            shelters = shelters_by_city.get(refuge_city)
+            yield RefugiadoDTO(
+                nombre=name,
+                identificacion=self.identification(i, 0),
+                numero_de_contacto=f"3{self.rng.randint(0, 999_999_999):09d}",
+                email=f"{name.split()[0].lower()}{i}@correo.com" if self.rng.random() < 0.7 else None,
+                id_ciudad_despiazamiento=self.rng.choice(city_ids),
+                motivo_despiazamiento=self.rng.choice(MOTIVOS_DESPLAZAMIENTO),
+                id_ciudad_refugio=refuge_city,
+                id_albergue=self.rng.choice(shelters) if shelters and self.rng.random() < 0.7 else None
+            )
+
+    def volunteers(self, count, city_ids, shelters_by_city):
+        for i in range(count):
+            city_id = self.rng.choice(city_ids)
+            shelters = shelters_by_city.get(city_id)
+            yield VoluntarioDTO(
+                nombre=self.person_name(),
+                identificacion=self.identification(i, 5_000_000_000),
+                id_ciudad=city_id,
+                id_albergue=self.rng.choice(shelters) if shelters and self.rng.random() < 0.5 else None,
+                profesion=self.rng.choice(PROFESSIONS)
+            )
+
+
+def insert_in_chunks(connection, repository, dtos, chunk_size=GENERATE_CHUNK_SIZE, log=None):
+    inserted = 0
+    chunk = []
+    for dto in dtos:
+        chunk.append(dto)
+        if len(chunk) >= chunk_size:
+            inserted += repository.bulk_insert(connection, chunk)
+            connection.commit()
+            chunk = []
+            if log:
+                log(f"  {repository.table}: {inserted}")
+    if chunk:
+        inserted += repository.bulk_insert(connection, chunk)
+        connection.commit()
+    return inserted
+
+
+def reset_data(connection):
+    # Borra los datos (no el esquema). TRUNCATE no dispara triggers, por eso se
+    # vacían también las tablas resumen
+    cursor = connection.cursor()
+    if dialect_of(connection) == "sqlite":
+        # SQLite no tiene TRUNCATE: DELETE en el orden de las llaves foráneas
+        for table in RESET_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        connection.commit()
+        cursor.close()
+        return
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table in RESET_TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.close()
+
+
+def generate(connection, refugees, seed=42, cities=None, volunteers=None, log=print):
+    # Cantidades por defecto proporcionales a los refugiados
+    cities = cities or max(50, min(1100, refugees // 200))
+    volunteers = volunteers if volunteers is not None else refugees // 10
+    data = SyntheticData(seed)
+    dialect = dialect_of(connection)
+    started = time.perf_counter()
+
+    log(f"Generando {cities} ciudades, {refugees} refugiados y {volunteers} voluntarios (semilla {seed})")
+    insert_in_chunks(connection, CityRepository(dialect=dialect), data.cities(cities))
+    cursor = connection.cursor()
+    cursor.execute("SELECT id_ciudad FROM ciudades ORDER BY id_ciudad")
+    city_ids = [row[0] for row in cursor.fetchall()]
+
+    insert_in_chunks(connection, ShelterRepository(dialect=dialect), data.shelters(city_ids))
+    cursor.execute("SELECT id_albergue, id_ciudad FROM albergues")
+    shelters_by_city = {}
+    for shelter_id, city_id in cursor.fetchall():
+        shelters_by_city.setdefault(city_id, []).append(shelter_id)
+    cursor.close()
+
+    insert_in_chunks(connection, RefugeeRepository(dialect=dialect), data.refugees(refugees, city_ids, shelters_by_city), log=log)
+    insert_in_chunks(connection, VolunteerRepository(dialect=dialect), data.volunteers(volunteers, city_ids, shelters_by_city))
+    elapsed = time.perf_counter() - started
+    log(f"Datos generados en {elapsed:.1f} s")
+    return {"ciudades": cities, "refugiados": refugees, "voluntarios": volunteers,
+            "albergues": sum(len(ids) for ids in shelters_by_city.values()), "segundos": round(elapsed, 2)}
+
+
+def time_query(function, repeat):
+    # Primera ejecución aparte (caché en frío), luego mediana y mínimo del resto
+    timings = []
+    for _ in range(repeat + 1):
+        timed(timings, function)
+    warm = timings[1:] or timings
+    return {
+        "primera_ms": round(timings[0] * 1000, 2),
+        "mediana_ms": round(statistics.median(warm) * 1000, 2),
+        "minimo_ms": round(min(warm) * 1000, 2),
+    }
+
+
+def middle_key(connection, repository):
+    # (nombre, id) de la fila en la mitad del orden, para medir una página profunda
+    total = repository.count(connection)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT {repository.name_column}, {repository.id_field} FROM {repository.table}
+        ORDER BY {repository.name_column}, {repository.id_field} LIMIT 1 OFFSET %s
+    """, (total // 2,))
+    key = cursor.fetchone()
+    cursor.close()
+    return key
+
+
+def benchmark_queries(connection, repeat=5):
+    # Las mismas llamadas que hace la interfaz al cargar cada pestaña y al
+    # generar los reportes
+    dialect = dialect_of(connection)
+    refugees = RefugeeRepository(dialect=dialect)
+    shelters = ShelterRepository(dialect=dialect)
+    cities = CityRepository(dialect=dialect)
+    volunteers = VolunteerRepository(dialect=dialect)
+    reports = ReportRepository(dialect)
+    refugee_key = middle_key(connection, refugees)
+
+    def load(repository):
+        return lambda: (repository.count(connection), repository.fetch_page(connection, None, PAGE_SIZE))
+
+    queries = {
+        "load_refugees": load(refugees),
+        "load_refugees_pagina_media": lambda: refugees.fetch_page(connection, refugee_key, PAGE_SIZE),
+        "buscar_refugiado_nombre": lambda: (refugees.count(connection, "maria rodri"),
+                                            refugees.fetch_page(connection, None, PAGE_SIZE, "maria rodri")),
+        "buscar_refugiado_identificacion": lambda: (refugees.count(connection, "1001"),
+                                                    refugees.fetch_page(connection, None, PAGE_SIZE, "1001")),
+        "load_volunteers": load(volunteers),
+        "load_shelters": lambda: (load(shelters)(), shelters.options(connection)),
+        "load_cities": lambda: (load(cities)(), cities.options(connection)),
+        "reporte_distribucion_refugiados": lambda: reports.refugee_distribution(connection),
+        "reporte_voluntarios_por_ciudad": lambda: reports.volunteers_by_city(connection),
+        "estadisticas_albergues": lambda: (reports.update_shelter_stats(connection),
+                                           reports.shelter_stats(connection)),
+    }
+    results = {}
+    try:
+        for name, function in queries.items():
+            results[name] = time_query(function, repeat)
+    finally:
+        # El procedimiento de estadísticas escribe: no se deja nada confirmado
+        connection.rollback()
+    return results
+
+
+def crud_cycle(connection, repository, iterations, warmup=20, tag=""):
+    # Latencia por operación de insertar, leer, actualizar y borrar un refugiado,
+    # dentro de una transacción que se deshace al final
+    city_id = any_city_id(connection)
+    timings = {"insert": [], "fetch_row": [], "update": [], "delete": []}
+    try:
+        for i in range(warmup + iterations):
+            refugee = RefugiadoDTO(
+                nombre=f"Benchmark {i}",
+                identificacion=f"BENCH-{tag}-{i}",
+                numero_de_contacto="3000000000",
+                id_ciudad_despiazamiento=city_id,
+                motivo_despiazamiento=MOTIVOS_DESPLAZAMIENTO[0],
+                id_ciudad_refugio=city_id
+            )
+            # Las primeras vueltas (preparación de las sentencias) no se miden
+            target = {name: [] for name in timings} if i < warmup else timings
+            timed(target["insert"], repository.insert, connection, refugee)
+            timed(target["fetch_row"], repository.fetch_row, connection, refugee.id_refugiado)
+            refugee.numero_de_contacto = "3000000001"
+            timed(target["update"], repository.update, connection, refugee)
+            timed(target["delete"], repository.delete, connection, refugee.id_refugiado)
+    finally:
+        connection.rollback()
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def benchmark_prepared(connection, iterations, warmup=20):
+    # El mismo ciclo con cursor de texto y con sentencias preparadas
+    return {
+        "preparado" if prepared else "texto": crud_cycle(
+            connection, RefugeeRepository(prepared=prepared, dialect=dialect_of(connection)), iterations, warmup, tag=f"{prepared:d}")
+        for prepared in (False, True)
+    }
+
+
+def benchmark_treeview(connection, pages=10):
+    # Poblar un Treeview oculto con páginas reales a través de KeysetPager. Tk
+    # necesita una pantalla: en un servidor se ejecuta con xvfb-run.
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"omitido": f"Tk no disponible ({e})"}
+    root.withdraw()
+    try:
+        refugees = RefugeeRepository(dialect=dialect_of(connection))
+        table = ttk.Treeview(root, columns=[str(i) for i in range(9)], show="headings")
+        pager = KeysetPager(
+            None, "benchmark", table, ttk.Scrollbar(root), ttk.Label(root),
+            fetch_page=refugees.fetch_page, count_rows=refugees.count,
+            row_key=lambda refugee: (refugee['nombre'], refugee['id_refugiado']),
+            row_values=lambda refugee: tuple(refugee.values())[:9],
+            noun="refugiados", on_error=print
+        )
+        page_timings = []
+        after_key = None
+        for _ in range(pages):
+            rows = refugees.fetch_page(connection, after_key, PAGE_SIZE)
+            if not rows:
+                break
+            timed(page_timings, pager.append_rows, rows)
+            root.update_idletasks()
+            after_key = pager.last_key
+
+        # Inserción ordenada de una fila en una tabla ya cargada (bisect + insert)
+        upsert_timings = []
+        for row in list(pager.rows.values())[:100]:
+            timed(upsert_timings, pager.upsert_row, dict(row, nombre=f"{row['nombre']} B"))
+        return {
+            "filas": pager.loaded,
+            "pagina": summarize(page_timings) if page_timings else None,
+            "upsert_row": summarize(upsert_timings) if upsert_timings else None,
+        }
+    finally:
+        root.destroy()
+
+
+def run_suite(connection, repeat, iterations):
+    return {
+        "consultas": benchmark_queries(connection, repeat),
+        "crud": crud_cycle(connection, RefugeeRepository(dialect=dialect_of(connection)), iterations, tag="suite"),
+        "treeview": benchmark_treeview(connection),
+    }
+
+
+def print_prepared(results):
+    print(f"{'operación':<12}{'texto (us)':>14}{'preparado (us)':>18}{'cambio':>10}")
+    for name in results["texto"]:
+        text = results["texto"][name]["mediana_us"]
+        prepared = results["preparado"][name]["mediana_us"]
+        change = (prepared - text) / text * 100 if text else 0.0
+        print(f"{name:<12}{text:>14.1f}{prepared:>18.1f}{change:>9.1f}%")
+
+
+def print_suite(results):
+    for name, timing in results["consultas"].items():
+        print(f"  {name:<36}{timing['mediana_ms']:>10.2f} ms  (primera {timing['primera_ms']:.2f} ms)")
+    for name, timing in results["crud"].items():
+        print(f"  crud {name:<31}{timing['mediana_us']:>10.1f} us")
+    treeview = results["treeview"]
+    if "omitido" in treeview:
+        print(f"  treeview: {treeview['omitido']}")
+    elif treeview["pagina"]:
+        print(f"  treeview página de {PAGE_SIZE}{'':<14}{treeview['pagina']['mediana_us'] / 1000:>10.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las consultas de la aplicación")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--output", help="guardar los resultados en un archivo JSON")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    prepared_parser = subparsers.add_parser(
+        "prepared", help="latencia del CRUD con sentencias preparadas frente a cursores de texto")
+    prepared_parser.add_argument("--iterations", type=int, default=500)
+
+    generate_parser = subparsers.add_parser("generate", help="llenar la base con datos sintéticos")
+    generate_parser.add_argument("--refugees", type=int, default=10_000)
+    generate_parser.add_argument("--seed", type=int, default=42)
+    generate_parser.add_argument("--reset", action="store_true", help="borrar antes todos los datos de la base")
+
+    run_parser = subparsers.add_parser("run", help="medir las consultas sobre los datos actuales")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--iterations", type=int, default=200)
+
+    scaling_parser = subparsers.add_parser(
+        "scaling", help="regenerar los datos para cada tamaño y medir (borra los datos de la base)")
+    scaling_parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    scaling_parser.add_argument("--seed", type=int, default=42)
+    scaling_parser.add_argument("--repeat", type=int, default=5)
+    scaling_parser.add_argument("--iterations", type=int, default=200)
+    scaling_parser.add_argument("--reset", action="store_true", required=True,
+                                help="confirmar que se pueden borrar los datos de la base")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    pool = create_pool(config["mysql"])
+
+    report = {"benchmark": args.benchmark, "fecha": datetime.datetime.now().isoformat(timespec="seconds")}
+    with pool.connection() as connection:
+        report["servidor"] = connection.get_server_info()
+        if args.benchmark == "prepared":
+            report["resultados"] = benchmark_prepared(connection, args.iterations)
+            print_prepared(report["resultados"])
+        elif args.benchmark == "generate":
+            if args.reset:
+                reset_data(connection)
+            report["resultados"] = generate(connection, args.refugees, args.seed)
+        elif args.benchmark == "run":
+            report["resultados"] = run_suite(connection, args.repeat, args.iterations)
+            print_suite(report["resultados"])
+        elif args.benchmark == "scaling":
+            report["semilla"] = args.seed
+            report["resultados"] = {}
+            for size in args.sizes:
+                reset_data(connection)
+                data = generate(connection, size, args.seed)
+                print(f"{size} refugiados:")
+                results = run_suite(connection, args.repeat, args.iterations)
+                print_suite(results)
+                report["resultados"][str(size)] = {"datos": data, **results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
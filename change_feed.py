@@ -0,0 +1,124 @@
+import time
+
+from mysql.connector import Error
+
+# Cambios que se conservan en registro_cambios; los más viejos se borran al iniciar
+CHANGES_KEPT = 100000
+
+# Cambios que se leen por consulta
+CHANGES_PER_POLL = 1000
+
+# Tiempo que se espera a que aparezca un id faltante antes de darlo por perdido (s)
+GAP_TIMEOUT = 30.0
+
+
+class ChangeFeed:
+    # Lee registro_cambios, que llenan los triggers de la migración 007 con las
+    # escrituras de cualquier cliente (y los de la 010 con las filas que muestran
+    # una ciudad o un albergue renombrado o borrado), y entrega lo cambiado desde
+    # la última lectura. El id se asigna al insertar pero las transacciones confirman en
+    # otro orden, así que un id menor puede aparecer más tarde: la marca es el
+    # último id sin huecos antes, los ya entregados por encima de ella se
+    # recuerdan, y un hueco que no se llena en GAP_TIMEOUT (transacción deshecha)
+    # se salta. Los cambios nuevos se leen por encima del último id leído
+    # (read_upto) y los huecos se consultan aparte por id, así un hueco no
+    # vuelve a traer las mismas filas ni frena la lectura de las siguientes.
+    def __init__(self, gap_timeout=GAP_TIMEOUT, limit=CHANGES_PER_POLL):
+        self.gap_timeout = gap_timeout
+        self.limit = limit
+        self.enabled = False
+        self.watermark = 0
+        self.read_upto = 0
+        self.seen = set()
+        self.gap_since = None
+
+    def start(self, connection, keep=CHANGES_KEPT):
+        # Empieza a partir del último cambio registrado y recorta el registro
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id_cambio), 0) FROM registro_cambios")
+            self.watermark = cursor.fetchone()[0]
+            cursor.execute("DELETE FROM registro_cambios WHERE id_cambio <= %s", (self.watermark - keep,))
+            connection.commit()
+            cursor.close()
+        except Error:
+            # Sin la migración 007 no hay registro: las vistas se actualizan como antes
+            self.enabled = False
+            return False
+        self.read_upto = self.watermark
+        self.seen = set()
+        self.gap_since = None
+        self.enabled = True
+        return True
+
+    def poll(self, connection):
+        # Devuelve ({tabla: {id_fila: operación}}, recargar, quedan_más). recargar
+        # indica que se perdieron cambios (ya borrados del registro) y conviene
+        # volver a leer las tablas abiertas.
+        cursor = connection.cursor()
+        rows = []
+        missing = self.missing_ids()
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(f"""
+                SELECT id_cambio, tabla, id_fila, operacion FROM registro_cambios
+                WHERE id_cambio IN ({placeholders})
+            """, tuple(missing))
+            rows.extend(cursor.fetchall())
+
+        cursor.execute("""
+            SELECT id_cambio, tabla, id_fila, operacion FROM registro_cambios
+            WHERE id_cambio > %s ORDER BY id_cambio LIMIT %s
+        """, (self.read_upto, self.limit))
+        new_rows = cursor.fetchall()
+        rows.extend(new_rows)
+        if new_rows:
+            self.read_upto = new_rows[-1][0]
+
+        changes = {}
+        for change_id, table, row_id, operation in sorted(rows):
+            if change_id in self.seen:
+                continue
+            self.seen.add(change_id)
+            changes.setdefault(table, {})[row_id] = operation
+
+        reload = self.advance(cursor)
+        cursor.close()
+        return changes, reload, len(new_rows) == self.limit
+
+    def missing_ids(self):
+        # Ids entre la marca y lo ya leído que todavía no aparecieron
+        missing = []
+        for change_id in range(self.watermark + 1, self.read_upto + 1):
+            if change_id not in self.seen:
+                missing.append(change_id)
+                if len(missing) == self.limit:
+                    break
+        return missing
+
+    def advance(self, cursor):
+        self.move_watermark()
+        if not self.seen:
+            self.gap_since = None
+            return False
+
+        now = time.monotonic()
+        if self.gap_since is None:
+            self.gap_since = now
+        if now - self.gap_since < self.gap_timeout:
+            return False
+
+        # El hueco no se llenó: o la transacción se deshizo, o esos cambios ya se
+        # borraron del registro (el cliente estuvo detenido demasiado tiempo)
+        cursor.execute("SELECT MIN(id_cambio) FROM registro_cambios")
+        oldest = cursor.fetchone()[0]
+        lost = oldest is not None and oldest > self.watermark + 1
+        self.watermark = min(self.seen) - 1
+        self.move_watermark()
+        self.gap_since = now if self.seen else None
+        return lost
+
+    def move_watermark(self):
+        while self.watermark + 1 in self.seen:
+            self.watermark += 1
+            self.seen.discard(self.watermark)
@@ -0,0 +1,439 @@
+import queue
+import threading
+import sqlite3
+import time
+import unicodedata
+import weakref
+from contextlib import contextmanager, nullcontext
+
+import mysql.connector
+from mysql.connector import DataError, Error, IntegrityError
+
+from profiling import ProfiledConnection
+from sqlite_backend import SQLiteConnection, translate_error
+
+
+def collation_key(text):
+    # Aproximación en Python del orden de MySQL (sin distinguir mayúsculas ni tildes)
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+# Sentencias preparadas por conexión: {conexión: {sql: cursor preparado}}. El
+# servidor las olvida al cerrarse la sesión, así que una reconexión las descarta.
+_prepared_cursors = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+def execute_prepared(connection, sql, params=()):
+    # Ejecuta sql con un cursor preparado (protocolo binario) que se reutiliza en
+    # las siguientes llamadas con el mismo texto sobre la misma conexión: el
+    # servidor analiza la sentencia una sola vez. Devuelve el cursor; sus filas
+    # deben leerse antes de ejecutar otra sentencia en la conexión.
+    with _prepared_lock:
+        statements = _prepared_cursors.setdefault(connection, {})
+    entry = statements.get(sql)
+    if entry is None:
+        # El cursor compara el texto por identidad: se guarda el mismo objeto str
+        entry = statements[sql] = (sql, connection.cursor(prepared=True))
+    statement, cursor = entry
+    try:
+        cursor.execute(statement, params)
+    except (IntegrityError, DataError):
+        # Fila rechazada por una restricción: la sentencia preparada sigue siendo válida
+        raise
+    except Error:
+        # Otro error puede dejar el cursor a medio leer o la sentencia inválida
+        statements.pop(sql, None)
+        raise
+    return cursor
+
+
+def forget_prepared(connection):
+    with _prepared_lock:
+        _prepared_cursors.pop(connection, None)
+
+
+def create_pool(section, profiler=None):
+    # backend = mysql (servidor) o sqlite (archivo local, para oficinas sin red)
+    backend = section.get('backend', fallback='mysql')
+    if backend == 'sqlite':
+        return SQLiteConnectionPool.from_config(section, profiler)
+    if backend != 'mysql':
+        raise ValueError(f"Backend desconocido en config.ini: {backend}")
+    return ConnectionPool.from_config(section, profiler)
+
+
+def dialect_of(connection):
+    return getattr(connection, "dialect", "mysql")
+
+
+class ConnectionPool:
+    # Conjunto de conexiones a MySQL compartido por los hilos de trabajo. Las
+    # conexiones se crean a demanda hasta pool_size, se verifican con ping al
+    # entregarse y se reconectan con espera exponencial si se cayeron
+    # (wait_timeout del servidor, cortes de red). Con un QueryProfiler, cada
+    # conexión nueva registra el tiempo de sus sentencias.
+    dialect = "mysql"
+
+    def __init__(self, connection_args, pool_size=4, ping_on_checkout=True,
+                 reconnect_attempts=5, reconnect_backoff=0.5, reconnect_max_delay=8.0, profiler=None):
+        self.connection_args = connection_args
+        self.profiler = profiler
+        self.size = pool_size
+        self.ping_on_checkout = ping_on_checkout
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, section, profiler=None):
+        connection_args = {
+            'host': section['host'],
+            'user': section['user'],
+            'password': section['password'],
+            'database': section['database'],
+            'port': section['port'],
+        }
+        return cls(
+            connection_args,
+            pool_size=section.getint('pool_size', fallback=4),
+            ping_on_checkout=section.getboolean('ping_on_checkout', fallback=True),
+            reconnect_attempts=section.getint('reconnect_attempts', fallback=5),
+            reconnect_backoff=section.getfloat('reconnect_backoff', fallback=0.5),
+            reconnect_max_delay=section.getfloat('reconnect_max_delay', fallback=8.0),
+            profiler=profiler,
+        )
+
+    def checkout(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                if self.created < self.size:
+                    self.created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    connection = self._connect()
+                except Error:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                # Todas las conexiones están ocupadas: esperar a que se libere una
+                connection = self.idle.get()
+
+        if self.ping_on_checkout:
+            try:
+                self._ensure_alive(connection)
+            except Error:
+                # El servidor sigue sin responder: se descarta la conexión para que
+                # la próxima solicitud intente abrir una nueva
+                with self.lock:
+                    self.created -= 1
+                raise
+        return connection
+
+    def release(self, connection):
+        # Cerrar la transacción implícita de las lecturas para que la próxima
+        # consulta vea los cambios hechos por otros clientes
+        try:
+            if connection.is_connected() and connection.in_transaction:
+                connection.rollback()
+        except Error:
+            pass
+        self.idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.checkout()
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+            raise
+        finally:
+            self.release(connection)
+
+    def close_all(self):
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.close()
+            except Error:
+                pass
+
+    def _connect(self):
+        connection = self._open()
+        return ProfiledConnection(connection, self.profiler) if self.profiler else connection
+
+    def _open(self):
+        return self._with_backoff(lambda: mysql.connector.connect(**self.connection_args))
+
+    def _ensure_alive(self, connection):
+        try:
+            connection.ping(reconnect=False)
+        except Error:
+            forget_prepared(connection)
+            self._with_backoff(lambda: connection.reconnect(attempts=1))
+
+    def _with_backoff(self, attempt):
+        delay = self.reconnect_backoff
+        for attempt_number in range(self.reconnect_attempts):
+            try:
+                return attempt()
+            except Error:
+                if attempt_number == self.reconnect_attempts - 1:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+
+
+# ER_QUERY_INTERRUPTED: la sentencia se interrumpió con KILL QUERY
+QUERY_INTERRUPTED = 1317
+
+# Segundos entre KILL QUERY repetidos mientras el trabajo cancelado sigue corriendo
+CANCEL_RETRY_SECONDS = 0.2
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class SQLiteConnectionPool(ConnectionPool):
+    # El mismo pool sobre un archivo SQLite: cada hilo usa su propia conexión y el
+    # modo WAL deja leer mientras otro escribe. No hay servidor que pueda caerse,
+    # así que no se hace ping ni se reintenta la conexión.
+    dialect = "sqlite"
+
+    def __init__(self, path, pool_size=4, busy_timeout=5.0, profiler=None):
+        super().__init__({'path': path}, pool_size=pool_size, ping_on_checkout=False, profiler=profiler)
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    @classmethod
+    def from_config(cls, section, profiler=None):
+        return cls(
+            section.get('sqlite_path', fallback='refugiados.db'),
+            pool_size=section.getint('pool_size', fallback=4),
+            busy_timeout=section.getfloat('sqlite_busy_timeout', fallback=5.0),
+            profiler=profiler,
+        )
+
+    def _open(self):
+        try:
+            return SQLiteConnection(self.path, self.busy_timeout)
+        except sqlite3.Error as e:
+            raise translate_error(e) from e
+
+
+class DedicatedCall:
+    # Trabajo largo (procedimientos almacenados) sobre una conexión propia, fuera
+    # del pool. Guarda el id de esa sesión en el servidor para que cancel() pueda
+    # interrumpir la sentencia en curso con KILL QUERY desde otra conexión; en
+    # SQLite se interrumpe la conexión directamente. El trabajo no confirma: run()
+    # confirma al final solo si nadie canceló antes, así una cancelación nunca
+    # termina reportada como ejecución completa.
+    def __init__(self, pool):
+        self.pool = pool
+        self.connection = None
+        self.connection_id = None
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.committing = False
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def run(self, job):
+        try:
+            connection = self.pool._connect()
+        except Exception:
+            self.finished.set()
+            raise
+        try:
+            self.connection = connection
+            self.connection_id = connection.connection_id
+
+            if self.cancelled.is_set():
+                raise QueryCancelled()
+            result = job(connection)
+            # Un KILL QUERY que llegó entre dos sentencias no interrumpió nada: la
+            # marca decide. Desde aquí cancel() ya no tiene efecto.
+            with self.lock:
+                if self.cancelled.is_set():
+                    raise QueryCancelled()
+                self.committing = True
+            connection.commit()
+            return result
+        except Error as e:
+            if self.cancelled.is_set() or e.errno == QUERY_INTERRUPTED:
+                raise QueryCancelled() from e
+            raise
+        finally:
+            self.finished.set()
+            # Lo que no se confirmó (una ejecución cancelada) se descarta con la sesión
+            try:
+                connection.rollback()
+                connection.close()
+            except Error:
+                pass
+
+    def cancel(self, connection):
+        # Se ejecuta con otra conexión. La interrupción se repite hasta que run()
+        # termina, porque la primera puede llegar antes de que empiece la sentencia
+        # (o entre dos) y perderse. Si run() ya está confirmando, no hace nada.
+        with self.lock:
+            if self.committing:
+                return
+            self.cancelled.set()
+        while not self.finished.is_set():
+            self.interrupt(connection)
+            self.finished.wait(CANCEL_RETRY_SECONDS)
+
+    def interrupt(self, connection):
+        if self.pool.dialect == "sqlite":
+            try:
+                if self.connection:
+                    self.connection.interrupt()
+            except sqlite3.ProgrammingError:
+                # La conexión ya se cerró: el trabajo terminó antes de cancelarlo
+                pass
+        elif self.connection_id is not None:
+            cursor = connection.cursor()
+            cursor.execute(f"KILL QUERY {int(self.connection_id)}")
+            cursor.close()
+
+
+class DatabaseWorker:
+    # Ejecuta las llamadas a la base de datos fuera del hilo de Tk. Cada hilo toma
+    # una conexión del pool por trabajo, así que hay tantos hilos como conexiones.
+    # Los resultados vuelven por una cola que se revisa periódicamente con
+    # root.after, de modo que los callbacks siempre corren en el hilo de la interfaz.
+    def __init__(self, root, pool, poll_interval=50, on_busy_change=None):
+        self.root = root
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.on_busy_change = on_busy_change
+
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+
+        # Última generación pedida por acción: una solicitud nueva para la misma
+        # acción deja obsoletas a las anteriores
+        self.generations = {}
+        # Trabajos en curso por acción, para los indicadores de ocupado
+        self.pending = {}
+        # Acciones periódicas que no se muestran como ocupado
+        self.background_actions = set()
+
+        for _ in range(pool.size):
+            threading.Thread(target=self._run, daemon=True).start()
+
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, action, job, on_success=None, on_error=None, supersede=True, background=False, origin=None):
+        # job recibe la conexión y se ejecuta en un hilo de fondo; on_success y
+        # on_error se ejecutan en el hilo de Tk. Con supersede=False (escrituras)
+        # el trabajo nunca se descarta; con background=True no cambia el indicador
+        # de ocupado. origin es el método al que el perfilador atribuye las
+        # sentencias, si no es el que definió job (p. ej. las páginas de un pager).
+        if background:
+            self.background_actions.add(action)
+        with self.lock:
+            generation = self.generations.get(action, 0) + 1
+            if supersede:
+                self.generations[action] = generation
+        self.pending[action] = self.pending.get(action, 0) + 1
+        self._notify_busy()
+        self.jobs.put((action, generation, supersede, job, on_success, on_error, origin))
+
+    def submit_dedicated(self, action, job, on_success=None, on_error=None):
+        # Para trabajos largos: corren en su propio hilo con una conexión propia,
+        # así no ocupan un hilo del pool. Devuelve el DedicatedCall para medir el
+        # tiempo transcurrido y cancelarlo. Nunca se descarta (como supersede=False).
+        call = DedicatedCall(self.pool)
+        with self.lock:
+            generation = self.generations.get(action, 0) + 1
+        self.pending[action] = self.pending.get(action, 0) + 1
+        self._notify_busy()
+        threading.Thread(
+            target=self._run_dedicated, args=(action, generation, call, job, on_success, on_error), daemon=True
+        ).start()
+        return call
+
+    def is_busy(self, action):
+        return self.pending.get(action, 0) > 0
+
+    def _is_superseded(self, action, generation, supersede):
+        if not supersede:
+            return False
+        with self.lock:
+            return self.generations.get(action, 0) != generation
+
+    def _run(self):
+        while True:
+            action, generation, supersede, job, on_success, on_error, origin = self.jobs.get()
+
+            # Si ya llegó una solicitud más nueva, ni siquiera se ejecuta
+            if self._is_superseded(action, generation, supersede):
+                self.results.put((action, generation, supersede, "cancelled", None, None))
+                continue
+
+            try:
+                with self.pool.connection() as connection, self._profiling(action, job, origin):
+                    result = job(connection)
+                self.results.put((action, generation, supersede, "ok", result, on_success))
+            except Exception as e:
+                self.results.put((action, generation, supersede, "error", e, on_error))
+
+    def _run_dedicated(self, action, generation, call, job, on_success, on_error):
+        try:
+            with self._profiling(action, job):
+                result = call.run(job)
+            self.results.put((action, generation, False, "ok", result, on_success))
+        except Exception as e:
+            self.results.put((action, generation, False, "error", e, on_error))
+
+    def _profiling(self, action, job, origin=None):
+        profiler = self.pool.profiler
+        return profiler.context(action, job, origin) if profiler else nullcontext()
+
+    def _poll(self):
+        try:
+            while True:
+                action, generation, supersede, status, value, callback = self.results.get_nowait()
+
+                self.pending[action] -= 1
+                if not self.pending[action]:
+                    del self.pending[action]
+                self._notify_busy()
+
+                if status == "cancelled" or self._is_superseded(action, generation, supersede):
+                    continue
+                if callback:
+                    callback(value)
+        except queue.Empty:
+            pass
+        finally:
+            self.root.after(self.poll_interval, self._poll)
+
+    def _notify_busy(self):
+        if self.on_busy_change:
+            self.on_busy_change(sorted(action for action in self.pending if action not in self.background_actions))
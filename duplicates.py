@@ -0,0 +1,343 @@
+import argparse
+import configparser
+import functools
+import itertools
+import math
+import re
+import sys
+import time
+
+from database import collation_key, create_pool, dialect_of
+from repositories import BULK_CHUNK_SIZE, chunks
+
+# Caracteres de formato que se quitan de la identificación; la columna generada
+# identificacion_normalizada de la migración 009 hace los mismos REPLACE
+IDENTIFICATION_SEPARATORS = re.compile(r"[.\- ,/]")
+
+# Palabras del nombre que no distinguen a nadie
+STOP_WORDS = {"de", "del", "la", "las", "los", "y"}
+
+# Palabras del nombre que se usan para las claves de bloqueo
+MAX_NAME_TOKENS = 4
+
+# Vecinos con los que se compara cada registro dentro de un bloque ordenado
+WINDOW = 5
+
+# Similitud mínima (0 a 1) del nombre y de la identificación para proponer un par
+NAME_THRESHOLD = 0.6
+IDENTIFICATION_THRESHOLD = 0.75
+
+# Registros que se comparan, como máximo, al revisar un alta nueva
+MAX_INSERT_CANDIDATES = 5000
+
+# Reglas fonéticas del español, en orden: letras que suenan igual quedan iguales
+PHONETIC_RULES = [
+    (re.compile(r"[^a-z]"), ""),
+    (re.compile(r"ll"), "y"),
+    (re.compile(r"qu"), "k"),
+    (re.compile(r"gu(?=[ei])"), "G"),
+    (re.compile(r"g(?=[ei])"), "j"),
+    (re.compile(r"G"), "g"),
+    (re.compile(r"c(?=[ei])"), "s"),
+    (re.compile(r"ch"), "x"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"[vw]"), "b"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"y$"), "i"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+# Pares por revisar, del más parecido al menos
+PENDING_PAIRS_SQL = """
+    SELECT d.id_candidato, d.puntaje, d.motivo,
+           a.id_refugiado, a.nombre, a.identificacion,
+           b.id_refugiado, b.nombre, b.identificacion
+    FROM candidatos_duplicados d
+    JOIN refugiados a ON a.id_refugiado = d.id_refugiado_a
+    JOIN refugiados b ON b.id_refugiado = d.id_refugiado_b
+    WHERE d.estado = 'pendiente'
+    ORDER BY d.puntaje DESC, d.id_candidato
+    LIMIT %s
+"""
+
+MOTIVE_IDENTIFICATION = "misma identificación"
+MOTIVE_SIMILAR = "nombre e identificación parecidos"
+
+
+def normalize_identification(identification):
+    return IDENTIFICATION_SEPARATORS.sub("", identification or "").upper()
+
+
+@functools.lru_cache(maxsize=100_000)
+def phonetic_key(word):
+    # "Vásquez", "Vasques" y "Basquez" dan la misma clave. Los nombres se
+    # repiten mucho, así que cada palabra distinta se calcula una sola vez.
+    key = collation_key(word)
+    for pattern, replacement in PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def name_tokens(name):
+    words = re.split(r"[^\w]+", collation_key(name))
+    tokens = [phonetic_key(word) for word in words if word and word not in STOP_WORDS]
+    return [token for token in tokens if token][:MAX_NAME_TOKENS]
+
+
+def blocking_keys(tokens):
+    # Cada par de palabras del nombre: basta con que dos coincidan (en cualquier
+    # orden) para que dos registros caigan en el mismo bloque
+    if len(tokens) < 2:
+        return set(tokens)
+    return {" ".join(sorted(pair)) for pair in itertools.combinations(tokens, 2)}
+
+
+@functools.lru_cache(maxsize=100_000)
+def trigrams(tokens):
+    # tokens: tupla de claves fonéticas; se calcula solo para los pares cuya
+    # identificación ya se parece
+    text = " " + " ".join(sorted(tokens)) + " "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def name_similarity(first, second):
+    # Jaccard de los trigramas de las claves fonéticas
+    return len(first & second) / len(first | second) if first and second else 0.0
+
+
+def identification_similarity(first, second):
+    # Prefijo y sufijo comunes sobre el largo mayor: un dígito cambiado, de más,
+    # de menos o dos vecinos intercambiados siguen dando un valor alto. Para
+    # llegar al umbral uno de los dos extremos debe cubrir la mitad de él; si
+    # ninguno lo hace se devuelve 0 sin recorrer las cadenas.
+    if first == second:
+        return 1.0 if first else 0.0
+    longest = max(len(first), len(second))
+    half = math.ceil(longest * IDENTIFICATION_THRESHOLD / 2)
+    if first[:half] != second[:half] and first[-half:] != second[-half:]:
+        return 0.0
+    shorter = min(len(first), len(second))
+    prefix = 0
+    while prefix < shorter and first[prefix] == second[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shorter - prefix and first[-1 - suffix] == second[-1 - suffix]:
+        suffix += 1
+    return (prefix + suffix) / longest
+
+
+class Person:
+    __slots__ = ("refugee_id", "identification", "tokens")
+
+    def __init__(self, refugee_id, name, identification):
+        self.refugee_id = refugee_id
+        self.identification = normalize_identification(identification)
+        self.tokens = tuple(name_tokens(name))
+
+
+def compare(first, second):
+    # (motivo, puntaje) si el par merece revisión, o None
+    if first.identification and first.identification == second.identification:
+        return MOTIVE_IDENTIFICATION, 1.0
+    id_score = identification_similarity(first.identification, second.identification)
+    if id_score < IDENTIFICATION_THRESHOLD:
+        return None
+    name_score = name_similarity(trigrams(first.tokens), trigrams(second.tokens))
+    if name_score < NAME_THRESHOLD:
+        return None
+    return MOTIVE_SIMILAR, round((id_score + name_score) / 2, 3)
+
+
+class DuplicateDetector:
+    # Busca refugiados registrados dos veces con el nombre escrito distinto o la
+    # identificación con otro formato. La identificación se compara ya
+    # normalizada (sin puntos, guiones ni espacios); para el nombre se usan
+    # claves de bloqueo fonéticas (pares de palabras) guardadas en
+    # claves_refugiados, y solo se comparan registros que comparten una clave.
+    # Los bloques de nombres comunes pueden tener miles de registros, así que
+    # dentro de cada bloque se ordena por identificación (y por identificación
+    # invertida, para los errores en los primeros dígitos) y cada registro se
+    # compara con sus WINDOW vecinos: O(n) comparaciones en lugar de O(n²).
+    # Los pares encontrados van a candidatos_duplicados para que alguien decida.
+    def __init__(self, window=WINDOW):
+        self.window = window
+
+    def candidates_for(self, connection, name, identification, exclude_id=None):
+        # Registros parecidos a un alta nueva: (id, nombre, identificación, motivo, puntaje)
+        person = Person(None, name, identification)
+        keys = sorted(blocking_keys(person.tokens))
+        cursor = connection.cursor()
+        rows = []
+        if person.identification:
+            cursor.execute("""
+                SELECT id_refugiado, nombre, identificacion FROM refugiados
+                WHERE identificacion_normalizada = %s
+            """, (person.identification,))
+            rows.extend(cursor.fetchall())
+        if keys:
+            placeholders = ", ".join(["%s"] * len(keys))
+            cursor.execute(f"""
+                SELECT DISTINCT r.id_refugiado, r.nombre, r.identificacion
+                FROM claves_refugiados k
+                JOIN refugiados r ON r.id_refugiado = k.id_refugiado
+                WHERE k.clave IN ({placeholders})
+                LIMIT %s
+            """, (*keys, MAX_INSERT_CANDIDATES))
+            rows.extend(cursor.fetchall())
+        cursor.close()
+
+        candidates = {}
+        for refugee_id, other_name, other_identification in rows:
+            if refugee_id == exclude_id or refugee_id in candidates:
+                continue
+            match = compare(person, Person(refugee_id, other_name, other_identification))
+            if match:
+                candidates[refugee_id] = (refugee_id, other_name, other_identification, *match)
+        return sorted(candidates.values(), key=lambda candidate: candidate[4], reverse=True)
+
+    def index(self, connection, refugee_id, name):
+        # Claves de bloqueo de un registro nuevo o modificado (no confirma)
+        self.index_many(connection, [(refugee_id, name)])
+
+    def index_many(self, connection, people, chunk_size=BULK_CHUNK_SIZE):
+        # people: (id_refugiado, nombre). Reemplaza las claves de esos registros
+        # por tramos, en la transacción de la conexión (no confirma).
+        cursor = connection.cursor()
+        for chunk in chunks(people, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM claves_refugiados WHERE id_refugiado IN ({placeholders})",
+                           tuple(refugee_id for refugee_id, _ in chunk))
+            rows = [(key, refugee_id) for refugee_id, name in chunk
+                    for key in sorted(blocking_keys(name_tokens(name)))]
+            if rows:
+                cursor.executemany("INSERT INTO claves_refugiados (clave, id_refugiado) VALUES (%s, %s)", rows)
+        cursor.close()
+
+    def index_inserted(self, connection, identifications, chunk_size=BULK_CHUNK_SIZE):
+        # Claves de filas recién insertadas con un INSERT de varias filas, que no
+        # devuelve sus ids: se buscan por identificación entre los registros que
+        # todavía no tienen claves (no confirma)
+        cursor = connection.cursor()
+        people = []
+        for chunk in chunks(sorted(set(identifications)), chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT r.id_refugiado, r.nombre FROM refugiados r
+                WHERE r.identificacion IN ({placeholders})
+                  AND NOT EXISTS (SELECT 1 FROM claves_refugiados k WHERE k.id_refugiado = r.id_refugiado)
+            """, tuple(chunk))
+            people.extend(cursor.fetchall())
+        cursor.close()
+        self.index_many(connection, people, chunk_size)
+
+    def check_inserted(self, connection, refugee_id, name, identification):
+        # Alta que no pasó por el formulario (reenvío del diario): se indexa y sus
+        # posibles duplicados van directo a la cola (no confirma)
+        candidates = self.candidates_for(connection, name, identification, exclude_id=refugee_id)
+        self.index(connection, refugee_id, name)
+        return self.queue(connection, [(candidate[0], refugee_id, *candidate[3:]) for candidate in candidates])
+
+    def queue(self, connection, pairs, chunk_size=BULK_CHUNK_SIZE):
+        # pairs: (id_a, id_b, motivo, puntaje). Los pares ya en la cola, también
+        # los que alguien marcó como personas distintas, se dejan como están.
+        insert = "INSERT IGNORE" if dialect_of(connection) == "mysql" else "INSERT OR IGNORE"
+        cursor = connection.cursor()
+        queued = 0
+        for chunk in chunks(pairs, chunk_size):
+            cursor.executemany(f"""
+                {insert} INTO candidatos_duplicados (id_refugiado_a, id_refugiado_b, motivo, puntaje)
+                VALUES (%s, %s, %s, %s)
+            """, [(min(a, b), max(a, b), motive, score) for a, b, motive, score in chunk])
+            queued += cursor.rowcount
+        cursor.close()
+        return queued
+
+    def scan(self, connection, log=None):
+        # Revisión de toda la tabla: recalcula claves_refugiados y agrega a la cola
+        # los pares nuevos. Devuelve (registros, pares encontrados, pares nuevos).
+        started = time.perf_counter()
+        cursor = connection.cursor()
+        cursor.execute("SELECT id_refugiado, nombre, identificacion FROM refugiados")
+        people = [Person(*row) for row in cursor.fetchall()]
+        cursor.close()
+
+        blocks = {}
+        by_identification = {}
+        for person in people:
+            for key in blocking_keys(person.tokens):
+                blocks.setdefault(key, []).append(person)
+            if person.identification:
+                by_identification.setdefault(person.identification, []).append(person)
+        if log:
+            log(f"{len(people)} registros, {len(blocks)} bloques ({time.perf_counter() - started:.1f} s)")
+
+        found = {}
+        # Misma identificación: cada registro del grupo se empareja con el primero,
+        # así todos llegan a la cola con n - 1 pares en lugar de n²
+        for first, *others in by_identification.values():
+            for second in others:
+                found[self.pair(first, second)] = (MOTIVE_IDENTIFICATION, 1.0)
+        for block in blocks.values():
+            if len(block) < 2:
+                continue
+            for order in (lambda p: p.identification, lambda p: p.identification[::-1]):
+                block.sort(key=order)
+                for position, first in enumerate(block):
+                    for second in block[position + 1:position + 1 + self.window]:
+                        match = compare(first, second)
+                        if match:
+                            found[self.pair(first, second)] = match
+        if log:
+            log(f"{len(found)} pares encontrados ({time.perf_counter() - started:.1f} s)")
+
+        self.rebuild_keys(connection, blocks)
+        queued = self.queue(connection, [(*pair, *match) for pair, match in found.items()])
+        connection.commit()
+        return len(people), len(found), queued
+
+    def pair(self, first, second):
+        return min(first.refugee_id, second.refugee_id), max(first.refugee_id, second.refugee_id)
+
+    def rebuild_keys(self, connection, blocks, chunk_size=BULK_CHUNK_SIZE):
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM claves_refugiados")
+        rows = ((key, person.refugee_id) for key, block in blocks.items() for person in block)
+        for chunk in chunks(rows, chunk_size):
+            cursor.executemany("INSERT INTO claves_refugiados (clave, id_refugiado) VALUES (%s, %s)", chunk)
+        cursor.close()
+
+    def pending(self, connection, limit=1000):
+        cursor = connection.cursor()
+        cursor.execute(PENDING_PAIRS_SQL, (limit,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def dismiss(self, connection, candidate_id):
+        # Personas distintas: el par no se vuelve a proponer (no confirma). Si son
+        # la misma, se borra uno de los dos y la fila de la cola se va con él.
+        cursor = connection.cursor()
+        cursor.execute("UPDATE candidatos_duplicados SET estado = 'distintos' WHERE id_candidato = %s",
+                       (candidate_id,))
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de refugiados registrados dos veces")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--window", type=int, default=WINDOW, help="vecinos comparados dentro de cada bloque")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    pool = create_pool(config["mysql"])
+
+    with pool.connection() as connection:
+        people, found, queued = DuplicateDetector(args.window).scan(connection, log=print)
+    print(f"{people} refugiados revisados: {found} pares parecidos, {queued} nuevos en la cola de revisión")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import csv
+import datetime
+import decimal
+import json
+import os
+from dataclasses import dataclass
+
+from database import forget_prepared
+
+# Filas que se piden al servidor en cada lectura del cursor
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl"}
+
+
+@dataclass
+class ExportResult:
+    rows: int = 0
+    path: str = None
+    cancelled: bool = False
+
+
+def json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+class QueryExporter:
+    # Exporta el resultado de una consulta a CSV o JSON Lines sin cargarlo en
+    # memoria: usa un cursor sin buffer y escribe cada lote de filas apenas llega,
+    # así el consumo de memoria es el mismo para mil o para millones de filas.
+    def __init__(self, sql, path, params=(), count_sql=None, progress=None, cancel_event=None,
+                 batch_size=EXPORT_BATCH_SIZE):
+        self.sql = sql
+        self.params = params
+        self.path = path
+        self.count_sql = count_sql
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.batch_size = batch_size
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {extension or path}")
+        self.format = EXPORT_FORMATS[extension]
+
+    def run(self, connection):
+        result = ExportResult(path=self.path)
+        total = self.count_rows(connection)
+
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(self.sql, self.params)
+        columns = list(cursor.column_names)
+
+        with open(self.path, "w", encoding="utf-8-sig" if self.format == "csv" else "utf-8", newline="") as f:
+            write = self.csv_writer(f, columns) if self.format == "csv" else self.jsonl_writer(f, columns)
+
+            while True:
+                if self.cancel_event and self.cancel_event.is_set():
+                    result.cancelled = True
+                    break
+
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                write(rows)
+                result.rows += len(rows)
+
+                if self.progress:
+                    fraction = min(result.rows / total, 1.0) if total else 0.0
+                    self.progress(fraction, result.rows)
+
+        if result.cancelled:
+            # Quedan filas sin leer en el servidor: se descarta la sesión en lugar
+            # de leerlas todas, y el pool entrega la conexión ya reabierta
+            forget_prepared(connection)
+            connection.reconnect(attempts=1)
+        else:
+            cursor.close()
+        return result
+
+    def count_rows(self, connection):
+        if not self.count_sql:
+            return None
+        cursor = connection.cursor()
+        cursor.execute(self.count_sql)
+        total = cursor.fetchone()[0]
+        cursor.close()
+        return total
+
+    def csv_writer(self, f, columns):
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        return writer.writerows
+
+    def jsonl_writer(self, f, columns):
+        def write(rows):
+            f.writelines(
+                json.dumps({column: json_value(value) for column, value in zip(columns, row)},
+                           ensure_ascii=False) + "\n"
+                for row in rows
+            )
+        return write
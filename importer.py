@@ -0,0 +1,238 @@
+import csv
+import io
+import os
+from dataclasses import dataclass
+
+from mysql.connector import DataError, Error, IntegrityError
+
+from database import collation_key
+from models import MOTIVOS_DESPLAZAMIENTO, RefugiadoDTO
+
+# Filas por transacción al insertar
+IMPORT_CHUNK_SIZE = 1000
+
+# Nombres de columna aceptados en el archivo (normalizados) para cada campo
+COLUMN_ALIASES = {
+    'nombre': ['nombre', 'nombre_completo'],
+    'identificacion': ['identificacion', 'documento', 'cedula'],
+    'numero_de_contacto': ['numero_de_contacto', 'contacto', 'telefono', 'celular'],
+    'email': ['email', 'correo', 'correo_electronico'],
+    'ciudad_desplazamiento': ['ciudad_desplazamiento', 'ciudad_de_desplazamiento', 'ciudad_origen',
+                              'id_ciudad_del_despiazamiento'],
+    'motivo_desplazamiento': ['motivo_desplazamiento', 'motivo_de_desplazamiento', 'motivo',
+                              'motivo_despiazamiento'],
+    'ciudad_refugio': ['ciudad_refugio', 'ciudad_de_refugio', 'id_ciudad_a_refugiarse'],
+}
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    rejected: int = 0
+    rejected_path: str = None
+    cancelled: bool = False
+
+
+class RowRejected(Exception):
+    pass
+
+
+class ImportInterrupted(Exception):
+    # La base de datos falló por otra causa que el dato (conexión, servidor): la
+    # importación se detiene. result tiene lo ya confirmado y line la primera
+    # fila del bloque que no se insertó.
+    def __init__(self, result, line, error):
+        super().__init__(str(error))
+        self.result = result
+        self.line = line
+        self.error = error
+
+
+def header_key(name):
+    return collation_key(name).strip().replace(" ", "_")
+
+
+class RefugeeImporter:
+    # Importa refugiados desde un CSV (los libros de Excel se exportan como CSV).
+    # El archivo se lee como flujo, cada fila se valida contra RefugiadoDTO y las
+    # filas válidas se insertan por bloques con el repositorio de refugiados, una
+    # transacción por bloque con un único INSERT de varias filas. Las filas
+    # rechazadas se escriben junto al archivo original con el motivo del rechazo.
+    # Con duplicate_detector, las claves de nombre de cada bloque se guardan en la
+    # misma transacción, para que las altas siguientes comparen contra ellas.
+    def __init__(self, path, repository, chunk_size=IMPORT_CHUNK_SIZE, progress=None, cancel_event=None,
+                 duplicate_detector=None):
+        self.path = path
+        self.repository = repository
+        self.duplicate_detector = duplicate_detector
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+        base, _ = os.path.splitext(path)
+        self.rejected_path = f"{base}_rechazados.csv"
+        self.rejected_file = None
+        self.rejected_writer = None
+
+        self.city_by_name = {}
+        self.known_city_ids = set()
+        self.reasons = {collation_key(reason): reason for reason in MOTIVOS_DESPLAZAMIENTO}
+
+    def run(self, connection):
+        self.load_cities(connection)
+        result = ImportResult()
+        total_bytes = os.path.getsize(self.path) or 1
+
+        with open(self.path, 'rb') as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            reader = csv.DictReader(text, dialect=self.sniff_dialect(text))
+            columns = self.map_columns(reader.fieldnames or [])
+
+            chunk = []
+            try:
+                for line_number, row in enumerate(reader, start=2):
+                    if self.cancel_event and self.cancel_event.is_set():
+                        result.cancelled = True
+                        break
+
+                    try:
+                        refugee = self.to_dto(row, columns)
+                        chunk.append((line_number, row, refugee))
+                    except RowRejected as e:
+                        self.reject(reader.fieldnames, line_number, row, str(e), result)
+
+                    if len(chunk) >= self.chunk_size:
+                        self.insert_chunk(connection, chunk, reader.fieldnames, result)
+                        chunk = []
+                        if self.progress:
+                            self.progress(raw.tell() / total_bytes, result.inserted, result.rejected)
+
+                if chunk and not result.cancelled:
+                    self.insert_chunk(connection, chunk, reader.fieldnames, result)
+            finally:
+                if self.rejected_file:
+                    self.rejected_file.close()
+
+        if self.progress:
+            self.progress(1.0, result.inserted, result.rejected)
+        if result.rejected:
+            result.rejected_path = self.rejected_path
+        return result
+
+    def load_cities(self, connection):
+        # Una ciudad puede escribirse como "Ciudad", "Ciudad (Departamento)" o con su id;
+        # un nombre repetido en varios departamentos queda ambiguo (None)
+        cursor = connection.cursor()
+        cursor.execute("SELECT id_ciudad, ciudad, departamento FROM ciudades")
+        for city_id, city, department in cursor.fetchall():
+            self.known_city_ids.add(city_id)
+            self.city_by_name[collation_key(f"{city} ({department})")] = city_id
+            name = collation_key(city)
+            self.city_by_name[name] = None if name in self.city_by_name else city_id
+        cursor.close()
+
+    def sniff_dialect(self, text):
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            return csv.excel
+
+    def map_columns(self, fieldnames):
+        by_key = {header_key(name): name for name in fieldnames}
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            columns[field] = next((by_key[alias] for alias in aliases if alias in by_key), None)
+        missing = [field for field, column in columns.items() if column is None and field != 'email']
+        if missing:
+            raise ValueError(f"Faltan columnas en el archivo: {', '.join(missing)}")
+        return columns
+
+    def resolve_city(self, value, label):
+        value = (value or "").strip()
+        if not value:
+            raise RowRejected(f"{label} vacía")
+        if value.isdigit():
+            if int(value) not in self.known_city_ids:
+                raise RowRejected(f"{label} con id desconocido: {value}")
+            return int(value)
+        key = collation_key(value)
+        if key not in self.city_by_name:
+            raise RowRejected(f"{label} desconocida: {value}")
+        if self.city_by_name[key] is None:
+            raise RowRejected(f"{label} ambigua, indique el departamento: {value}")
+        return self.city_by_name[key]
+
+    def to_dto(self, row, columns):
+        def value(field):
+            column = columns[field]
+            return (row.get(column) or "").strip() if column else ""
+
+        for field, label in [('nombre', "Nombre"), ('identificacion', "Identificación"),
+                             ('numero_de_contacto', "Número de contacto")]:
+            if not value(field):
+                raise RowRejected(f"{label} vacío")
+
+        email = value('email')
+        if email and "@" not in email:
+            raise RowRejected(f"Email inválido: {email}")
+
+        reason = self.reasons.get(collation_key(value('motivo_desplazamiento')))
+        if not reason:
+            raise RowRejected(f"Motivo de desplazamiento desconocido: {value('motivo_desplazamiento')}")
+
+        return RefugiadoDTO(
+            nombre=value('nombre'),
+            identificacion=value('identificacion'),
+            numero_de_contacto=value('numero_de_contacto'),
+            email=email or None,
+            id_ciudad_despiazamiento=self.resolve_city(value('ciudad_desplazamiento'), "Ciudad de desplazamiento"),
+            motivo_despiazamiento=reason,
+            id_ciudad_refugio=self.resolve_city(value('ciudad_refugio'), "Ciudad de refugio")
+        )
+
+    def insert_chunk(self, connection, chunk, fieldnames, result):
+        try:
+            try:
+                self.repository.bulk_insert(connection, [refugee for _, _, refugee in chunk], len(chunk))
+                if self.duplicate_detector:
+                    self.duplicate_detector.index_inserted(
+                        connection, [refugee.identificacion for _, _, refugee in chunk], len(chunk))
+                connection.commit()
+                result.inserted += len(chunk)
+            except (IntegrityError, DataError):
+                # Alguna fila del bloque viola una restricción: se reintenta fila por
+                # fila para insertar las válidas y rechazar solo las que fallan
+                connection.rollback()
+                inserted = []
+                rejected = []
+                for line_number, row, refugee in chunk:
+                    try:
+                        inserted.append((self.repository.insert(connection, refugee), refugee.nombre))
+                    except (IntegrityError, DataError) as e:
+                        rejected.append((line_number, row, f"Error de base de datos: {e.msg}"))
+                if self.duplicate_detector:
+                    self.duplicate_detector.index_many(connection, inserted, len(chunk))
+                connection.commit()
+                result.inserted += len(inserted)
+                for line_number, row, reason in rejected:
+                    self.reject(fieldnames, line_number, row, reason, result)
+        except Error as e:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+            if result.rejected:
+                result.rejected_path = self.rejected_path
+            raise ImportInterrupted(result, chunk[0][0], e) from e
+
+    def reject(self, fieldnames, line_number, row, reason, result):
+        if not self.rejected_writer:
+            self.rejected_file = open(self.rejected_path, 'w', encoding='utf-8-sig', newline='')
+            self.rejected_writer = csv.DictWriter(
+                self.rejected_file, fieldnames=["fila", *fieldnames, "motivo_rechazo"], extrasaction='ignore'
+            )
+            self.rejected_writer.writeheader()
+        self.rejected_writer.writerow({**row, "fila": line_number, "motivo_rechazo": reason})
+        result.rejected += 1
@@ -1,33 +1,541 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import mysql.connector
+from tkinter import ttk, messagebox, filedialog
+import bisect
+import numbers
+import threading
+import time
 from mysql.connector import Error
 import configparser
-from dataclasses import dataclass
-
-# Clases DTO (Data Transfer Objects)
-@dataclass
-class RefugiadoDTO:
-    id_refugiado: int = None
-    nombre: str = None
-    identificacion: str = None
-    numero_de_contacto: str = None
-    email: str = None
-    id_ciudad_despiazamiento: int = None
-    motivo_despiazamiento: str = None
-    id_ciudad_refugio: int = None
-
-@dataclass
-class VoluntarioDTO:
-    id_voluntario: int = None
-    nombre: str = None
-    identificacion: str = None
-    id_ciudad: int = None
-    id_albergue: int = None
-    profesion: str = None
+from change_feed import ChangeFeed
+from database import DatabaseWorker, QueryCancelled, SQLiteConnectionPool, collation_key, create_pool
+from duplicates import DuplicateDetector
+from exporter import QueryExporter
+from importer import ImportInterrupted, RefugeeImporter
+from migrations import MIGRATIONS_DIRS, MigrationRunner
+from profiling import DEFAULT_CAPACITY, QueryProfiler, StartupTimer, job_origin
+from report_cache import ReportCache
+from shelter_assignment import PlanOutdated, ShelterAssignment
+from write_journal import WriteJournal, is_connectivity_error
+from repositories import (
+    CityRepository, RefugeeRepository, ReportRepository, ShelterRepository, VolunteerRepository
+)
+from models import MOTIVOS_DESPLAZAMIENTO, AlbergueDTO, CiudadDTO, RefugiadoDTO, VoluntarioDTO
+from queries import (
+    CITIES_SELECT, REFUGEES_SELECT, SHELTERS_SELECT, VOLUNTEERS_SELECT
+)
+
+# Cantidad de filas que se piden al servidor por cada página de las tablas
+PAGE_SIZE = 200
+
+# Espera desde la última tecla antes de lanzar una búsqueda (ms)
+SEARCH_DEBOUNCE_MS = 300
+
+# Espera entre intentos de reenviar las escrituras pendientes (ms)
+JOURNAL_RETRY_MS = 15000
+
+# Espera entre consultas al registro de cambios de otros clientes (ms)
+CHANGE_POLL_MS = 3000
+
+# Sentencias que muestra el panel de rendimiento (las más lentas por p95)
+PERFORMANCE_ROWS = 50
+
+# Tiempo máximo que se insertan filas en un Treeview antes de ceder el control (ms)
+RENDER_SLICE_MS = 15
+
+
+class CityCatalog:
+    # Catálogo de ciudades compartido por todos los combobox. Se consulta una sola
+    # vez y solo se vuelve a cargar cuando se agrega, modifica o elimina una ciudad.
+    def __init__(self, repository):
+        self.repository = repository
+        self.labels = []
+        self.label_by_id = {}
+        self.id_by_label = {}
+        self.loaded = False
+    
+    def fetch(self, connection):
+        return self.repository.options(connection)
+    
+    def set_cities(self, cities):
+        self.labels = [f"{city[0]} - {city[1]} ({city[2]})" for city in cities]
+        self.label_by_id = {city[0]: label for city, label in zip(cities, self.labels)}
+        self.id_by_label = {label: city_id for city_id, label in self.label_by_id.items()}
+        self.loaded = True
+    
+    def invalidate(self):
+        self.loaded = False
+    
+    def label(self, city_id):
+        return self.label_by_id.get(city_id, "")
+    
+    def city_id(self, label):
+        return self.id_by_label.get(label)
+
+class KeysetPager:
+    # Carga paginada de un Treeview usando keyset pagination: cada página se pide
+    # a partir de la clave de orden de la última fila mostrada, y la siguiente se
+    # solicita cuando la barra de desplazamiento se acerca al final. Las consultas
+    # corren en el DatabaseWorker bajo la acción indicada.
+    # row_key devuelve (nombre, id); el id se usa como iid de la fila en el
+    # Treeview para poder insertarla, actualizarla o quitarla en su lugar.
+    # fetch_page y count_rows reciben además el texto de búsqueda activo.
+    # origin es el método de la ventana dueño de la tabla (load_refugees, ...): el
+    # perfilador le atribuye las consultas de las páginas en lugar de al pager.
+    def __init__(self, worker, action, table, scrollbar, count_label, fetch_page, count_rows,
+                 row_key, row_values, noun, on_error, origin=None, page_size=PAGE_SIZE, threshold=0.9):
+        self.worker = worker
+        self.action = action
+        self.origin = origin
+        self.table = table
+        self.scrollbar = scrollbar
+        self.count_label = count_label
+        self.fetch_page = fetch_page
+        self.count_rows = count_rows
+        self.row_key = row_key
+        self.row_values = row_values
+        self.noun = noun
+        self.on_error = on_error
+        self.page_size = page_size
+        self.threshold = threshold
+        
+        self.last_key = None
+        self.loaded = 0
+        self.total = 0
+        self.exhausted = False
+        self.loading = False
+        self.search = ""
+        
+        # Claves de orden de las filas cargadas, en el mismo orden que el Treeview,
+        # y la fila original de cada una (con los id de las llaves foráneas)
+        self.sort_keys = []
+        self.sort_key_by_iid = {}
+        self.rows = {}
+        
+        # Callbacks de una sola vez para cuando llegue la próxima primera página
+        self.loaded_callbacks = []
+        
+        self.table.configure(yscrollcommand=self.on_scroll)
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= self.threshold:
+            self.load_next_page()
+    
+    def set_search(self, search):
+        self.search = search
+        self.reset()
+    
+    def reset(self):
+        # Una recarga deja obsoleta cualquier página que todavía esté en camino
+        self.loading = True
+        search = self.search
+        
+        def job(connection):
+            return self.count_rows(connection, search), self.fetch_page(connection, None, self.page_size, search)
+        
+        self.worker.submit(self.action, job, self.on_first_page, self.on_load_error, origin=self.origin)
+    
+    def on_first_page(self, result):
+        self.total, rows = result
+        self.table.delete(*self.table.get_children())
+        self.last_key = None
+        self.loaded = 0
+        self.sort_keys = []
+        self.sort_key_by_iid = {}
+        self.rows = {}
+        self.append_rows(rows)
+        
+        callbacks, self.loaded_callbacks = self.loaded_callbacks, []
+        for callback in callbacks:
+            callback()
+    
+    def when_loaded(self, callback):
+        self.loaded_callbacks.append(callback)
+    
+    def load_next_page(self):
+        if self.loading or self.exhausted:
+            return
+        self.loading = True
+        after_key = self.last_key
+        search = self.search
+        self.worker.submit(
+            self.action,
+            lambda connection: self.fetch_page(connection, after_key, self.page_size, search),
+            self.append_rows, self.on_load_error, origin=self.origin
+        )
+    
+    def append_rows(self, rows):
+        for row in rows:
+            key = self.row_key(row)
+            iid = str(key[1])
+            if self.table.exists(iid):
+                continue
+            self.table.insert("", "end", iid=iid, values=self.row_values(row))
+            sort_key = self.sort_key(key)
+            self.sort_keys.append(sort_key)
+            self.sort_key_by_iid[iid] = sort_key
+            self.rows[iid] = row
+            self.loaded += 1
+        if rows:
+            self.last_key = self.row_key(rows[-1])
+        self.exhausted = len(rows) < self.page_size
+        self.loading = False
+        self.update_count_label()
+    
+    def sort_key(self, key):
+        name, row_id = key
+        return (collation_key(name), row_id)
+    
+    def upsert_row(self, row, count=True):
+        # Inserta o actualiza una sola fila en su posición según el orden de la tabla
+        key = self.row_key(row)
+        iid = str(key[1])
+        sort_key = self.sort_key(key)
+        
+        if self.table.exists(iid):
+            selected = iid in self.table.selection()
+            self.detach_row(iid)
+        else:
+            selected = False
+            if count:
+                self.total += 1
+        
+        # Si la fila cae después de lo ya cargado, llegará con su página al desplazarse
+        if not self.exhausted and (not self.sort_keys or sort_key > self.sort_keys[-1]):
+            self.update_count_label()
+            return
+        
+        position = bisect.bisect_left(self.sort_keys, sort_key)
+        self.sort_keys.insert(position, sort_key)
+        self.sort_key_by_iid[iid] = sort_key
+        self.rows[iid] = row
+        self.table.insert("", position, iid=iid, values=self.row_values(row))
+        self.loaded += 1
+        
+        if selected:
+            self.table.selection_set(iid)
+            self.table.focus(iid)
+        self.update_count_label()
+    
+    def refresh_row(self, row_id, row):
+        # Aplica el resultado de una escritura: la fila releída o None si ya no existe
+        if row:
+            self.upsert_row(row)
+        else:
+            self.remove_row(row_id)
+    
+    def remove_row(self, row_id):
+        iid = str(row_id)
+        if self.table.exists(iid):
+            self.detach_row(iid)
+        self.total = max(self.total - 1, 0)
+        self.update_count_label()
+    
+    def apply_changes(self, row_ids, rows, total):
+        # Cambios de otros clientes: rows son las filas actuales de row_ids que
+        # cumplen la búsqueda; esas se colocan en su lugar y el resto se quita.
+        # total es el conteo recalculado en la misma consulta.
+        current = {str(self.row_key(row)[1]): row for row in rows}
+        for row_id in row_ids:
+            iid = str(row_id)
+            if iid in current:
+                self.upsert_row(current[iid], count=False)
+            elif self.table.exists(iid):
+                self.detach_row(iid)
+        self.total = total
+        self.update_count_label()
+    
+    def remove_rows(self, row_ids, removed):
+        # Resultado de un borrado por lotes: un solo delete en el Treeview
+        iids = [str(row_id) for row_id in row_ids if self.table.exists(str(row_id))]
+        self.table.delete(*iids)
+        removed_keys = {self.sort_key_by_iid.pop(iid, None) for iid in iids}
+        self.sort_keys = [key for key in self.sort_keys if key not in removed_keys]
+        for iid in iids:
+            self.rows.pop(iid, None)
+        self.loaded -= len(iids)
+        self.total = max(self.total - removed, 0)
+        self.update_count_label()
+    
+    def detach_row(self, iid):
+        self.table.delete(iid)
+        self.loaded -= 1
+        self.rows.pop(iid, None)
+        sort_key = self.sort_key_by_iid.pop(iid, None)
+        if sort_key is None:
+            return
+        position = bisect.bisect_left(self.sort_keys, sort_key)
+        if position < len(self.sort_keys) and self.sort_keys[position] == sort_key:
+            del self.sort_keys[position]
+    
+    def on_load_error(self, error):
+        self.loading = False
+        self.on_error(error)
+    
+    def update_count_label(self):
+        found = " encontrados" if self.search else ""
+        self.count_label.configure(text=f"Mostrando {self.loaded} de {self.total} {self.noun}{found}")
+
+class ProgressDialog:
+    # Ventana con barra de progreso y botón Cancelar para tareas largas del worker.
+    # report() puede llamarse desde cualquier hilo: solo guarda el último avance,
+    # que la ventana recoge periódicamente con after.
+    def __init__(self, root, title):
+        self.root = root
+        self.cancel_event = threading.Event()
+        self.fraction = 0.0
+        self.message = ""
+        self.closed = False
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.transient(root)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        self.label = ttk.Label(self.window, text="Iniciando...", width=50)
+        self.label.pack(padx=10, pady=(10, 5))
+        self.progress_bar = ttk.Progressbar(self.window, length=350, mode="determinate", maximum=100)
+        self.progress_bar.pack(padx=10, pady=5)
+        self.cancel_button = ttk.Button(self.window, text="Cancelar", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 10))
+        
+        self.refresh()
+    
+    def report(self, fraction, message):
+        self.fraction = fraction
+        self.message = message
+    
+    def refresh(self):
+        if self.closed:
+            return
+        self.progress_bar['value'] = self.fraction * 100
+        if self.message:
+            self.label.configure(text=self.message)
+        self.root.after(100, self.refresh)
+    
+    def cancel(self):
+        self.cancel_event.set()
+        self.cancel_button.configure(state="disabled")
+        self.label.configure(text="Cancelando...")
+    
+    def close(self):
+        self.closed = True
+        self.window.destroy()
+
+class ChoiceDialog:
+    # Ventana modal con una lista desplegable; choose() devuelve la opción
+    # elegida o None si se cancela
+    def __init__(self, root, title, prompt, values):
+        self.result = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.transient(root)
+        
+        ttk.Label(self.window, text=prompt, justify="left").pack(padx=10, pady=(10, 5), anchor="w")
+        self.choice = ttk.Combobox(self.window, values=values, state="readonly", width=50)
+        self.choice.pack(padx=10, pady=5)
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(pady=(5, 10))
+        ttk.Button(button_frame, text="Aceptar", command=self.accept).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Cancelar", command=self.window.destroy).pack(side="left", padx=5)
+    
+    def choose(self):
+        self.window.grab_set()
+        self.window.wait_window()
+        return self.result
+    
+    def accept(self):
+        self.result = self.choice.get() or None
+        self.window.destroy()
+
+class ChunkedRenderer:
+    # Llena un Treeview por tramos con after para que la interfaz siga
+    # respondiendo con resultados grandes: cada tramo inserta filas hasta agotar
+    # slice_ms y cede el control. render() vacía la tabla en una sola llamada y
+    # descarta el llenado anterior que siga en curso.
+    def __init__(self, table, slice_ms=RENDER_SLICE_MS):
+        self.table = table
+        self.slice_ms = slice_ms
+        self.pending = None
+        self.row_values = None
+        self.job = None
+    
+    def render(self, rows, row_values):
+        self.cancel()
+        self.table.delete(*self.table.get_children())
+        self.pending = iter(rows)
+        self.row_values = row_values
+        self.fill()
+    
+    def fill(self):
+        self.job = None
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        for row in self.pending:
+            self.table.insert("", "end", values=self.row_values(row))
+            if time.perf_counter() >= deadline:
+                self.job = self.table.after(1, self.fill)
+                return
+        self.pending = None
+    
+    def cancel(self):
+        if self.job:
+            self.table.after_cancel(self.job)
+            self.job = None
+        self.pending = None
+
+class ReportGrid:
+    # Resultado de un reporte como tabla: cada reporte define sus columnas y las
+    # filas se pintan con ChunkedRenderer. Un clic en el encabezado ordena por esa
+    # columna (números como números, texto como lo ordena MySQL) y otro clic
+    # invierte el orden.
+    def __init__(self, parent):
+        self.title_label = ttk.Label(parent, text="", anchor="w")
+        self.title_label.pack(fill="x", padx=10, pady=(10, 0))
+        
+        frame = ttk.Frame(parent)
+        frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.table = ttk.Treeview(frame, show="headings")
+        y_scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.table.yview)
+        x_scrollbar = ttk.Scrollbar(frame, orient="horizontal", command=self.table.xview)
+        self.table.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        y_scrollbar.pack(side="right", fill="y")
+        x_scrollbar.pack(side="bottom", fill="x")
+        self.table.pack(side="left", fill="both", expand=True)
+        
+        self.renderer = ChunkedRenderer(self.table)
+        self.columns = ()
+        self.rows = []
+        self.sorted_by = None
+    
+    def show(self, title, columns, rows):
+        # columns: (encabezado, ancho) por columna; rows: tuplas en ese orden
+        self.title_label.configure(text=title)
+        self.columns = tuple(heading for heading, _ in columns)
+        self.rows = list(rows)
+        self.sorted_by = None
+        
+        self.renderer.cancel()
+        self.table.configure(columns=self.columns)
+        for index, (heading, width) in enumerate(columns):
+            numeric = bool(self.rows) and isinstance(self.rows[0][index], numbers.Number)
+            self.table.heading(heading, text=heading, command=lambda index=index: self.sort_by(index))
+            self.table.column(heading, width=width, minwidth=60, anchor="center" if numeric else "w")
+        self.renderer.render(self.rows, lambda row: row)
+    
+    def sort_by(self, index):
+        descending = self.sorted_by == (index, False)
+        self.rows.sort(key=lambda row: self.sort_key(row[index]), reverse=descending)
+        self.sorted_by = (index, descending)
+        
+        for position, heading in enumerate(self.columns):
+            arrow = (" ▼" if descending else " ▲") if position == index else ""
+            self.table.heading(heading, text=heading + arrow)
+        self.renderer.render(self.rows, lambda row: row)
+    
+    def sort_key(self, value):
+        if value is None:
+            return (2, "")
+        if isinstance(value, numbers.Number):
+            return (0, value)
+        return (1, collation_key(value))
+
+class PreviewDialog:
+    # Ventana modal con lo que se va a escribir en una ReportGrid; confirm()
+    # devuelve True solo si se acepta
+    def __init__(self, root, title, summary, columns, rows, accept_text="Aplicar"):
+        self.result = False
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("900x500")
+        self.window.transient(root)
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(side="bottom", pady=(0, 10))
+        ttk.Button(button_frame, text=accept_text, command=self.accept).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Cancelar", command=self.window.destroy).pack(side="left", padx=5)
+        
+        ReportGrid(self.window).show(summary, columns, rows)
+    
+    def confirm(self):
+        self.window.grab_set()
+        self.window.wait_window()
+        return self.result
+    
+    def accept(self):
+        self.result = True
+        self.window.destroy()
+
+class DuplicateReview:
+    # Ventana con la cola de posibles duplicados, un par por fila. on_merge y
+    # on_dismiss reciben la fila elegida; la ventana no toca la base de datos.
+    columns = ("Puntaje", "Motivo", "ID A", "Nombre A", "Identificación A", "ID B", "Nombre B", "Identificación B")
+    
+    def __init__(self, root, summary, on_merge, on_dismiss):
+        self.window = tk.Toplevel(root)
+        self.window.title("Posibles duplicados")
+        self.window.geometry("1000x450")
+        self.window.transient(root)
+        
+        self.summary_label = ttk.Label(self.window, text=summary, anchor="w")
+        self.summary_label.pack(fill="x", padx=10, pady=(10, 0))
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(side="bottom", pady=(0, 10))
+        ttk.Button(button_frame, text="Misma persona (eliminar B)",
+                  command=lambda: self.with_selected(on_merge)).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Personas distintas",
+                  command=lambda: self.with_selected(on_dismiss)).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Cerrar", command=self.window.destroy).pack(side="left", padx=5)
+        
+        frame = ttk.Frame(self.window)
+        frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.table = ttk.Treeview(frame, columns=self.columns, show="headings", selectmode="browse")
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=90, anchor="center")
+        for col in ("Motivo", "Nombre A", "Nombre B"):
+            self.table.column(col, width=180, anchor="w")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+        
+        self.rows = {}
+    
+    def show(self, rows):
+        # rows: (id_candidato, puntaje, motivo, id_a, nombre_a, identificación_a, id_b, nombre_b, identificación_b)
+        for row in rows:
+            self.rows[str(row[0])] = row
+            self.table.insert("", "end", iid=str(row[0]), values=row[1:])
+    
+    def with_selected(self, callback):
+        iid = self.table.focus()
+        if not iid:
+            messagebox.showwarning("Advertencia", "Seleccione un par", parent=self.window)
+            return
+        callback(self, self.rows[iid])
+    
+    def remove_refugee(self, refugee_id):
+        # Quita los pares en los que aparece un refugiado ya eliminado
+        for iid, row in list(self.rows.items()):
+            if refugee_id in (row[3], row[6]):
+                self.remove(iid)
+    
+    def remove(self, iid):
+        self.rows.pop(str(iid), None)
+        if self.table.exists(str(iid)):
+            self.table.delete(str(iid))
 
 class RefugeeManagementApp:
     def __init__(self, root):
+        # Fases del arranque, para el reporte de inicio del panel de rendimiento
+        self.startup_timer = StartupTimer()
+        
         self.root = root
         self.root.title("Sistema de Gestión de Refugiados - Integrado con MySQL Workbench")
         self.root.geometry("1200x800")
@@ -35,34 +543,196 @@ class RefugeeManagementApp:
         # Cargar configuración de la base de datos
         self.config = configparser.ConfigParser()
         self.config.read('config.ini')
+        self.startup_timer.mark("configuración")
+        
+        # Tiempos de cada sentencia, para el panel de rendimiento
+        self.query_profiler = QueryProfiler(
+            self.config['mysql'].getint('profile_buffer', fallback=DEFAULT_CAPACITY)
+        )
         
         # Conectar a la base de datos
-        self.db_connection = self.connect_to_database()
-        if not self.db_connection:
+        self.db_pool = self.connect_to_database()
+        if not self.db_pool:
             messagebox.showerror("Error", "No se pudo conectar a la base de datos. Verifica config.ini")
             self.root.destroy()
             return
+        self.startup_timer.mark("conexión")
+        
+        # Resultados de reportes, invalidados por versión de tabla
+        self.report_cache = ReportCache()
+        self.procedure_call = None
+        
+        # Altas hechas sin conexión, pendientes de enviar al servidor
+        self.write_journal = WriteJournal(
+            self.config['mysql'].get('journal_path', fallback='escrituras_pendientes.jsonl')
+        )
+        self.journal_replay_job = None
+        
+        # Escrituras de otros clientes, aplicadas fila por fila a las vistas abiertas
+        self.change_feed = ChangeFeed()
+        self.change_poll_ms = self.config['mysql'].getint('change_poll_ms', fallback=CHANGE_POLL_MS)
+        
+        # Acceso a datos, compartido con la importación y los scripts por lotes
+        dialect = self.db_pool.dialect
+        self.refugee_repository = RefugeeRepository(dialect=dialect)
+        self.shelter_repository = ShelterRepository(dialect=dialect)
+        self.city_repository = CityRepository(dialect=dialect)
+        self.volunteer_repository = VolunteerRepository(dialect=dialect)
+        self.report_repository = ReportRepository(dialect)
+        self.shelter_assignment = ShelterAssignment()
+        self.duplicate_detector = DuplicateDetector()
+        
+        # Catálogos para los combobox
+        self.city_catalog = CityCatalog(self.city_repository)
+        self.shelter_label_by_id = {}
+        self.shelter_id_by_label = {}
+        self.shelter_city_by_id = {}
+        self.shelter_values_by_city = {}
+        
+        # Barra de estado con las acciones en curso
+        status_bar = ttk.Frame(self.root)
+        status_bar.pack(side="bottom", fill="x")
+        self.status_label = ttk.Label(status_bar, text="Listo", anchor="w", relief="sunken")
+        self.status_label.pack(side="left", fill="x", expand=True)
+        self.journal_label = ttk.Label(status_bar, anchor="e", relief="sunken")
+        self.update_journal_status()
+        
+        # Todas las consultas se ejecutan en segundo plano
+        self.db_worker = DatabaseWorker(self.root, self.db_pool, on_busy_change=self.show_busy_actions)
         
         # Crear pestañas
         self.create_tabs()
+        self.mark_startup("interfaz")
+        
+        # La ventana responde en cuanto Tk procesa los eventos pendientes; los
+        # datos llegan después desde el worker
+        self.root.after_idle(self.mark_startup, "ventana lista")
+        
+        # Actualizar el esquema (si está habilitado) y cargar datos iniciales
+        if self.config['mysql'].getboolean('auto_migrate', fallback=True):
+            self.apply_migrations()
+        else:
+            self.load_initial_data()
+    
+    def apply_migrations(self):
+        def job(connection):
+            return MigrationRunner(connection, MIGRATIONS_DIRS[self.db_pool.dialect]).apply_pending(
+                log=lambda message: None)
+        
+        def failed(e):
+            messagebox.showerror(
+                "Error",
+                f"Error al aplicar migraciones del esquema: {e}\n\n"
+                "Si los scripts de sql/ ya se ejecutaron a mano, regístrelos con:\n"
+                "python migrations.py --mark-applied <versión>"
+            )
+            self.load_initial_data()
         
-        # Cargar datos iniciales
-        self.load_initial_data()
+        self.db_worker.submit(
+            "Aplicando migraciones", job, lambda applied: self.load_initial_data(), failed,
+            supersede=False
+        )
     
     def connect_to_database(self):
+        section = self.config['mysql']
         try:
-            connection = mysql.connector.connect(
-                host=self.config['mysql']['host'],
-                user=self.config['mysql']['user'],
-                password=self.config['mysql']['password'],
-                database=self.config['mysql']['database'],
-                port=self.config['mysql']['port']
-            )
-            return connection
+            pool = create_pool(section, self.query_profiler)
+            # Abrir la primera conexión ahora para validar la configuración
+            pool.release(pool.checkout())
+            return pool
+        except Error as e:
+            if section.get('backend', fallback='mysql') == 'sqlite':
+                messagebox.showerror("Error de conexión", f"Error al abrir la base local: {e}")
+                return None
+            # Sin servidor alcanzable se puede seguir trabajando con la base local
+            local_path = section.get('sqlite_path', fallback='refugiados.db')
+            if not messagebox.askyesno(
+                "Error de conexión",
+                f"Error al conectar a MySQL Workbench: {e}\n\n"
+                f"¿Desea trabajar con la base local {local_path}?"
+            ):
+                return None
+        try:
+            pool = SQLiteConnectionPool.from_config(section, self.query_profiler)
+            pool.release(pool.checkout())
+            return pool
         except Error as e:
-            messagebox.showerror("Error de conexión", f"Error al conectar a MySQL Workbench: {e}")
+            messagebox.showerror("Error de conexión", f"Error al abrir la base local: {e}")
             return None
     
+    def show_busy_actions(self, actions):
+        if actions:
+            self.status_label.configure(text="En curso: " + ", ".join(actions) + "...")
+            self.root.configure(cursor="watch")
+        else:
+            self.status_label.configure(text="Listo")
+            self.root.configure(cursor="")
+    
+    def update_journal_status(self):
+        pending = self.write_journal.pending
+        self.journal_label.configure(text=f"Escrituras pendientes: {pending}" if pending else "")
+        if pending:
+            self.journal_label.pack(side="right", before=self.status_label)
+        else:
+            self.journal_label.pack_forget()
+    
+    def save_offline(self, table, dto, noun):
+        # Se llama cuando un alta falló por falta de conexión
+        try:
+            self.write_journal.append(table, dto)
+        except OSError as e:
+            messagebox.showerror("Error", f"Error al guardar {noun} sin conexión: {e}")
+            return False
+        self.update_journal_status()
+        self.schedule_journal_replay()
+        messagebox.showwarning(
+            "Sin conexión",
+            f"No hay conexión con la base de datos. El {noun} se guardó localmente "
+            "y se enviará cuando vuelva la conexión."
+        )
+        return True
+    
+    def schedule_journal_replay(self):
+        if self.write_journal.pending and self.journal_replay_job is None:
+            self.journal_replay_job = self.root.after(JOURNAL_RETRY_MS, self.replay_journal)
+    
+    def replay_journal(self):
+        self.journal_replay_job = None
+        if not self.write_journal.pending:
+            return
+        
+        repositories = {"refugiados": self.refugee_repository, "voluntarios": self.volunteer_repository}
+        
+        def job(connection):
+            result = self.write_journal.replay(connection, repositories, self.duplicate_detector)
+            if result and result[0]:
+                self.report_cache.bump(*repositories)
+            return result
+        
+        def done(result):
+            self.update_journal_status()
+            if result is None:
+                return
+            inserted, skipped, rejected = result
+            if inserted:
+                self.reload_tab(self.tab_refugees)
+                self.reload_tab(self.tab_volunteers)
+            if rejected:
+                messagebox.showwarning(
+                    "Escrituras pendientes",
+                    f"{rejected} registros guardados sin conexión fueron rechazados por la base de datos. "
+                    f"Revíselos en {self.write_journal.rejected_path}"
+                )
+        
+        def failed(e):
+            self.update_journal_status()
+            if is_connectivity_error(e):
+                self.schedule_journal_replay()
+            else:
+                messagebox.showerror("Error", f"Error al enviar escrituras pendientes: {e}")
+        
+        self.db_worker.submit("Enviando escrituras pendientes", job, done, failed)
+    
     def create_tabs(self):
         self.tab_control = ttk.Notebook(self.root)
         
@@ -87,6 +757,40 @@ class RefugeeManagementApp:
         self.setup_cities_tab()
         self.setup_volunteers_tab()
         self.setup_reports_tab()
+        
+        # Cada pestaña carga su tabla la primera vez que se muestra, así el arranque
+        # no depende del tamaño de las tablas. Se habilita al terminar las migraciones.
+        self.tab_loaders = {
+            str(self.tab_refugees): (self.refugees_pager, self.refugee_repository, self.load_refugees),
+            str(self.tab_shelters): (self.shelters_pager, self.shelter_repository, self.load_shelters),
+            str(self.tab_cities): (self.cities_pager, self.city_repository, self.load_cities_table),
+            str(self.tab_volunteers): (self.volunteers_pager, self.volunteer_repository, self.load_volunteers),
+        }
+        self.loaded_tabs = set()
+        self.data_ready = False
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+    
+    def on_tab_changed(self, event=None):
+        if self.data_ready:
+            self.load_tab(self.tab_control.select())
+    
+    def load_tab(self, tab):
+        tab = str(tab)
+        if tab in self.loaded_tabs or tab not in self.tab_loaders:
+            return
+        self.loaded_tabs.add(tab)
+        pager, _, loader = self.tab_loaders[tab]
+        pager.when_loaded(lambda: self.mark_startup("primera pestaña"))
+        loader()
+    
+    def reload_tab(self, tab):
+        # Las pestañas que aún no se abrieron cargarán los datos nuevos al mostrarse
+        if str(tab) in self.loaded_tabs:
+            self.tab_loaders[str(tab)][2]()
+    
+    def mark_startup(self, phase):
+        if self.startup_timer.mark(phase):
+            self.startup_label.configure(text="Inicio: " + self.startup_timer.summary())
     
     def setup_refugees_tab(self):
         # Frame para formulario
@@ -115,24 +819,34 @@ class RefugeeManagementApp:
         self.displacement_city.grid(row=4, column=1, padx=5, pady=5, sticky="w")
         
         ttk.Label(form_frame, text="Motivo de desplazamiento:").grid(row=5, column=0, padx=5, pady=5, sticky="e")
-        self.displacement_reason = ttk.Combobox(form_frame, state="readonly", values=[
-            "Conflicto armado", "Desastres naturales", "Violencia social", 
-            "Persecución política", "Desplazamiento forzado por bandas"
-        ])
+        self.displacement_reason = ttk.Combobox(form_frame, state="readonly", values=MOTIVOS_DESPLAZAMIENTO)
         self.displacement_reason.grid(row=5, column=1, padx=5, pady=5, sticky="w")
         
         ttk.Label(form_frame, text="Ciudad de refugio:").grid(row=6, column=0, padx=5, pady=5, sticky="e")
         self.refuge_city = ttk.Combobox(form_frame, state="readonly")
         self.refuge_city.grid(row=6, column=1, padx=5, pady=5, sticky="w")
+        self.refuge_city.bind("<<ComboboxSelected>>", self.on_refuge_city_change)
+        
+        ttk.Label(form_frame, text="Albergue:").grid(row=7, column=0, padx=5, pady=5, sticky="e")
+        self.refugee_shelter = ttk.Combobox(form_frame, state="readonly")
+        self.refugee_shelter.grid(row=7, column=1, padx=5, pady=5, sticky="w")
         
         # Botones CRUD
         button_frame = ttk.Frame(form_frame)
-        button_frame.grid(row=7, column=0, columnspan=2, pady=10)
+        button_frame.grid(row=8, column=0, columnspan=2, pady=10)
         
         ttk.Button(button_frame, text="Agregar", command=self.add_refugee).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Actualizar", command=self.update_refugee).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Eliminar", command=self.delete_refugee).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Limpiar", command=self.clear_refugee_form).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Exportar", command=self.export_refugees).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reasignar ciudad", 
+                  command=self.reassign_refugees_city).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reasignar albergue", 
+                  command=self.reassign_refugees_shelter).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Importar CSV", command=self.import_refugees).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Asignar albergues", command=self.assign_shelters).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Duplicados", command=self.find_duplicates).pack(side="left", padx=5)
         
         # Tabla de refugiados
         table_frame = ttk.LabelFrame(self.tab_refugees, text="Lista de Refugiados")
@@ -141,7 +855,7 @@ class RefugeeManagementApp:
         columns = ("ID", "Nombre", "Identificación", "Contacto", "Email", 
                  "Ciudad Origen", "Motivo", "Ciudad Refugio", "Albergue")
         
-        self.refugees_table = ttk.Treeview(table_frame, columns=columns, show="headings")
+        self.refugees_table = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
         
         for col in columns:
             self.refugees_table.heading(col, text=col)
@@ -151,11 +865,37 @@ class RefugeeManagementApp:
         self.refugees_table.column("Motivo", width=180)
         
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.refugees_table.yview)
-        self.refugees_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Búsqueda por nombre o identificación
+        search_frame = ttk.Frame(table_frame)
+        search_frame.pack(side="top", fill="x", padx=5, pady=5)
+        ttk.Label(search_frame, text="Buscar (nombre o identificación):").pack(side="left")
+        self.refugee_search_var = tk.StringVar()
+        self.refugee_search_var.trace_add("write", self.on_refugee_search_change)
+        ttk.Entry(search_frame, textvariable=self.refugee_search_var, width=40).pack(side="left", padx=5)
+        ttk.Button(search_frame, text="Limpiar búsqueda",
+                   command=lambda: self.refugee_search_var.set("")).pack(side="left")
+        self.refugee_search_job = None
+        
+        # Indicador de filas cargadas / total
+        refugees_count_label = ttk.Label(table_frame)
+        refugees_count_label.pack(side="bottom", fill="x", padx=5)
         
         self.refugees_table.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
+        # Carga paginada de la tabla
+        self.refugees_pager = KeysetPager(
+            self.db_worker, "Cargando refugiados", self.refugees_table, scrollbar, refugees_count_label,
+            fetch_page=self.refugee_repository.fetch_page,
+            count_rows=self.refugee_repository.count,
+            row_key=lambda refugee: (refugee['nombre'], refugee['id_refugiado']),
+            row_values=self.refugee_row_values,
+            noun="refugiados",
+            on_error=lambda e: messagebox.showerror("Error", f"Error al cargar refugiados: {e}"),
+            origin=job_origin(self.load_refugees)
+        )
+        
         # Configurar evento de selección
         self.refugees_table.bind("<<TreeviewSelect>>", self.on_refugee_select)
 
@@ -192,14 +932,17 @@ class RefugeeManagementApp:
         ttk.Button(button_frame, text="Actualizar", command=self.update_shelter).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Eliminar", command=self.delete_shelter).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Limpiar", command=self.clear_shelter_form).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Exportar", command=self.export_shelters).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reasignar ciudad", 
+                  command=self.reassign_shelters_city).pack(side="left", padx=5)
         
         # Tabla de albergues
         table_frame = ttk.LabelFrame(self.tab_shelters, text="Lista de Albergues")
         table_frame.pack(pady=10, padx=10, fill="both", expand=True)
         
-        columns = ("ID", "Nombre", "Ciudad", "Dirección", "Capacidad", "Procedencia")
+        columns = ("ID", "Nombre", "Ciudad", "Dirección", "Capacidad", "Albergados", "Procedencia")
         
-        self.shelters_table = ttk.Treeview(table_frame, columns=columns, show="headings")
+        self.shelters_table = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
         
         for col in columns:
             self.shelters_table.heading(col, text=col)
@@ -209,48 +952,80 @@ class RefugeeManagementApp:
         self.shelters_table.column("Dirección", width=200)
         
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.shelters_table.yview)
-        self.shelters_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Indicador de filas cargadas / total
+        shelters_count_label = ttk.Label(table_frame)
+        shelters_count_label.pack(side="bottom", fill="x", padx=5)
         
         self.shelters_table.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
+        # Carga paginada de la tabla
+        self.shelters_pager = KeysetPager(
+            self.db_worker, "Cargando albergues", self.shelters_table, scrollbar, shelters_count_label,
+            fetch_page=self.shelter_repository.fetch_page,
+            count_rows=self.shelter_repository.count,
+            row_key=lambda shelter: (shelter['nombre'], shelter['id_albergue']),
+            row_values=self.shelter_row_values,
+            noun="albergues",
+            on_error=lambda e: messagebox.showerror("Error", f"Error al cargar albergues: {e}"),
+            origin=job_origin(self.load_shelters)
+        )
+        
         # Configurar evento de selección
         self.shelters_table.bind("<<TreeviewSelect>>", self.on_shelter_select)
 
     # Mueve estos métodos FUERA de setup_shelters_tab, al mismo nivel que setup_shelters_tab
     def add_shelter(self):
-        try:
-            # Obtener valores del formulario
-            name = self.shelter_name.get()
-            city = self.shelter_city.get()
-            address = self.shelter_address.get()
-            capacity = self.shelter_capacity.get()
-            origin_city = self.shelter_origin_city.get()
-            
-            # Validar campos
-            if not all([name, city, address, capacity, origin_city]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
-                return
-            
-            # Obtener ID de la ciudad seleccionada
-            city_id = int(city.split(" - ")[0])
-            
-            # Insertar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                INSERT INTO albergues (nombre, id_ciudad, direccion_del_albergue, 
-                                       personas_albergadas, ciudad_de_procedencia)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (name, city_id, address, capacity, origin_city))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        # Obtener valores del formulario
+        name = self.shelter_name.get()
+        city = self.shelter_city.get()
+        address = self.shelter_address.get()
+        capacity = self.shelter_capacity.get()
+        origin_city = self.shelter_origin_city.get()
+        
+        # Validar campos
+        if not all([name, city, address, capacity, origin_city]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
+            return
+        if not capacity.strip().isdigit():
+            messagebox.showwarning("Advertencia", "La capacidad debe ser un número entero")
+            return
+        
+        # Obtener ID de la ciudad seleccionada
+        city_id = self.city_catalog.city_id(city)
+        if city_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione una ciudad de la lista")
+            return
+        
+        # Crear DTO
+        shelter = AlbergueDTO(
+            nombre=name,
+            id_ciudad=city_id,
+            direccion_del_albergue=address,
+            personas_albergadas=0,
+            ciudad_de_procedencia=origin_city,
+            capacidad=int(capacity)
+        )
+        
+        # Insertar en la base de datos
+        def job(connection):
+            new_id = self.shelter_repository.insert(connection, shelter)
+            connection.commit()
+            self.report_cache.bump("albergues")
+            return new_id, self.shelter_repository.fetch_row(connection, new_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Albergue agregado correctamente")
-            self.load_shelters()
+            self.shelters_pager.refresh_row(*result)
+            self.load_shelter_options()
             self.clear_shelter_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al agregar albergue: {e}")
+        
+        self.db_worker.submit(
+            "Agregando albergue", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al agregar albergue: {e}"),
+            supersede=False
+        )
 
     def update_shelter(self):
         selected_item = self.shelters_table.focus()
@@ -258,63 +1033,82 @@ class RefugeeManagementApp:
             messagebox.showwarning("Advertencia", "Seleccione un albergue para actualizar")
             return
         
-        try:
-            shelter_id = self.shelters_table.item(selected_item)['values'][0]
-            
-            # Obtener valores del formulario
-            name = self.shelter_name.get()
-            city = self.shelter_city.get()
-            address = self.shelter_address.get()
-            capacity = self.shelter_capacity.get()
-            origin_city = self.shelter_origin_city.get()
-            
-            # Validar campos
-            if not all([name, city, address, capacity, origin_city]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
-                return
-            
-            # Obtener ID de la ciudad seleccionada
-            city_id = int(city.split(" - ")[0])
-            
-            # Actualizar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                UPDATE albergues 
-                SET nombre = %s, id_ciudad = %s, direccion_del_albergue = %s, 
-                    personas_albergadas = %s, ciudad_de_procedencia = %s
-                WHERE id_albergue = %s
-            """, (name, city_id, address, capacity, origin_city, shelter_id))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        shelter_id = self.shelters_table.item(selected_item)['values'][0]
+        
+        # Obtener valores del formulario
+        name = self.shelter_name.get()
+        city = self.shelter_city.get()
+        address = self.shelter_address.get()
+        capacity = self.shelter_capacity.get()
+        origin_city = self.shelter_origin_city.get()
+        
+        # Validar campos
+        if not all([name, city, address, capacity, origin_city]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
+            return
+        if not capacity.strip().isdigit():
+            messagebox.showwarning("Advertencia", "La capacidad debe ser un número entero")
+            return
+        
+        # Obtener ID de la ciudad seleccionada
+        city_id = self.city_catalog.city_id(city)
+        if city_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione una ciudad de la lista")
+            return
+        
+        # Crear DTO
+        shelter = AlbergueDTO(
+            id_albergue=shelter_id,
+            nombre=name,
+            id_ciudad=city_id,
+            direccion_del_albergue=address,
+            personas_albergadas=self.shelters_pager.rows[selected_item]['personas_albergadas'],
+            ciudad_de_procedencia=origin_city,
+            capacidad=int(capacity)
+        )
+        
+        # Actualizar en la base de datos
+        def job(connection):
+            self.shelter_repository.update(connection, shelter)
+            connection.commit()
+            self.report_cache.bump("albergues")
+            return shelter_id, self.shelter_repository.fetch_row(connection, shelter_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Albergue actualizado correctamente")
-            self.load_shelters()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al actualizar albergue: {e}")   
+            self.shelters_pager.refresh_row(*result)
+            self.load_shelter_options()
+        
+        self.db_worker.submit(
+            "Actualizando albergue", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al actualizar albergue: {e}"),
+            supersede=False
+        )
 
     def delete_shelter(self):
-        selected_item = self.shelters_table.focus()
-        if not selected_item:
-            messagebox.showwarning("Advertencia", "Seleccione un albergue para eliminar")
+        shelter_ids = self.selected_ids(self.shelters_table)
+        if not shelter_ids:
+            messagebox.showwarning("Advertencia", "Seleccione uno o más albergues para eliminar")
             return
-        confirmation = messagebox.askyesno("Confirmación", "¿Está seguro de eliminar este albergue?")
-        if not confirmation:
+        question = ("¿Está seguro de eliminar este albergue?" if len(shelter_ids) == 1
+                    else f"¿Está seguro de eliminar los {len(shelter_ids)} albergues seleccionados?")
+        if not messagebox.askyesno("Confirmación", question):
             return
-        try:
-            shelter_id = self.shelters_table.item(selected_item)['values'][0]
-            
-            cursor = self.db_connection.cursor()
-            cursor.execute("DELETE FROM albergues WHERE id_albergue = %s", (shelter_id,))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
-            messagebox.showinfo("Éxito", "Albergue eliminado correctamente")
-            self.load_shelters()
-            self.clear_shelter_form() 
-        except Error as e:
-            messagebox.showerror("Error", f"Error al eliminar albergue: {e}")
+        
+        def done():
+            self.load_shelter_options()
+            self.clear_shelter_form()
+        
+        self.delete_selected("Eliminando albergues", self.shelters_pager, self.shelter_repository,
+                             shelter_ids, "albergues", "Albergues eliminados", done)
+
+    def reassign_shelters_city(self):
+        self.reassign_selected(
+            "Reasignando albergues", self.shelters_table, self.shelters_pager, self.shelter_repository,
+            "albergues", "Reasignar ciudad", "Nueva ciudad:",
+            self.city_catalog.labels, lambda label: {"id_ciudad": self.city_catalog.city_id(label)},
+            on_done=self.load_shelter_options
+        )
 
     def clear_shelter_form(self):
         self.shelter_name.delete(0, tk.END)
@@ -329,18 +1123,15 @@ class RefugeeManagementApp:
             shelter_data = self.shelters_table.item(selected_item)['values']
             self.shelter_name.delete(0, tk.END)
             self.shelter_name.insert(0, shelter_data[1])
-            # Buscar ciudad en el combobox
-            if shelter_data[2]:
-                for i, city in enumerate(self.shelter_city['values']):
-                    if shelter_data[2] in city:
-                        self.shelter_city.current(i)
-                        break
+            # Seleccionar ciudad por su id
+            shelter = self.shelters_pager.rows[selected_item]
+            self.shelter_city.set(self.city_catalog.label(shelter['id_ciudad']))
             self.shelter_address.delete(0, tk.END)
             self.shelter_address.insert(0, shelter_data[3])
             self.shelter_capacity.delete(0, tk.END)
             self.shelter_capacity.insert(0, shelter_data[4])
             self.shelter_origin_city.delete(0, tk.END)
-            self.shelter_origin_city.insert(0, shelter_data[5])
+            self.shelter_origin_city.insert(0, shelter_data[6])
 
    
     def setup_cities_tab(self):
@@ -374,6 +1165,7 @@ class RefugeeManagementApp:
         ttk.Button(button_frame, text="Actualizar", command=self.update_city).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Eliminar", command=self.delete_city).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Limpiar", command=self.clear_city_form).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Exportar", command=self.export_cities).pack(side="left", padx=5)
         
         # Tabla de ciudades
         table_frame = ttk.LabelFrame(self.tab_cities, text="Lista de Ciudades")
@@ -381,7 +1173,7 @@ class RefugeeManagementApp:
         
         columns = ("ID", "Departamento", "Ciudad", "Localidad", "Habitantes")
         
-        self.cities_table = ttk.Treeview(table_frame, columns=columns, show="headings")
+        self.cities_table = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
         
         for col in columns:
             self.cities_table.heading(col, text=col)
@@ -391,118 +1183,140 @@ class RefugeeManagementApp:
         self.cities_table.column("Ciudad", width=150)
         
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.cities_table.yview)
-        self.cities_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Indicador de filas cargadas / total
+        cities_count_label = ttk.Label(table_frame)
+        cities_count_label.pack(side="bottom", fill="x", padx=5)
         
         self.cities_table.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
+        # Carga paginada de la tabla
+        self.cities_pager = KeysetPager(
+            self.db_worker, "Cargando tabla de ciudades", self.cities_table, scrollbar, cities_count_label,
+            fetch_page=self.city_repository.fetch_page,
+            count_rows=self.city_repository.count,
+            row_key=lambda city: (city['ciudad'], city['id_ciudad']),
+            row_values=self.city_row_values,
+            noun="ciudades",
+            on_error=lambda e: messagebox.showerror("Error", f"Error al cargar ciudades: {e}"),
+            origin=job_origin(self.load_cities_table)
+        )
+        
         # Configurar evento de selección
         self.cities_table.bind("<<TreeviewSelect>>", self.on_city_select)
     def add_city(self):
-            try:
-                # Obtener valores del formulario
-                department = self.city_department.get()
-                city = self.city_name.get()
-                locality = self.city_locality.get()
-                population = self.city_population.get()
-                
-                # Validar campos
-                if not all([department, city, locality, population]):
-                    messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
-                    return
-                
-                # Crear DTO
-                city_dto = {
-                    'departamento': department,
-                    'ciudad': city,
-                    'localidad': locality,
-                    'cantidad_de_habitantes': int(population)
-                }
-                
-                # Insertar en la base de datos
-                cursor = self.db_connection.cursor()
-                cursor.execute("""
-                    INSERT INTO ciudades (departamento, ciudad, localidad, cantidad_de_habitantes)
-                    VALUES (%s, %s, %s, %s)
-                """, (city_dto['departamento'], city_dto['ciudad'], city_dto['localidad'], city_dto['cantidad_de_habitantes']))
-                
-                self.db_connection.commit()
-                cursor.close()
-                
-                messagebox.showinfo("Éxito", "Ciudad agregada correctamente")
-                self.load_cities_table()
-                self.clear_city_form()
-            except Error as e:
-                messagebox.showerror("Error", f"Error al agregar ciudad: {e}")
+        # Obtener valores del formulario
+        department = self.city_department.get()
+        city = self.city_name.get()
+        locality = self.city_locality.get()
+        population = self.city_population.get()
+        
+        # Validar campos
+        if not all([department, city, locality, population]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
+            return
+        if not population.strip().isdigit():
+            messagebox.showwarning("Advertencia", "La cantidad de habitantes debe ser un número entero")
+            return
+        
+        # Crear DTO
+        city_dto = CiudadDTO(
+            departamento=department,
+            ciudad=city,
+            localidad=locality,
+            cantidad_de_habitantes=int(population)
+        )
+        
+        # Insertar en la base de datos
+        def job(connection):
+            new_id = self.city_repository.insert(connection, city_dto)
+            connection.commit()
+            self.report_cache.bump("ciudades")
+            return new_id, self.city_repository.fetch_row(connection, new_id)
+        
+        def done(result):
+            messagebox.showinfo("Éxito", "Ciudad agregada correctamente")
+            self.cities_pager.refresh_row(*result)
+            self.city_catalog.invalidate()
+            self.load_cities()
+            self.clear_city_form()
+        
+        self.db_worker.submit(
+            "Agregando ciudad", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al agregar ciudad: {e}"),
+            supersede=False
+        )
 
     def update_city(self): 
         selected_item = self.cities_table.focus()
         if not selected_item:
             messagebox.showwarning("Advertencia", "Seleccione una ciudad para actualizar")
             return
-        try:
-            city_id = self.cities_table.item(selected_item)['values'][0]
-            
-            # Obtener valores del formulario
-            department = self.city_department.get()
-            city = self.city_name.get()
-            locality = self.city_locality.get()
-            population = self.city_population.get()
-            
-            # Validar campos
-            if not all([department, city, locality, population]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
-                return
-            
-            # Crear DTO
-            city_dto = {
-                'id_ciudad': city_id,
-                'departamento': department,
-                'ciudad': city,
-                'localidad': locality,
-                'cantidad_de_habitantes': int(population)
-            }
-            
-            # Actualizar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                UPDATE ciudades 
-                SET departamento = %s, ciudad = %s, localidad = %s, cantidad_de_habitantes = %s
-                WHERE id_ciudad = %s
-            """, (city_dto['departamento'], city_dto['ciudad'], city_dto['localidad'], 
-                  city_dto['cantidad_de_habitantes'], city_dto['id_ciudad']))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        
+        city_id = self.cities_table.item(selected_item)['values'][0]
+        
+        # Obtener valores del formulario
+        department = self.city_department.get()
+        city = self.city_name.get()
+        locality = self.city_locality.get()
+        population = self.city_population.get()
+        
+        # Validar campos
+        if not all([department, city, locality, population]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios")
+            return
+        if not population.strip().isdigit():
+            messagebox.showwarning("Advertencia", "La cantidad de habitantes debe ser un número entero")
+            return
+        
+        # Crear DTO
+        city_dto = CiudadDTO(
+            id_ciudad=city_id,
+            departamento=department,
+            ciudad=city,
+            localidad=locality,
+            cantidad_de_habitantes=int(population)
+        )
+        
+        # Actualizar en la base de datos
+        def job(connection):
+            self.city_repository.update(connection, city_dto)
+            connection.commit()
+            self.report_cache.bump("ciudades")
+            return city_id, self.city_repository.fetch_row(connection, city_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Ciudad actualizada correctamente")
-            self.load_cities_table()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al actualizar ciudad: {e}")
+            self.cities_pager.refresh_row(*result)
+            self.city_catalog.invalidate()
+            self.load_cities()
+        
+        self.db_worker.submit(
+            "Actualizando ciudad", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al actualizar ciudad: {e}"),
+            supersede=False
+        )
+
     def delete_city(self):
-        selected_item = self.cities_table.focus()
-        if not selected_item:
-            messagebox.showwarning("Advertencia", "Seleccione una ciudad para eliminar")
+        city_ids = self.selected_ids(self.cities_table)
+        if not city_ids:
+            messagebox.showwarning("Advertencia", "Seleccione una o más ciudades para eliminar")
             return
         
-        confirmation = messagebox.askyesno("Confirmación", "¿Está seguro de eliminar esta ciudad?")
-        if not confirmation:
+        question = ("¿Está seguro de eliminar esta ciudad?" if len(city_ids) == 1
+                    else f"¿Está seguro de eliminar las {len(city_ids)} ciudades seleccionadas?")
+        if not messagebox.askyesno("Confirmación", question):
             return
         
-        try:
-            city_id = self.cities_table.item(selected_item)['values'][0]
-            
-            cursor = self.db_connection.cursor()
-            cursor.execute("DELETE FROM ciudades WHERE id_ciudad = %s", (city_id,))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
-            messagebox.showinfo("Éxito", "Ciudad eliminada correctamente")
-            self.load_cities_table()
+        def done():
+            self.city_catalog.invalidate()
+            self.load_cities()
             self.clear_city_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al eliminar ciudad: {e}")
+        
+        self.delete_selected("Eliminando ciudades", self.cities_pager, self.city_repository,
+                             city_ids, "ciudades", "Ciudades eliminadas", done)
+
     def clear_city_form(self):
             self.city_department.delete(0, tk.END)
             self.city_name.delete(0, tk.END)
@@ -545,6 +1359,11 @@ class RefugeeManagementApp:
         ttk.Button(button_frame, text="Actualizar", command=self.update_volunteer).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Eliminar", command=self.delete_volunteer).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Limpiar", command=self.clear_volunteer_form).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Exportar", command=self.export_volunteers).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reasignar ciudad", 
+                  command=self.reassign_volunteers_city).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reasignar albergue", 
+                  command=self.reassign_volunteers_shelter).pack(side="left", padx=5)
         
         # Tabla de voluntarios
         table_frame = ttk.LabelFrame(self.tab_volunteers, text="Lista de Voluntarios")
@@ -552,7 +1371,7 @@ class RefugeeManagementApp:
         
         columns = ("ID", "Nombre", "Identificación", "Ciudad", "Albergue", "Profesión")
         
-        self.volunteers_table = ttk.Treeview(table_frame, columns=columns, show="headings")
+        self.volunteers_table = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
         
         for col in columns:
             self.volunteers_table.heading(col, text=col)
@@ -562,55 +1381,80 @@ class RefugeeManagementApp:
         self.volunteers_table.column("Profesión", width=150)
         
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.volunteers_table.yview)
-        self.volunteers_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Indicador de filas cargadas / total
+        volunteers_count_label = ttk.Label(table_frame)
+        volunteers_count_label.pack(side="bottom", fill="x", padx=5)
         
         self.volunteers_table.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
+        # Carga paginada de la tabla
+        self.volunteers_pager = KeysetPager(
+            self.db_worker, "Cargando voluntarios", self.volunteers_table, scrollbar, volunteers_count_label,
+            fetch_page=self.volunteer_repository.fetch_page,
+            count_rows=self.volunteer_repository.count,
+            row_key=lambda volunteer: (volunteer['nombre'], volunteer['id_voluntario']),
+            row_values=self.volunteer_row_values,
+            noun="voluntarios",
+            on_error=lambda e: messagebox.showerror("Error", f"Error al cargar voluntarios: {e}"),
+            origin=job_origin(self.load_volunteers)
+        )
+        
         # Configurar evento de selección
         self.volunteers_table.bind("<<TreeviewSelect>>", self.on_volunteer_select)
 
     def add_volunteer(self):
-        try:
-            # Obtener valores del formulario
-            name = self.volunteer_name.get()
-            identification = self.volunteer_id.get()
-            city = self.volunteer_city.get()
-            shelter = self.volunteer_shelter.get()
-            profession = self.volunteer_profession.get()
-            
-            # Validar campos
-            if not all([name, identification, city, profession]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto albergue")
-                return
-            
-            # Crear DTO
-            volunteer = VoluntarioDTO(
-                nombre=name,
-                identificacion=identification,
-                id_ciudad=int(city.split(" - ")[0]),
-                id_albergue=int(shelter.split(" - ")[0]) if shelter else None,
-                profesion=profession
-            )
-            
-            # Insertar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                INSERT INTO voluntarios (Nombre, identificacion, id_ciudad, id_albergue, Profesion)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                volunteer.nombre, volunteer.identificacion, volunteer.id_ciudad,
-                volunteer.id_albergue, volunteer.profesion
-            ))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        # Obtener valores del formulario
+        name = self.volunteer_name.get()
+        identification = self.volunteer_id.get()
+        city = self.volunteer_city.get()
+        shelter = self.volunteer_shelter.get()
+        profession = self.volunteer_profession.get()
+        
+        # Validar campos
+        if not all([name, identification, city, profession]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto albergue")
+            return
+        
+        city_id = self.city_catalog.city_id(city)
+        if city_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione una ciudad de la lista")
+            return
+        
+        shelter_id = self.shelter_id_by_label.get(shelter)
+        if shelter and shelter_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione un albergue de la lista")
+            return
+        
+        # Crear DTO
+        volunteer = VoluntarioDTO(
+            nombre=name,
+            identificacion=identification,
+            id_ciudad=city_id,
+            id_albergue=shelter_id,
+            profesion=profession
+        )
+        
+        # Insertar en la base de datos
+        def job(connection):
+            new_id = self.volunteer_repository.insert(connection, volunteer)
+            connection.commit()
+            self.report_cache.bump("voluntarios")
+            return new_id, self.volunteer_repository.fetch_row(connection, new_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Voluntario agregado correctamente")
-            self.load_volunteers()
+            self.volunteers_pager.refresh_row(*result)
             self.clear_volunteer_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al agregar voluntario: {e}")
+        
+        def failed(e):
+            if not is_connectivity_error(e):
+                messagebox.showerror("Error", f"Error al agregar voluntario: {e}")
+            elif self.save_offline("voluntarios", volunteer, "voluntario"):
+                self.clear_volunteer_form()
+        
+        self.db_worker.submit("Agregando voluntario", job, done, failed, supersede=False)
 
     def update_volunteer(self):
         selected_item = self.volunteers_table.focus()
@@ -618,72 +1462,85 @@ class RefugeeManagementApp:
             messagebox.showwarning("Advertencia", "Seleccione un voluntario para actualizar")
             return
         
-        try:
-            volunteer_id = self.volunteers_table.item(selected_item)['values'][0]
-            
-            # Obtener valores del formulario
-            name = self.volunteer_name.get()
-            identification = self.volunteer_id.get()
-            city = self.volunteer_city.get()
-            shelter = self.volunteer_shelter.get()
-            profession = self.volunteer_profession.get()
-            
-            # Validar campos
-            if not all([name, identification, city, profession]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto albergue")
-                return
-            
-            # Crear DTO
-            volunteer = VoluntarioDTO(
-                id_voluntario=volunteer_id,
-                nombre=name,
-                identificacion=identification,
-                id_ciudad=int(city.split(" - ")[0]),
-                id_albergue=int(shelter.split(" - ")[0]) if shelter else None,
-                profesion=profession
-            )
-            
-            # Actualizar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                UPDATE voluntarios 
-                SET Nombre = %s, identificacion = %s, id_ciudad = %s, 
-                    id_albergue = %s, Profesion = %s
-                WHERE id_voluntario = %s
-            """, (
-                volunteer.nombre, volunteer.identificacion, volunteer.id_ciudad,
-                volunteer.id_albergue, volunteer.profesion, volunteer.id_voluntario
-            ))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        volunteer_id = self.volunteers_table.item(selected_item)['values'][0]
+        
+        # Obtener valores del formulario
+        name = self.volunteer_name.get()
+        identification = self.volunteer_id.get()
+        city = self.volunteer_city.get()
+        shelter = self.volunteer_shelter.get()
+        profession = self.volunteer_profession.get()
+        
+        # Validar campos
+        if not all([name, identification, city, profession]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto albergue")
+            return
+        
+        city_id = self.city_catalog.city_id(city)
+        if city_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione una ciudad de la lista")
+            return
+        
+        shelter_id = self.shelter_id_by_label.get(shelter)
+        if shelter and shelter_id is None:
+            messagebox.showwarning("Advertencia", "Seleccione un albergue de la lista")
+            return
+        
+        # Crear DTO
+        volunteer = VoluntarioDTO(
+            id_voluntario=volunteer_id,
+            nombre=name,
+            identificacion=identification,
+            id_ciudad=city_id,
+            id_albergue=shelter_id,
+            profesion=profession
+        )
+        
+        # Actualizar en la base de datos
+        def job(connection):
+            self.volunteer_repository.update(connection, volunteer)
+            connection.commit()
+            self.report_cache.bump("voluntarios")
+            return volunteer_id, self.volunteer_repository.fetch_row(connection, volunteer_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Voluntario actualizado correctamente")
-            self.load_volunteers()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al actualizar voluntario: {e}")
+            self.volunteers_pager.refresh_row(*result)
+        
+        self.db_worker.submit(
+            "Actualizando voluntario", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al actualizar voluntario: {e}"),
+            supersede=False
+        )
 
     def delete_volunteer(self):
-        selected_item = self.volunteers_table.focus()
-        if not selected_item:
-            messagebox.showwarning("Advertencia", "Seleccione un voluntario para eliminar")
+        volunteer_ids = self.selected_ids(self.volunteers_table)
+        if not volunteer_ids:
+            messagebox.showwarning("Advertencia", "Seleccione uno o más voluntarios para eliminar")
             return
-        try:
-            volunteer_id = self.volunteers_table.item(selected_item)['values'][0]
-            
-            # Confirmar eliminación
-            if messagebox.askyesno("Confirmar", "¿Está seguro de eliminar este voluntario?"):
-                cursor = self.db_connection.cursor()
-                cursor.execute("DELETE FROM voluntarios WHERE id_voluntario = %s", (volunteer_id,))
-                
-                self.db_connection.commit()
-                cursor.close()
-                
-                messagebox.showinfo("Éxito", "Voluntario eliminado correctamente")
-                self.load_volunteers()
-                self.clear_volunteer_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al eliminar voluntario: {e}")
+        
+        # Confirmar eliminación
+        question = ("¿Está seguro de eliminar este voluntario?" if len(volunteer_ids) == 1
+                    else f"¿Está seguro de eliminar los {len(volunteer_ids)} voluntarios seleccionados?")
+        if not messagebox.askyesno("Confirmar", question):
+            return
+        
+        self.delete_selected("Eliminando voluntarios", self.volunteers_pager, self.volunteer_repository,
+                             volunteer_ids, "voluntarios", "Voluntarios eliminados", self.clear_volunteer_form)
+
+    def reassign_volunteers_city(self):
+        self.reassign_selected(
+            "Reasignando voluntarios", self.volunteers_table, self.volunteers_pager, self.volunteer_repository,
+            "voluntarios", "Reasignar ciudad", "Nueva ciudad:",
+            self.city_catalog.labels, lambda label: {"id_ciudad": self.city_catalog.city_id(label)}
+        )
+
+    def reassign_volunteers_shelter(self):
+        self.reassign_selected(
+            "Reasignando voluntarios", self.volunteers_table, self.volunteers_pager, self.volunteer_repository,
+            "voluntarios", "Reasignar albergue", "Nuevo albergue:",
+            list(self.shelter_label_by_id.values()), lambda label: {"id_albergue": self.shelter_id_by_label[label]}
+        )
 
     def clear_volunteer_form(self):
         self.volunteer_name.delete(0, tk.END)
@@ -695,6 +1552,62 @@ class RefugeeManagementApp:
 
         
     
+    def selected_ids(self, table):
+        # Los pagers usan el id de cada fila como iid del Treeview
+        return [int(iid) for iid in table.selection()]
+    
+    def delete_selected(self, action, pager, repository, row_ids, noun, success_label, on_done):
+        # Todas las filas en una transacción, con DELETE ... IN por tramos: si una
+        # no se puede borrar (llave foránea) no se borra ninguna
+        def job(connection):
+            deleted = repository.bulk_delete(connection, row_ids)
+            connection.commit()
+            self.report_cache.bump(repository.table)
+            return deleted
+        
+        def done(deleted):
+            pager.remove_rows(row_ids, deleted)
+            messagebox.showinfo("Éxito", f"{success_label}: {deleted}")
+            on_done()
+        
+        self.db_worker.submit(
+            action, job, done,
+            lambda e: messagebox.showerror("Error", f"Error al eliminar {noun}: {e}"),
+            supersede=False
+        )
+    
+    def reassign_selected(self, action, table, pager, repository, noun, title, prompt, options, values,
+                          on_done=None):
+        # Asigna el mismo valor a todas las filas seleccionadas con UPDATE ... IN
+        # por tramos, en una transacción, y recarga la tabla una sola vez
+        row_ids = self.selected_ids(table)
+        if not row_ids:
+            messagebox.showwarning("Advertencia", f"Seleccione uno o más {noun}")
+            return
+        
+        label = ChoiceDialog(self.root, title, f"{len(row_ids)} {noun} seleccionados.\n{prompt}", options).choose()
+        if not label:
+            return
+        changes = values(label)
+        
+        def job(connection):
+            updated = repository.bulk_update(connection, row_ids, changes)
+            connection.commit()
+            self.report_cache.bump(repository.table)
+            return updated
+        
+        def done(updated):
+            pager.reset()
+            messagebox.showinfo("Éxito", f"{noun.capitalize()} actualizados: {updated}")
+            if on_done:
+                on_done()
+        
+        self.db_worker.submit(
+            action, job, done,
+            lambda e: messagebox.showerror("Error", f"Error al actualizar {noun}: {e}"),
+            supersede=False
+        )
+    
     def setup_reports_tab(self):
         report_frame = ttk.LabelFrame(self.tab_reports, text="Reportes y Procedimientos")
         report_frame.pack(pady=10, padx=10, fill="both", expand=True)
@@ -706,144 +1619,302 @@ class RefugeeManagementApp:
         ttk.Button(report_frame, text="Voluntarios por Ciudad", 
                   command=self.generate_volunteers_by_city_report).pack(pady=5, fill="x", padx=20)
         
-        ttk.Button(report_frame, text="Actualizar Estadísticas de Albergues", 
-                  command=self.execute_shelter_stats_procedure).pack(pady=5, fill="x", padx=20)
-        
+        self.shelter_stats_button = ttk.Button(report_frame, text="Actualizar Estadísticas de Albergues", 
+                                               command=self.execute_shelter_stats_procedure)
+        self.shelter_stats_button.pack(pady=5, fill="x", padx=20)
+        
+        # Procedimiento en curso: tiempo transcurrido y cancelación
+        procedure_frame = ttk.Frame(report_frame)
+        procedure_frame.pack(fill="x", padx=20)
+        self.procedure_status = ttk.Label(procedure_frame, text="")
+        self.procedure_status.pack(side="left")
+        self.procedure_cancel_button = ttk.Button(procedure_frame, text="Cancelar", state="disabled", 
+                                                  command=self.cancel_procedure)
+        self.procedure_cancel_button.pack(side="right")
+        
+        # Exportación de los reportes a archivo
+        export_frame = ttk.Frame(report_frame)
+        export_frame.pack(pady=5, fill="x", padx=20)
+        ttk.Button(export_frame, text="Exportar Distribución de Refugiados", 
+                  command=self.export_refugee_distribution_report).pack(side="left", expand=True, fill="x", padx=(0, 5))
+        ttk.Button(export_frame, text="Exportar Voluntarios por Ciudad", 
+                  command=self.export_volunteers_by_city_report).pack(side="left", expand=True, fill="x", padx=(5, 0))
         
         # Área para mostrar resultados
-        self.report_text = tk.Text(report_frame, height=20, wrap="word")
-        self.report_text.pack(fill="both", expand=True, pady=10, padx=10)
-        
-        scrollbar = ttk.Scrollbar(report_frame, orient="vertical", command=self.report_text.yview)
-        self.report_text.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        self.report_grid = ReportGrid(report_frame)
+        
+        # Rendimiento: sentencias más lentas según los tiempos registrados
+        performance_frame = ttk.LabelFrame(self.tab_reports, text="Rendimiento")
+        performance_frame.pack(pady=(0, 10), padx=10, fill="x")
+        
+        performance_buttons = ttk.Frame(performance_frame)
+        performance_buttons.pack(fill="x", padx=5, pady=5)
+        ttk.Button(performance_buttons, text="Actualizar", 
+                  command=self.show_query_performance).pack(side="left", padx=5)
+        ttk.Button(performance_buttons, text="Exportar JSON", 
+                  command=self.export_query_performance).pack(side="left", padx=5)
+        ttk.Button(performance_buttons, text="Limpiar", 
+                  command=self.clear_query_performance).pack(side="left", padx=5)
+        self.startup_label = ttk.Label(performance_frame, text="", anchor="w")
+        self.startup_label.pack(fill="x", padx=5)
+        
+        columns = ("Sentencia", "Origen", "Ejecuciones", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Máx (ms)", "Filas")
+        self.performance_table = ttk.Treeview(performance_frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            self.performance_table.heading(col, text=col)
+            self.performance_table.column(col, width=80, anchor="center")
+        self.performance_table.column("Sentencia", width=420, anchor="w")
+        self.performance_table.column("Origen", width=220, anchor="w")
+        self.performance_table.pack(fill="x", padx=5, pady=(0, 5))
+        self.performance_renderer = ChunkedRenderer(self.performance_table)
     
+    def show_query_performance(self):
+        self.performance_renderer.render(self.query_profiler.stats()[:PERFORMANCE_ROWS], lambda entry: (
+            entry['sentencia'], ", ".join(entry['origenes']), entry['ejecuciones'],
+            entry['p50_ms'], entry['p95_ms'], entry['p99_ms'], entry['max_ms'], entry['filas_promedio']
+        ))
+    
+    def export_query_performance(self):
+        path = filedialog.asksaveasfilename(
+            title="Exportar rendimiento",
+            initialfile="rendimiento.json",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            count = self.query_profiler.export_json(path, {"inicio_ms": self.startup_timer.marks})
+        except OSError as e:
+            messagebox.showerror("Error", f"Error al exportar rendimiento: {e}")
+            return
+        messagebox.showinfo("Exportación", f"Se exportaron {count} ejecuciones a:\n{path}")
+    
+    def clear_query_performance(self):
+        self.query_profiler.clear()
+        self.show_query_performance()
+    
+    def export_query(self, title, default_name, sql, count_sql=None):
+        path = filedialog.asksaveasfilename(
+            title=title,
+            initialfile=default_name,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not path:
+            return
+        
+        dialog = ProgressDialog(self.root, title)
+        try:
+            exporter = QueryExporter(
+                sql, path, count_sql=count_sql,
+                progress=lambda fraction, rows: dialog.report(fraction, f"{rows} filas exportadas"),
+                cancel_event=dialog.cancel_event
+            )
+        except ValueError as e:
+            dialog.close()
+            messagebox.showerror("Error", str(e))
+            return
+        
+        def done(result):
+            dialog.close()
+            if result.cancelled:
+                messagebox.showinfo("Exportación", f"Exportación cancelada después de {result.rows} filas.\n{result.path}")
+            else:
+                messagebox.showinfo("Exportación", f"Se exportaron {result.rows} filas a:\n{result.path}")
+        
+        def failed(e):
+            dialog.close()
+            messagebox.showerror("Error", f"Error al exportar: {e}")
+        
+        self.db_worker.submit(title, exporter.run, done, failed, supersede=False)
+
+    def export_refugees(self):
+        self.export_query("Exportar refugiados", "refugiados.csv", REFUGEES_SELECT,
+                          "SELECT COUNT(*) FROM refugiados")
+
+    def export_shelters(self):
+        self.export_query("Exportar albergues", "albergues.csv", SHELTERS_SELECT,
+                          "SELECT COUNT(*) FROM albergues")
+
+    def export_cities(self):
+        self.export_query("Exportar ciudades", "ciudades.csv", CITIES_SELECT,
+                          "SELECT COUNT(*) FROM ciudades")
+
+    def export_volunteers(self):
+        self.export_query("Exportar voluntarios", "voluntarios.csv", VOLUNTEERS_SELECT,
+                          "SELECT COUNT(*) FROM voluntarios")
+
+    def export_refugee_distribution_report(self):
+        self.export_query("Exportar distribución de refugiados", "distribucion_refugiados.csv",
+                          self.report_repository.refugee_distribution_sql, "SELECT COUNT(*) FROM ciudades")
+
+    def export_volunteers_by_city_report(self):
+        self.export_query("Exportar voluntarios por ciudad", "voluntarios_por_ciudad.csv",
+                          self.report_repository.volunteers_by_city_sql, "SELECT COUNT(*) FROM ciudades")
+
     def load_initial_data(self):
+        # Solo los catálogos de los combobox; las tablas, al abrir cada pestaña
+        self.mark_startup("esquema")
         self.load_cities()
-        self.load_shelters()
-        self.load_refugees()
-        self.load_volunteers()
-        self.load_cities_table()
-        
-        # Cargar combobox de ciudades para albergues
-        cursor = self.db_connection.cursor()
-        cursor.execute("SELECT id_ciudad, ciudad, departamento FROM ciudades ORDER BY ciudad")
-        cities = cursor.fetchall()
-        city_values = [f"{city[0]} - {city[1]} ({city[2]})" for city in cities]
-        self.shelter_city['values'] = city_values
-        self.volunteer_city['values'] = city_values
-        cursor.close()
+        self.load_shelter_options()
+        
+        # La marca del registro de cambios se toma antes de cargar las tablas, así
+        # ninguna escritura queda entre la carga y el primer sondeo
+        def started(enabled):
+            self.data_ready = True
+            self.load_tab(self.tab_control.select())
+            self.replay_journal()
+            if enabled:
+                self.schedule_change_poll()
+        
+        self.db_worker.submit(
+            "Iniciando registro de cambios", self.change_feed.start, started,
+            lambda e: started(False)
+        )
     
+    def schedule_change_poll(self, delay=None):
+        self.root.after(self.change_poll_ms if delay is None else delay, self.poll_changes)
+    
+    def poll_changes(self):
+        # Para cada pestaña ya cargada: pager, repositorio y búsqueda activa
+        targets = {}
+        for tab in self.loaded_tabs:
+            pager, repository, _ = self.tab_loaders[tab]
+            targets[repository.table] = (pager, repository, pager.search)
+        
+        def job(connection):
+            changes, reload, more = self.change_feed.poll(connection)
+            updates = {}
+            for table, operations in changes.items():
+                if table in targets and not reload:
+                    pager, repository, search = targets[table]
+                    row_ids = list(operations)
+                    updates[table] = (
+                        row_ids, repository.fetch_rows(connection, row_ids, search),
+                        repository.count(connection, search)
+                    )
+            return changes, updates, reload, more
+        
+        def done(result):
+            changes, updates, reload, more = result
+            for table, (row_ids, rows, total) in updates.items():
+                targets[table][0].apply_changes(row_ids, rows, total)
+            if reload:
+                for tab in list(self.loaded_tabs):
+                    self.reload_tab(tab)
+            if "ciudades" in changes:
+                self.city_catalog.invalidate()
+                self.load_cities()
+            if "albergues" in changes:
+                self.load_shelter_options()
+            self.schedule_change_poll(0 if more else None)
+        
+        def failed(e):
+            # Sin conexión se sigue intentando; el reenvío del diario avisa del corte
+            self.schedule_change_poll()
+        
+        self.db_worker.submit("Buscando cambios", job, done, failed, background=True)
+
     def load_cities(self):
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("SELECT id_ciudad, ciudad, departamento FROM ciudades ORDER BY ciudad")
-            cities = cursor.fetchall()
-            
-            city_values = [f"{city[0]} - {city[1]} ({city[2]})" for city in cities]
-            
-            self.displacement_city['values'] = city_values
-            self.refuge_city['values'] = city_values
-            
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al cargar ciudades: {e}")
+        if self.city_catalog.loaded:
+            self.apply_city_catalog()
+            return
+        
+        def done(cities):
+            self.city_catalog.set_cities(cities)
+            self.apply_city_catalog()
+            self.mark_startup("catálogo de ciudades")
+        
+        self.db_worker.submit(
+            "Cargando ciudades", self.city_catalog.fetch, done,
+            lambda e: messagebox.showerror("Error", f"Error al cargar ciudades: {e}")
+        )
+
+    def apply_city_catalog(self):
+        for combobox in (self.displacement_city, self.refuge_city, self.shelter_city, self.volunteer_city):
+            combobox['values'] = self.city_catalog.labels
 
     def load_shelters(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT a.*, c.ciudad as nombre_ciudad 
-                FROM albergues a
-                JOIN ciudades c ON a.id_ciudad = c.id_ciudad
-                ORDER BY a.nombre
-            """)
-            shelters = cursor.fetchall()
-            
-            # Limpiar tabla
-            for row in self.shelters_table.get_children():
-                self.shelters_table.delete(row)
-            
-            # Agregar datos a la tabla
+        self.shelters_pager.reset()
+
+    def load_shelter_options(self):
+        # Cargar combobox de albergues para voluntarios y refugiados
+        def done(shelters):
+            self.shelter_label_by_id = {shelter[0]: f"{shelter[0]} - {shelter[1]}" for shelter in shelters}
+            self.shelter_id_by_label = {label: shelter_id for shelter_id, label in self.shelter_label_by_id.items()}
+            self.shelter_city_by_id = {shelter[0]: shelter[2] for shelter in shelters}
+            self.volunteer_shelter['values'] = list(self.shelter_label_by_id.values())
+            
+            # Los refugiados solo pueden asignarse a albergues de su ciudad de refugio
+            self.shelter_values_by_city = {}
             for shelter in shelters:
-                self.shelters_table.insert("", "end", values=(
-                    shelter['id_albergue'],
-                    shelter['nombre'],
-                    shelter['nombre_ciudad'],
-                    shelter['direccion_del_albergue'],
-                    shelter['personas_albergadas'],
-                    shelter['ciudad_de_procedencia']
-                ))
-            
-            # Cargar combobox de albergues para voluntarios
-            shelter_values = [f"{shelter['id_albergue']} - {shelter['nombre']}" for shelter in shelters]
-            self.volunteer_shelter['values'] = shelter_values
-            
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al cargar albergues: {e}")
+                self.shelter_values_by_city.setdefault(shelter[2], []).append(self.shelter_label_by_id[shelter[0]])
+            self.mark_startup("catálogo de albergues")
+            self.on_refuge_city_change()
+        
+        self.db_worker.submit(
+            "Cargando lista de albergues", self.shelter_repository.options, done,
+            lambda e: messagebox.showerror("Error", f"Error al cargar albergues: {e}")
+        )
+
+    def on_refuge_city_change(self, event=None):
+        refuge_city_id = self.city_catalog.city_id(self.refuge_city.get())
+        values = self.shelter_values_by_city.get(refuge_city_id, [])
+        self.refugee_shelter['values'] = values
+        if self.refugee_shelter.get() not in values:
+            self.refugee_shelter.set('')
+
+    def shelter_row_values(self, shelter):
+        return (
+            shelter['id_albergue'],
+            shelter['nombre'],
+            shelter['nombre_ciudad'],
+            shelter['direccion_del_albergue'],
+            shelter['capacidad'] if shelter['capacidad'] is not None else '',
+            shelter['personas_albergadas'],
+            shelter['ciudad_de_procedencia']
+        )
 
     def load_cities_table(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM ciudades ORDER BY ciudad")
-            cities = cursor.fetchall()
-            
-            # Limpiar tabla
-            for row in self.cities_table.get_children():
-                self.cities_table.delete(row)
-            
-            # Agregar datos a la tabla
-            for city in cities:
-                self.cities_table.insert("", "end", values=(
-                    city['id_ciudad'],
-                    city['departamento'],
-                    city['ciudad'],
-                    city['localidad'],
-                    city['cantidad_de_habitantes']
-                ))
-            
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al cargar ciudades: {e}")
-    
+        self.cities_pager.reset()
+
+    def city_row_values(self, city):
+        return (
+            city['id_ciudad'],
+            city['departamento'],
+            city['ciudad'],
+            city['localidad'],
+            city['cantidad_de_habitantes']
+        )
+
     def load_refugees(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT r.*, 
-                       c1.ciudad as ciudad_origen, c1.departamento as depto_origen,
-                       c2.ciudad as ciudad_refugio, 
-                       a.nombre as albergue
-                FROM refugiados r
-                JOIN ciudades c1 ON r.id_ciudad_del_despiazamiento = c1.id_ciudad
-                JOIN ciudades c2 ON r.id_ciudad_a_refugiarse = c2.id_ciudad
-                LEFT JOIN albergues a ON c2.id_ciudad = a.id_ciudad
-                ORDER BY r.nombre
-            """)
-            refugees = cursor.fetchall()
-            
-            # Limpiar tabla
-            for row in self.refugees_table.get_children():
-                self.refugees_table.delete(row)
-            
-            # Agregar datos a la tabla
-            for refugee in refugees:
-                self.refugees_table.insert("", "end", values=(
-                    refugee['id_refugiado'],
-                    refugee['nombre'],
-                    refugee['identificacion'],
-                    refugee['numero_de_contacto'],
-                    refugee['email'],
-                    f"{refugee['ciudad_origen']} ({refugee['depto_origen']})",
-                    refugee['motivo_despiazamiento'],
-                    refugee['ciudad_refugio'],
-                    refugee['albergue'] if refugee['albergue'] else "No asignado"
-                ))
-            
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al cargar refugiados: {e}")
+        self.refugees_pager.reset()
+
+    def on_refugee_search_change(self, *args):
+        # Debounce: solo se consulta cuando el usuario deja de escribir
+        if self.refugee_search_job:
+            self.root.after_cancel(self.refugee_search_job)
+        self.refugee_search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.run_refugee_search)
+
+    def run_refugee_search(self):
+        self.refugee_search_job = None
+        search = self.refugee_search_var.get().strip()
+        if search != self.refugees_pager.search:
+            self.refugees_pager.set_search(search)
+
+    def refugee_row_values(self, refugee):
+        return (
+            refugee['id_refugiado'],
+            refugee['nombre'],
+            refugee['identificacion'],
+            refugee['numero_de_contacto'],
+            refugee['email'],
+            f"{refugee['ciudad_origen']} ({refugee['depto_origen']})",
+            refugee['motivo_despiazamiento'],
+            refugee['ciudad_refugio'],
+            refugee['albergue'] if refugee['albergue'] else "No asignado"
+        )
     
     def on_refugee_select(self, event):
         selected_item = self.refugees_table.focus()
@@ -862,51 +1933,28 @@ class RefugeeManagementApp:
             self.refugee_email.delete(0, tk.END)
             self.refugee_email.insert(0, refugee_data[4])
             
-            # Buscar ciudad de desplazamiento
-            displacement_text = refugee_data[5].split(" (")[0]
-            for i, city in enumerate(self.displacement_city['values']):
-                if displacement_text in city:
-                    self.displacement_city.current(i)
-                    break
+            # Seleccionar ciudades y albergue por su id
+            refugee = self.refugees_pager.rows[selected_item]
+            self.displacement_city.set(self.city_catalog.label(refugee['id_ciudad_del_despiazamiento']))
             
             self.displacement_reason.set(refugee_data[6])
             
-            # Buscar ciudad de refugio
-            refuge_text = refugee_data[7]
-            for i, city in enumerate(self.refuge_city['values']):
-                if refuge_text in city:
-                    self.refuge_city.current(i)
-                    break
+            self.refuge_city.set(self.city_catalog.label(refugee['id_ciudad_a_refugiarse']))
+            self.on_refuge_city_change()
+            self.refugee_shelter.set(self.shelter_label_by_id.get(refugee['id_albergue'], ""))
 
     def load_volunteers(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT v.*, c.ciudad as nombre_ciudad, a.nombre as nombre_albergue
-                FROM voluntarios v
-                LEFT JOIN ciudades c ON v.id_ciudad = c.id_ciudad
-                LEFT JOIN albergues a ON v.id_albergue = a.id_albergue
-                ORDER BY v.nombre
-            """)
-            volunteers = cursor.fetchall()
-            
-            # Limpiar tabla
-            for row in self.volunteers_table.get_children():
-                self.volunteers_table.delete(row)
-            
-            # Agregar datos a la tabla
-            for volunteer in volunteers:
-                self.volunteers_table.insert("", "end", values=(
-                    volunteer['id_voluntario'],
-                    volunteer['nombre'],
-                    volunteer['identificacion'],
-                    volunteer['nombre_ciudad'] if volunteer['nombre_ciudad'] else "",
-                    volunteer['nombre_albergue'] if volunteer['nombre_albergue'] else "No asignado",
-                    volunteer['profesion']
-                ))
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al cargar voluntarios: {e}")
+        self.volunteers_pager.reset()
+
+    def volunteer_row_values(self, volunteer):
+        return (
+            volunteer['id_voluntario'],
+            volunteer['nombre'],
+            volunteer['identificacion'],
+            volunteer['nombre_ciudad'] if volunteer['nombre_ciudad'] else "",
+            volunteer['nombre_albergue'] if volunteer['nombre_albergue'] else "No asignado",
+            volunteer['profesion']
+        )
     def on_city_select(self, event):
         selected_item = self.cities_table.focus()
         if selected_item:
@@ -935,19 +1983,10 @@ class RefugeeManagementApp:
             self.volunteer_id.delete(0, tk.END)
             self.volunteer_id.insert(0, volunteer_data[2])
             
-            # Buscar ciudad en el combobox
-            if volunteer_data[3]:
-                for i, city in enumerate(self.volunteer_city['values']):
-                    if volunteer_data[3] in city:
-                        self.volunteer_city.current(i)
-                        break
-            
-            # Buscar albergue en el combobox
-            if volunteer_data[4] and volunteer_data[4] != "No asignado":
-                for i, shelter in enumerate(self.volunteer_shelter['values']):
-                    if volunteer_data[4] in shelter:
-                        self.volunteer_shelter.current(i)
-                        break
+            # Seleccionar ciudad y albergue por su id
+            volunteer = self.volunteers_pager.rows[selected_item]
+            self.volunteer_city.set(self.city_catalog.label(volunteer['id_ciudad']))
+            self.volunteer_shelter.set(self.shelter_label_by_id.get(volunteer['id_albergue'], ""))
             
             self.volunteer_profession.delete(0, tk.END)
             self.volunteer_profession.insert(0, volunteer_data[5])
@@ -956,138 +1995,321 @@ class RefugeeManagementApp:
     
     
     def add_refugee(self):
-        try:
-            # Obtener valores del formulario
-            name = self.refugee_name.get()
-            identification = self.refugee_id.get()
-            contact = self.refugee_contact.get()
-            email = self.refugee_email.get()
-            
-            displacement_city_id = int(self.displacement_city.get().split(" - ")[0])
-            reason = self.displacement_reason.get()
-            refuge_city_id = int(self.refuge_city.get().split(" - ")[0])
-            
-            # Validar campos
-            if not all([name, identification, contact, reason]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto email")
+        # Obtener valores del formulario
+        name = self.refugee_name.get()
+        identification = self.refugee_id.get()
+        contact = self.refugee_contact.get()
+        email = self.refugee_email.get()
+        
+        displacement_city_id = self.city_catalog.city_id(self.displacement_city.get())
+        reason = self.displacement_reason.get()
+        refuge_city_id = self.city_catalog.city_id(self.refuge_city.get())
+        shelter = self.refugee_shelter.get()
+        
+        # Validar campos
+        if not all([name, identification, contact, reason, displacement_city_id, refuge_city_id]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto email y albergue")
+            return
+        
+        # Crear DTO
+        refugee = RefugiadoDTO(
+            nombre=name,
+            identificacion=identification,
+            numero_de_contacto=contact,
+            email=email,
+            id_ciudad_despiazamiento=displacement_city_id,
+            motivo_despiazamiento=reason,
+            id_ciudad_refugio=refuge_city_id,
+            id_albergue=self.shelter_id_by_label.get(shelter)
+        )
+        
+        # Antes de insertar se buscan registros de la misma persona; si se
+        # registra de todos modos, los pares quedan en la cola de duplicados
+        def check(connection):
+            return self.duplicate_detector.candidates_for(connection, name, identification)
+        
+        def checked(candidates):
+            if candidates and not self.confirm_possible_duplicates(candidates):
                 return
-            
-            # Crear DTO
-            refugee = RefugiadoDTO(
-                nombre=name,
-                identificacion=identification,
-                numero_de_contacto=contact,
-                email=email,
-                id_ciudad_desplazamiento=displacement_city_id,
-                motivo_desplazamiento=reason,
-                id_ciudad_refugio=refuge_city_id
-            )
-            
-            # Insertar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                INSERT INTO refugiados (Nombre, identificacion, numero_de_contacto, Email, 
-                                      id_ciudad_del_despiazamiento, motivo_despiazamiento, 
-                                      id_ciudad_a_refugiarse)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                refugee.nombre, refugee.identificacion, refugee.numero_de_contacto, refugee.email,
-                refugee.id_ciudad_despiazamiento, refugee.motivo_despiazamiento,
-                refugee.id_ciudad_refugio
-            ))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+            self.db_worker.submit("Agregando refugiado", lambda connection: job(connection, candidates),
+                                  done, failed, supersede=False)
+        
+        # Insertar en la base de datos
+        def job(connection, candidates):
+            new_id = self.refugee_repository.insert(connection, refugee)
+            self.duplicate_detector.index(connection, new_id, name)
+            self.duplicate_detector.queue(connection, [(candidate[0], new_id, *candidate[3:]) for candidate in candidates])
+            connection.commit()
+            self.report_cache.bump("refugiados")
+            return new_id, self.refugee_repository.fetch_row(connection, new_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Refugiado agregado correctamente")
-            self.load_refugees()
+            self.refugees_pager.refresh_row(*result)
             self.clear_refugee_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al agregar refugiado: {e}")
+        
+        def failed(e):
+            if not is_connectivity_error(e):
+                messagebox.showerror("Error", f"Error al agregar refugiado: {e}")
+            elif self.save_offline("refugiados", refugee, "refugiado"):
+                self.clear_refugee_form()
+        
+        self.db_worker.submit("Verificando duplicados", check, checked, failed, supersede=False)
     
+    def confirm_possible_duplicates(self, candidates):
+        lines = [f"  {candidate[1]} ({candidate[2]}): {candidate[3]}" for candidate in candidates[:5]]
+        if len(candidates) > 5:
+            lines.append(f"  ... y {len(candidates) - 5} más")
+        return messagebox.askyesno(
+            "Posible duplicado",
+            "Ya hay registros parecidos:\n" + "\n".join(lines) +
+            "\n\n¿Registrar de todos modos? Los pares quedan en la cola de duplicados para revisarlos."
+        )
+
     def update_refugee(self):
         selected_item = self.refugees_table.focus()
         if not selected_item:
             messagebox.showwarning("Advertencia", "Seleccione un refugiado para actualizar")
             return
         
-        try:
-            refugee_id = self.refugees_table.item(selected_item)['values'][0]
-            
-            # Obtener valores del formulario
-            name = self.refugee_name.get()
-            identification = self.refugee_id.get()
-            contact = self.refugee_contact.get()
-            email = self.refugee_email.get()
-            
-            displacement_city_id = int(self.displacement_city.get().split(" - ")[0])
-            reason = self.displacement_reason.get()
-            refuge_city_id = int(self.refuge_city.get().split(" - ")[0])
-            
-            # Validar campos
-            if not all([name, identification, contact, reason]):
-                messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto email")
-                return
-            
-            # Crear DTO
-            refugee = RefugiadoDTO(
-                id_refugiado=refugee_id,
-                nombre=name,
-                identificacion=identification,
-                numero_de_contacto=contact,
-                email=email,
-                id_ciudad_despiazamiento=displacement_city_id,
-                motivo_despiazamiento=reason,
-                id_ciudad_refugio=refuge_city_id
-            )
-            
-            # Actualizar en la base de datos
-            cursor = self.db_connection.cursor()
-            cursor.execute("""
-                UPDATE refugiados 
-                SET Nombre = %s, identificacion = %s, numero_de_contacto = %s, Email = %s,
-                    id_ciudad_del_despiazamiento = %s, motivo_despiazamiento = %s, 
-                    id_ciudad_a_refugiarse = %s
-                WHERE id_refugiado = %s
-            """, (
-                refugee.nombre, refugee.identificacion, refugee.numero_de_contacto, refugee.email,
-                refugee.id_ciudad_despiazamiento, refugee.motivo_despiazamiento,
-                refugee.id_ciudad_refugio, refugee.id_refugiado
-            ))
-            
-            self.db_connection.commit()
-            cursor.close()
-            
+        refugee_id = self.refugees_table.item(selected_item)['values'][0]
+        
+        # Obtener valores del formulario
+        name = self.refugee_name.get()
+        identification = self.refugee_id.get()
+        contact = self.refugee_contact.get()
+        email = self.refugee_email.get()
+        
+        displacement_city_id = self.city_catalog.city_id(self.displacement_city.get())
+        reason = self.displacement_reason.get()
+        refuge_city_id = self.city_catalog.city_id(self.refuge_city.get())
+        shelter = self.refugee_shelter.get()
+        
+        # Validar campos
+        if not all([name, identification, contact, reason, displacement_city_id, refuge_city_id]):
+            messagebox.showwarning("Advertencia", "Todos los campos son obligatorios excepto email y albergue")
+            return
+        
+        # Crear DTO
+        refugee = RefugiadoDTO(
+            id_refugiado=refugee_id,
+            nombre=name,
+            identificacion=identification,
+            numero_de_contacto=contact,
+            email=email,
+            id_ciudad_despiazamiento=displacement_city_id,
+            motivo_despiazamiento=reason,
+            id_ciudad_refugio=refuge_city_id,
+            id_albergue=self.shelter_id_by_label.get(shelter)
+        )
+        
+        # Actualizar en la base de datos
+        def job(connection):
+            self.refugee_repository.update(connection, refugee)
+            self.duplicate_detector.index(connection, refugee_id, name)
+            connection.commit()
+            self.report_cache.bump("refugiados")
+            return refugee_id, self.refugee_repository.fetch_row(connection, refugee_id)
+        
+        def done(result):
             messagebox.showinfo("Éxito", "Refugiado actualizado correctamente")
-            self.load_refugees()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al actualizar refugiado: {e}")
-    
+            self.refugees_pager.refresh_row(*result)
+        
+        self.db_worker.submit(
+            "Actualizando refugiado", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al actualizar refugiado: {e}"),
+            supersede=False
+        )
+
     def delete_refugee(self):
-        selected_item = self.refugees_table.focus()
-        if not selected_item:
-            messagebox.showwarning("Advertencia", "Seleccione un refugiado para eliminar")
+        refugee_ids = self.selected_ids(self.refugees_table)
+        if not refugee_ids:
+            messagebox.showwarning("Advertencia", "Seleccione uno o más refugiados para eliminar")
             return
         
-        confirmation = messagebox.askyesno("Confirmación", "¿Está seguro de eliminar este refugiado?")
-        if not confirmation:
+        question = ("¿Está seguro de eliminar este refugiado?" if len(refugee_ids) == 1
+                    else f"¿Está seguro de eliminar los {len(refugee_ids)} refugiados seleccionados?")
+        if not messagebox.askyesno("Confirmación", question):
             return
         
-        try:
-            refugee_id = self.refugees_table.item(selected_item)['values'][0]
-            
-            cursor = self.db_connection.cursor()
-            cursor.execute("DELETE FROM refugiados WHERE id_refugiado = %s", (refugee_id,))
-            
-            self.db_connection.commit()
-            cursor.close()
+        self.delete_selected("Eliminando refugiados", self.refugees_pager, self.refugee_repository,
+                             refugee_ids, "refugiados", "Refugiados eliminados", self.clear_refugee_form)
+
+    def reassign_refugees_city(self):
+        # La ciudad nueva no tiene los albergues de la anterior: se quita el albergue
+        self.reassign_selected(
+            "Reasignando refugiados", self.refugees_table, self.refugees_pager, self.refugee_repository,
+            "refugiados", "Reasignar ciudad de refugio",
+            "Nueva ciudad de refugio (se quitará el albergue asignado):",
+            self.city_catalog.labels,
+            lambda label: {"id_ciudad_refugio": self.city_catalog.city_id(label), "id_albergue": None}
+        )
+
+    def reassign_refugees_shelter(self):
+        # La ciudad de refugio pasa a ser la del albergue elegido
+        def values(label):
+            shelter_id = self.shelter_id_by_label[label]
+            return {"id_albergue": shelter_id, "id_ciudad_refugio": self.shelter_city_by_id[shelter_id]}
+        
+        self.reassign_selected(
+            "Reasignando refugiados", self.refugees_table, self.refugees_pager, self.refugee_repository,
+            "refugiados", "Reasignar albergue", "Nuevo albergue (también cambia la ciudad de refugio):",
+            list(self.shelter_label_by_id.values()), values
+        )
+
+    def assign_shelters(self):
+        # Reparte a los refugiados sin albergue según la capacidad de los albergues.
+        # El plan se calcula en segundo plano, se muestra por albergue y solo se
+        # escribe si se acepta, en una sola transacción.
+        def preview(plan):
+            if not plan.pending:
+                messagebox.showinfo("Información", "No hay refugiados sin albergue")
+                return
+            if not plan.placed():
+                messagebox.showwarning(
+                    "Advertencia", f"Los albergues no tienen cupo para los {plan.pending} refugiados sin albergue")
+                return
             
-            messagebox.showinfo("Éxito", "Refugiado eliminado correctamente")
-            self.load_refugees()
-            self.clear_refugee_form()
-        except Error as e:
-            messagebox.showerror("Error", f"Error al eliminar refugiado: {e}")
+            unplaced = sum(plan.unplaced.values())
+            summary = (f"{plan.pending} refugiados sin albergue: {plan.placed() - plan.moved()} en su ciudad, "
+                       f"{plan.moved()} en otra ciudad del departamento (conservan su ciudad de refugio), "
+                       f"{unplaced} sin cupo")
+            if unplaced:
+                short = sorted(plan.unplaced.items(), key=lambda item: item[1], reverse=True)[:5]
+                summary += " (" + ", ".join(f"{city}: {count}" for city, count in short) + ")"
+            columns = [("Albergue", 220), ("Ciudad", 140), ("Capacidad", 90), ("Ocupados", 90),
+                       ("Asignados", 90), ("De otra ciudad", 110), ("Libres", 80)]
+            if PreviewDialog(self.root, "Asignar albergues", summary, columns, plan.preview_rows()).confirm():
+                apply(plan)
+        
+        def apply(plan):
+            def job(connection):
+                updated = self.shelter_assignment.apply(connection, plan)
+                connection.commit()
+                self.report_cache.bump("refugiados", "albergues")
+                return updated
+            
+            def done(updated):
+                self.reload_tab(self.tab_refugees)
+                self.reload_tab(self.tab_shelters)
+                messagebox.showinfo("Éxito", f"Refugiados asignados: {updated}")
+            
+            def failed(e):
+                if isinstance(e, PlanOutdated):
+                    messagebox.showwarning(
+                        "Advertencia", f"Los datos cambiaron desde la vista previa ({e}); no se asignó a nadie")
+                else:
+                    messagebox.showerror("Error", f"Error al asignar albergues: {e}")
+            
+            self.db_worker.submit("Asignando albergues", job, done, failed, supersede=False)
+        
+        self.db_worker.submit(
+            "Calculando asignación de albergues", self.shelter_assignment.plan, preview,
+            lambda e: messagebox.showerror("Error", f"Error al calcular la asignación: {e}")
+        )
+
+    def find_duplicates(self):
+        # Revisa toda la tabla (agrega a la cola los pares nuevos) y abre la cola
+        def job(connection):
+            result = self.duplicate_detector.scan(connection)
+            return result, self.duplicate_detector.pending(connection)
+        
+        def done(result):
+            (people, found, queued), pending = result
+            if not pending:
+                messagebox.showinfo("Información", f"{people} refugiados revisados: no hay posibles duplicados")
+                return
+            summary = (f"{people} refugiados revisados: {found} pares parecidos, {queued} nuevos. "
+                       f"Pendientes de revisión: {len(pending)}")
+            DuplicateReview(self.root, summary, self.merge_duplicate, self.dismiss_duplicate).show(pending)
+        
+        self.db_worker.submit(
+            "Buscando duplicados", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al buscar duplicados: {e}"),
+            supersede=False
+        )
+    
+    def merge_duplicate(self, review, row):
+        # Se conserva el registro más antiguo (A) y se elimina B
+        refugee_id, name, identification = row[6:9]
+        if not messagebox.askyesno("Confirmar", f"¿Eliminar a {name} ({identification}), ID {refugee_id}?",
+                                   parent=review.window):
+            return
+        
+        def job(connection):
+            deleted = self.refugee_repository.delete(connection, refugee_id)
+            connection.commit()
+            self.report_cache.bump("refugiados")
+            return deleted
+        
+        # Si otro cliente ya lo eliminó, deleted es 0 y el total no cambia
+        def done(deleted):
+            review.remove_refugee(refugee_id)
+            self.refugees_pager.remove_rows([refugee_id], deleted)
+        
+        self.db_worker.submit(
+            "Eliminando refugiado", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al eliminar refugiado: {e}"),
+            supersede=False
+        )
     
+    def dismiss_duplicate(self, review, row):
+        def job(connection):
+            self.duplicate_detector.dismiss(connection, row[0])
+            connection.commit()
+        
+        self.db_worker.submit(
+            "Revisando duplicados", job, lambda result: review.remove(row[0]),
+            lambda e: messagebox.showerror("Error", f"Error al actualizar la cola de duplicados: {e}"),
+            supersede=False
+        )
+
+    def import_refugees(self):
+        path = filedialog.askopenfilename(
+            title="Importar refugiados",
+            filetypes=[("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*")]
+        )
+        if not path:
+            return
+        
+        dialog = ProgressDialog(self.root, "Importando refugiados")
+        importer = RefugeeImporter(
+            path,
+            self.refugee_repository,
+            progress=lambda fraction, inserted, rejected: dialog.report(
+                fraction, f"{inserted} insertados, {rejected} rechazados"),
+            cancel_event=dialog.cancel_event,
+            duplicate_detector=self.duplicate_detector
+        )
+        
+        def done(result):
+            dialog.close()
+            self.report_cache.bump("refugiados")
+            summary = f"Refugiados insertados: {result.inserted}\nFilas rechazadas: {result.rejected}"
+            if result.rejected_path:
+                summary += f"\n\nLas filas rechazadas se guardaron en:\n{result.rejected_path}"
+            if result.cancelled:
+                summary = "Importación cancelada.\n\n" + summary
+            messagebox.showinfo("Importación", summary)
+            self.load_refugees()
+        
+        def failed(e):
+            dialog.close()
+            if not isinstance(e, ImportInterrupted):
+                messagebox.showerror("Error", f"Error al importar refugiados: {e}")
+                return
+            self.report_cache.bump("refugiados")
+            messagebox.showerror(
+                "Error",
+                f"La importación se detuvo en la fila {e.line}: {e.error}\n\n"
+                f"Refugiados insertados: {e.result.inserted}\nFilas rechazadas: {e.result.rejected}\n\n"
+                f"Las filas desde la {e.line} no se importaron."
+                + (f"\n\nLas filas rechazadas se guardaron en:\n{e.result.rejected_path}" if e.result.rejected_path else "")
+            )
+            self.load_refugees()
+        
+        self.db_worker.submit("Importando refugiados", importer.run, done, failed, supersede=False)
+
     def clear_refugee_form(self):
         self.refugee_name.delete(0, tk.END)
         self.refugee_id.delete(0, tk.END)
@@ -1096,91 +2318,124 @@ class RefugeeManagementApp:
         self.displacement_city.set('')
         self.displacement_reason.set('')
         self.refuge_city.set('')
+        self.refugee_shelter.set('')
+        self.refugee_shelter['values'] = []
     
     def generate_refugee_distribution_report(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT c.ciudad, c.departamento, 
-                       COUNT(r.id_refugiado) as cantidad_refugiados,
-                       GROUP_CONCAT(DISTINCT cd.ciudad SEPARATOR ', ') as ciudades_origen
-                FROM ciudades c
-                LEFT JOIN refugiados r ON c.id_ciudad = r.id_ciudad_a_refugiarse
-                LEFT JOIN ciudades cd ON r.id_ciudad_del_despiazamiento = cd.id_ciudad
-                GROUP BY c.ciudad, c.departamento
-                ORDER BY cantidad_refugiados DESC
-            """)
-            
-            results = cursor.fetchall()
-            cursor.close()
-            
-            self.report_text.delete(1.0, tk.END)
-            self.report_text.insert(tk.END, "DISTRIBUCIÓN DE REFUGIADOS POR CIUDAD\n\n")
-            self.report_text.insert(tk.END, "Ciudad (Departamento)\t\tRefugiados\tCiudades de Origen\n")
-            self.report_text.insert(tk.END, "="*80 + "\n")
-            
-            for row in results:
-                self.report_text.insert(tk.END, 
-                    f"{row['ciudad']} ({row['departamento']})\t\t{row['cantidad_refugiados']}\t\t{row['ciudades_origen']}\n")
-        except Error as e:
-            messagebox.showerror("Error", f"Error al generar reporte: {e}")
-    
+        def job(connection):
+            return self.report_cache.get_or_compute(
+                connection, "distribucion_refugiados", (), ("refugiados", "ciudades"),
+                self.report_repository.refugee_distribution
+            )
+        
+        def done(result):
+            results, cached = result
+            self.report_grid.show(
+                "DISTRIBUCIÓN DE REFUGIADOS POR CIUDAD" + (" (sin cambios desde la última consulta)" if cached else ""),
+                [("Ciudad", 160), ("Departamento", 140), ("Refugiados", 90), ("Ciudades de Origen", 600)],
+                [(row['ciudad'], row['departamento'], row['cantidad_refugiados'], row['ciudades_origen'])
+                 for row in results]
+            )
+        
+        self.db_worker.submit(
+            "Generando reporte", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al generar reporte: {e}")
+        )
+
     def generate_volunteers_by_city_report(self):
-        try:
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT c.ciudad, c.departamento, 
-                       COUNT(v.id_voluntario) as cantidad_voluntarios,
-                       GROUP_CONCAT(DISTINCT v.profesion SEPARATOR ', ') as profesiones
-                FROM ciudades c
-                LEFT JOIN voluntarios v ON c.id_ciudad = v.id_ciudad
-                GROUP BY c.ciudad, c.departamento
-                ORDER BY cantidad_voluntarios DESC
-            """)
-            
-            results = cursor.fetchall()
-            cursor.close()
-            
-            self.report_text.delete(1.0, tk.END)
-            self.report_text.insert(tk.END, "VOLUNTARIOS POR CIUDAD\n\n")
-            self.report_text.insert(tk.END, "Ciudad (Departamento)\t\tVoluntarios\tProfesiones\n")
-            self.report_text.insert(tk.END, "="*80 + "\n")
-            
-            for row in results:
-                self.report_text.insert(tk.END, 
-                    f"{row['ciudad']} ({row['departamento']})\t\t{row['cantidad_voluntarios']}\t\t{row['profesiones']}\n")
-        except Error as e:
-            messagebox.showerror("Error", f"Error al generar reporte: {e}")
+        def job(connection):
+            return self.report_cache.get_or_compute(
+                connection, "voluntarios_por_ciudad", (), ("voluntarios", "ciudades"),
+                self.report_repository.volunteers_by_city
+            )
+        
+        def done(result):
+            results, cached = result
+            self.report_grid.show(
+                "VOLUNTARIOS POR CIUDAD" + (" (sin cambios desde la última consulta)" if cached else ""),
+                [("Ciudad", 160), ("Departamento", 140), ("Voluntarios", 90), ("Profesiones", 600)],
+                [(row['ciudad'], row['departamento'], row['cantidad_voluntarios'], row['profesiones'])
+                 for row in results]
+            )
+        
+        # Comparte la acción con el otro reporte: el último botón pulsado es el que se muestra
+        self.db_worker.submit(
+            "Generando reporte", job, done,
+            lambda e: messagebox.showerror("Error", f"Error al generar reporte: {e}")
+        )
 
     def execute_shelter_stats_procedure(self):
-            try:
-                cursor = self.db_connection.cursor()
-                
-                # Ejecutar el procedimiento almacenado
-                cursor.callproc("ActualizarEstadisticasAlbergues")
-                self.db_connection.commit()
-                
-                # Mostrar resultados actualizados
-                cursor.execute("""
-                    SELECT a.nombre, c.ciudad, a.personas_albergadas, a.ciudad_de_procedencia
-                    FROM albergues a
-                    JOIN ciudades c ON a.id_ciudad = c.id_ciudad
-                    ORDER BY a.personas_albergadas DESC
-                """)
-                results = cursor.fetchall()
-                
-                self.report_text.delete(1.0, tk.END)
-                self.report_text.insert(tk.END, "ESTADÍSTICAS ACTUALIZADAS DE ALBERGUES\n\n")
-                self.report_text.insert(tk.END, "Albergue (Ciudad)\t\tPersonas\tCiudad de Procedencia\n")
-                self.report_text.insert(tk.END, "="*80 + "\n")
-                
-                for row in results:
-                    self.report_text.insert(tk.END, f"{row[0]} ({row[1]})\t\t{row[2]}\t\t{row[3]}\n")
-            except Error as e:
-                messagebox.showerror("Error", f"Error al ejecutar el procedimiento almacenado: {e}")
-
-            cursor.close()
+        # La conexión dedicada confirma al terminar, si no se canceló antes
+        def job(connection):
+            # Ejecutar el procedimiento almacenado
+            self.report_repository.update_shelter_stats(connection)
+            
+            # Mostrar resultados actualizados
+            return self.report_repository.shelter_stats(connection)
+        
+        def done(results):
+            self.report_cache.bump("albergues")
+            self.report_grid.show(
+                "ESTADÍSTICAS ACTUALIZADAS DE ALBERGUES",
+                [("Albergue", 200), ("Ciudad", 160), ("Personas", 90), ("Ciudad de Procedencia", 200)],
+                [tuple(row) for row in results]
+            )
+            
             messagebox.showinfo("Éxito", "Estadísticas de albergues actualizadas correctamente")
+        
+        self.run_long_procedure(
+            "Actualizando estadísticas de albergues", job, done, "Error al ejecutar el procedimiento almacenado"
+        )
+
+    def run_long_procedure(self, action, job, on_success, error_message):
+        # Procedimientos que pueden tardar minutos: corren en una conexión dedicada,
+        # muestran el tiempo transcurrido y se pueden cancelar con KILL QUERY. Los
+        # resultados se muestran solo al terminar.
+        if self.procedure_call:
+            return
+        
+        def finish():
+            self.procedure_call = None
+            self.shelter_stats_button.configure(state="normal")
+            self.procedure_cancel_button.configure(state="disabled")
+        
+        def done(result):
+            finish()
+            self.procedure_status.configure(text=f"{action}: terminado en {call.elapsed():.1f} s")
+            on_success(result)
+        
+        def failed(e):
+            finish()
+            if isinstance(e, QueryCancelled):
+                self.procedure_status.configure(text=f"{action}: cancelado a los {call.elapsed():.1f} s")
+            else:
+                self.procedure_status.configure(text="")
+                messagebox.showerror("Error", f"{error_message}: {e}")
+        
+        call = self.db_worker.submit_dedicated(action, job, done, failed)
+        self.procedure_call = call
+        self.shelter_stats_button.configure(state="disabled")
+        self.procedure_cancel_button.configure(state="normal")
+        self.show_procedure_elapsed(action, call)
+
+    def show_procedure_elapsed(self, action, call):
+        if self.procedure_call is not call or call.cancelled.is_set():
+            return
+        self.procedure_status.configure(text=f"{action}: {call.elapsed():.0f} s")
+        self.root.after(500, self.show_procedure_elapsed, action, call)
+
+    def cancel_procedure(self):
+        call = self.procedure_call
+        if not call:
+            return
+        self.procedure_cancel_button.configure(state="disabled")
+        self.procedure_status.configure(text="Cancelando...")
+        self.db_worker.submit(
+            "Cancelando procedimiento", call.cancel, None,
+            lambda e: messagebox.showerror("Error", f"Error al cancelar el procedimiento: {e}"),
+            supersede=False
+        )
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = RefugeeManagementApp(root)
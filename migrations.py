@@ -0,0 +1,270 @@
+import argparse
+import configparser
+import hashlib
+import os
+import re
+import sys
+
+from mysql.connector import Error
+
+from database import create_pool
+from queries import (
+    CITIES_SELECT, REFUGEE_DISTRIBUTION_REPORT, REFUGEES_SELECT, SHELTER_STATS_REPORT, SHELTERS_SELECT,
+    VOLUNTEERS_BY_CITY_REPORT, VOLUNTEERS_SELECT
+)
+from duplicates import PENDING_PAIRS_SQL
+from shelter_assignment import PENDING_SQL, SHELTERS_SQL
+
+# Carpeta con los scripts numerados: NNN_descripcion.sql. El motor SQLite local
+# tiene sus propios scripts en sql/sqlite
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+MIGRATIONS_DIRS = {"mysql": MIGRATIONS_DIR, "sqlite": os.path.join(MIGRATIONS_DIR, "sqlite")}
+
+MIGRATION_FILE = re.compile(r"^(\d+)_(.+)\.sql$")
+
+CREATE_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Consultas que emite la aplicación, con parámetros representativos, y los alias
+# a los que se les permite un recorrido completo: tablas pequeñas que guían un
+# GROUP BY, o listas que por diseño devuelven la tabla entera (combobox,
+# estadísticas y asignación de albergues). Las sentencias de escritura por id no
+# se incluyen.
+QUERY_CHECKS = [
+    ("Página de refugiados",
+     f"{REFUGEES_SELECT} ORDER BY r.nombre, r.id_refugiado LIMIT 200", (), set()),
+    ("Página siguiente de refugiados",
+     f"""{REFUGEES_SELECT}
+         WHERE (r.nombre > %s OR (r.nombre = %s AND r.id_refugiado > %s))
+         ORDER BY r.nombre, r.id_refugiado LIMIT 200""", ("M", "M", 0), set()),
+    ("Refugiado por id",
+     f"{REFUGEES_SELECT} WHERE r.id_refugiado = %s", (1,), set()),
+    ("Búsqueda de refugiados por identificación",
+     f"{REFUGEES_SELECT} WHERE r.identificacion LIKE %s ORDER BY r.nombre, r.id_refugiado LIMIT 200",
+     ("10%",), set()),
+    ("Búsqueda de refugiados por nombre",
+     f"""{REFUGEES_SELECT} WHERE MATCH(r.nombre) AGAINST (%s IN BOOLEAN MODE)
+         ORDER BY r.nombre, r.id_refugiado LIMIT 200""", ("+maria*",), set()),
+    ("Página de albergues",
+     f"{SHELTERS_SELECT} ORDER BY a.nombre, a.id_albergue LIMIT 200", (), set()),
+    ("Página de voluntarios",
+     f"{VOLUNTEERS_SELECT} ORDER BY v.nombre, v.id_voluntario LIMIT 200", (), set()),
+    ("Refugiado por identificación normalizada",
+     "SELECT id_refugiado, nombre, identificacion FROM refugiados WHERE identificacion_normalizada = %s",
+     ("1",), set()),
+    ("Voluntario por identificación",
+     "SELECT id_voluntario FROM voluntarios WHERE identificacion = %s LIMIT 1", ("1",), set()),
+    ("Página de ciudades",
+     f"{CITIES_SELECT} ORDER BY c.ciudad, c.id_ciudad LIMIT 200", (), set()),
+    ("Refugiados por id (cambios y selección)",
+     f"{REFUGEES_SELECT} WHERE r.id_refugiado IN (%s, %s, %s)", (1, 2, 3), set()),
+    ("Conteo de refugiados", "SELECT COUNT(*) FROM refugiados r", (), set()),
+    ("Conteo de refugiados por identificación",
+     "SELECT COUNT(*) FROM refugiados r WHERE r.identificacion LIKE %s", ("10%",), set()),
+    ("Conteo de refugiados por nombre",
+     "SELECT COUNT(*) FROM refugiados r WHERE MATCH(r.nombre) AGAINST (%s IN BOOLEAN MODE)", ("+maria*",), set()),
+    ("Conteo de albergues", "SELECT COUNT(*) FROM albergues a", (), set()),
+    ("Conteo de voluntarios", "SELECT COUNT(*) FROM voluntarios v", (), set()),
+    ("Conteo de ciudades", "SELECT COUNT(*) FROM ciudades c", (), set()),
+    ("Lista de albergues para los combobox",
+     "SELECT id_albergue, nombre, id_ciudad FROM albergues ORDER BY nombre", (), {"albergues"}),
+    ("Lista de ciudades para los combobox",
+     "SELECT id_ciudad, ciudad, departamento FROM ciudades ORDER BY ciudad", (), {"ciudades"}),
+    ("Reporte de distribución de refugiados", REFUGEE_DISTRIBUTION_REPORT, (), {"c"}),
+    ("Reporte de voluntarios por ciudad", VOLUNTEERS_BY_CITY_REPORT, (), {"c"}),
+    ("Estadísticas de albergues", SHELTER_STATS_REPORT, (), {"a"}),
+    ("Cambios nuevos",
+     """SELECT id_cambio, tabla, id_fila, operacion FROM registro_cambios
+        WHERE id_cambio > %s ORDER BY id_cambio LIMIT %s""", (0, 1000), set()),
+    ("Cambios de un hueco",
+     """SELECT id_cambio, tabla, id_fila, operacion FROM registro_cambios
+        WHERE id_cambio IN (%s, %s)""", (1, 2), set()),
+    ("Albergues con capacidad para la asignación", SHELTERS_SQL, (), {"a"}),
+    ("Refugiados sin albergue", PENDING_SQL, (), {"r"}),
+    ("Refugiados con claves de nombre parecidas",
+     """SELECT DISTINCT r.id_refugiado, r.nombre, r.identificacion
+        FROM claves_refugiados k
+        JOIN refugiados r ON r.id_refugiado = k.id_refugiado
+        WHERE k.clave IN (%s, %s) LIMIT %s""", ("gomes maria", "gomes peres", 5000), set()),
+    ("Cola de posibles duplicados", PENDING_PAIRS_SQL, (1000,), set()),
+    ("Refugiados importados sin claves de nombre",
+     """SELECT r.id_refugiado, r.nombre FROM refugiados r
+        WHERE r.identificacion IN (%s, %s)
+          AND NOT EXISTS (SELECT 1 FROM claves_refugiados k WHERE k.id_refugiado = r.id_refugiado)""",
+     ("1", "2"), set()),
+]
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(file_name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, file_name)))
+    migrations.sort()
+    return migrations
+
+
+def file_checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def split_statements(script):
+    # Divide un script como lo haría el cliente mysql, incluyendo las directivas
+    # DELIMITER que se usan para definir triggers y procedimientos
+    delimiter = ";"
+    statements = []
+    current = []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        current.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(current).strip()
+            statements.append(statement[:-len(delimiter)].strip())
+            current = []
+    statements.append("\n".join(current).strip())
+
+    # Descartar fragmentos que solo tienen comentarios
+    def has_code(statement):
+        return any(line.strip() and not line.strip().startswith("--") for line in statement.splitlines())
+    return [statement for statement in statements if has_code(statement)]
+
+
+class MigrationRunner:
+    # Aplica en orden los scripts de sql/ que aún no figuran en schema_version.
+    # MySQL confirma implícitamente cada DDL, así que la versión se registra al
+    # terminar cada archivo; si uno falla, los siguientes no se aplican.
+    def __init__(self, connection, directory=MIGRATIONS_DIR):
+        self.connection = connection
+        self.directory = directory
+
+    def ensure_version_table(self):
+        cursor = self.connection.cursor()
+        cursor.execute(CREATE_VERSION_TABLE)
+        cursor.close()
+
+    def applied_versions(self):
+        self.ensure_version_table()
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT version, checksum FROM schema_version")
+        applied = dict(cursor.fetchall())
+        cursor.close()
+        return applied
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [migration for migration in discover_migrations(self.directory) if migration[0] not in applied]
+
+    def apply_pending(self, log=print):
+        applied = []
+        for version, name, path in self.pending():
+            log(f"Aplicando migración {version:03d}_{name}...")
+            with open(path, encoding="utf-8") as f:
+                statements = split_statements(f.read())
+            cursor = self.connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+                    if cursor.with_rows:
+                        cursor.fetchall()
+                self.record(cursor, version, name, path)
+                self.connection.commit()
+            except Error:
+                self.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+            applied.append(version)
+        return applied
+
+    def mark_applied(self, up_to_version):
+        # Para bases donde los scripts ya se ejecutaron a mano (p. ej. en Workbench)
+        cursor = self.connection.cursor()
+        for version, name, path in self.pending():
+            if version <= up_to_version:
+                self.record(cursor, version, name, path)
+        self.connection.commit()
+        cursor.close()
+
+    def record(self, cursor, version, name, path):
+        cursor.execute(
+            "INSERT INTO schema_version (version, nombre, checksum) VALUES (%s, %s, %s)",
+            (version, name, file_checksum(path))
+        )
+
+    def status(self):
+        applied = self.applied_versions()
+        rows = []
+        for version, name, path in discover_migrations(self.directory):
+            if version not in applied:
+                state = "pendiente"
+            elif applied[version] != file_checksum(path):
+                state = "aplicada (el archivo cambió después)"
+            else:
+                state = "aplicada"
+            rows.append((version, name, state))
+        return rows
+
+    def check_queries(self, checks=QUERY_CHECKS):
+        # Ejecuta EXPLAIN sobre cada consulta y devuelve los recorridos completos
+        # de tabla (type = ALL) que no estén permitidos
+        problems = []
+        cursor = self.connection.cursor(dictionary=True)
+        for name, sql, params, allowed in checks:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            for step in cursor.fetchall():
+                if step["type"] == "ALL" and step["table"] not in allowed:
+                    problems.append((name, step["table"], step["rows"]))
+        cursor.close()
+        return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de refugiados")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--status", action="store_true", help="mostrar las migraciones y su estado")
+    parser.add_argument("--check", action="store_true", help="verificar con EXPLAIN las consultas de la aplicación")
+    parser.add_argument("--mark-applied", type=int, metavar="VERSION",
+                        help="registrar como aplicadas, sin ejecutarlas, las migraciones hasta VERSION")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    pool = create_pool(config["mysql"])
+
+    with pool.connection() as connection:
+        runner = MigrationRunner(connection, MIGRATIONS_DIRS[pool.dialect])
+        if args.status:
+            for version, name, state in runner.status():
+                print(f"{version:03d}_{name}: {state}")
+            return 0
+        if args.mark_applied is not None:
+            runner.mark_applied(args.mark_applied)
+            print(f"Migraciones hasta {args.mark_applied:03d} registradas como aplicadas")
+            return 0
+
+        applied = runner.apply_pending()
+        print(f"{len(applied)} migraciones aplicadas" if applied else "El esquema está al día")
+
+        if args.check and pool.dialect == "mysql":
+            problems = runner.check_queries()
+            for name, table, rows in problems:
+                print(f"Recorrido completo en '{name}': tabla {table} (~{rows} filas)")
+            if problems:
+                return 1
+            print("Todas las consultas usan índices")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+
+# Motivos de desplazamiento aceptados en el formulario y en la importación
+MOTIVOS_DESPLAZAMIENTO = [
+    "Conflicto armado", "Desastres naturales", "Violencia social", 
+    "Persecución política", "Desplazamiento forzado por bandas"
+]
+
+# Clases DTO (Data Transfer Objects)
+@dataclass
+class RefugiadoDTO:
+    id_refugiado: int = None
+    nombre: str = None
+    identificacion: str = None
+    numero_de_contacto: str = None
+    email: str = None
+    id_ciudad_despiazamiento: int = None
+    motivo_despiazamiento: str = None
+    id_ciudad_refugio: int = None
+    id_albergue: int = None
+
+@dataclass
+class VoluntarioDTO:
+    id_voluntario: int = None
+    nombre: str = None
+    identificacion: str = None
+    id_ciudad: int = None
+    id_albergue: int = None
+    profesion: str = None
+
+@dataclass
+class AlbergueDTO:
+    id_albergue: int = None
+    nombre: str = None
+    id_ciudad: int = None
+    direccion_del_albergue: str = None
+    personas_albergadas: int = None
+    ciudad_de_procedencia: str = None
+    capacidad: int = None
+
+@dataclass
+class CiudadDTO:
+    id_ciudad: int = None
+    departamento: str = None
+    ciudad: str = None
+    localidad: str = None
+    cantidad_de_habitantes: int = None
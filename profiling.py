@@ -0,0 +1,205 @@
+import collections
+import datetime
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Ejecuciones que se conservan; las más viejas se descartan
+DEFAULT_CAPACITY = 5000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def normalize_statement(sql):
+    # Una sola línea, y las listas de parámetros de largo variable (IN, INSERT de
+    # varias filas) reducidas a una, para agrupar las ejecuciones de la misma consulta
+    sql = " ".join(sql.split())
+    sql = re.sub(r"%s(?:, %s)+", "%s, ...", sql)
+    return re.sub(r"\(%s, \.\.\.\)(?:, \(%s, \.\.\.\))+", "(%s, ...), ...", sql)
+
+
+def job_origin(job):
+    # "RefugeeManagementApp.add_refugee.<locals>.job" -> "RefugeeManagementApp.add_refugee"
+    name = getattr(job, "__qualname__", type(job).__name__)
+    return name.split(".<locals>")[0]
+
+
+class QueryProfiler:
+    # Registro de cada sentencia: texto, duración (execute o callproc más los
+    # fetch de sus filas), filas devueltas, acción del worker y método que la
+    # originó. Se guarda en un búfer circular de tamaño fijo, así que el costo en
+    # memoria no crece con las horas de uso; stats() agrupa por sentencia.
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.records = collections.deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def context(self, action, job, origin=None):
+        # Atribuye al trabajo del worker las sentencias que se ejecuten en este hilo
+        previous = getattr(self.local, "origin", None)
+        self.local.origin = (action, origin or job_origin(job))
+        try:
+            yield
+        finally:
+            self.local.origin = previous
+
+    def start(self, statement):
+        action, origin = getattr(self.local, "origin", None) or (None, None)
+        record = {
+            "sentencia": statement,
+            "accion": action,
+            "origen": origin,
+            "fecha": time.time(),
+            "segundos": 0.0,
+            "filas": 0,
+            "error": None,
+        }
+        with self.lock:
+            self.records.append(record)
+        return record
+
+    def measure(self, record, method, *args, **kwargs):
+        # Suma al registro el tiempo de la llamada (y su error, si falla)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            if record is not None:
+                record["error"] = str(e)
+            raise
+        finally:
+            if record is not None:
+                record["segundos"] += time.perf_counter() - started
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def stats(self):
+        # Una entrada por sentencia, de la más lenta (p95) a la más rápida
+        groups = {}
+        for record in self.snapshot():
+            groups.setdefault(normalize_statement(record["sentencia"]), []).append(record)
+
+        stats = []
+        for statement, records in groups.items():
+            millis = [record["segundos"] * 1000 for record in records]
+            stats.append({
+                "sentencia": statement,
+                "origenes": sorted({record["origen"] for record in records if record["origen"]}),
+                "ejecuciones": len(records),
+                "errores": sum(1 for record in records if record["error"]),
+                "p50_ms": round(percentile(millis, 0.50), 2),
+                "p95_ms": round(percentile(millis, 0.95), 2),
+                "p99_ms": round(percentile(millis, 0.99), 2),
+                "max_ms": round(max(millis), 2),
+                "filas_promedio": round(sum(record["filas"] for record in records) / len(records), 1),
+            })
+        stats.sort(key=lambda entry: entry["p95_ms"], reverse=True)
+        return stats
+
+    def export_json(self, path, extra=None):
+        records = self.snapshot()
+        report = {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            **(extra or {}),
+            "estadisticas": self.stats(),
+            "ejecuciones": [
+                dict(record, fecha=datetime.datetime.fromtimestamp(record["fecha"]).isoformat(timespec="milliseconds"),
+                     ms=round(record["segundos"] * 1000, 3))
+                for record in records
+            ],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return len(records)
+
+
+class StartupTimer:
+    # Milisegundos desde que arranca la aplicación hasta cada fase del inicio. Solo
+    # cuenta la primera vez que se alcanza cada fase: las recargas posteriores no
+    # cambian el reporte.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, phase):
+        if phase in self.marks:
+            return False
+        self.marks[phase] = round((time.perf_counter() - self.started) * 1000, 1)
+        return True
+
+    def summary(self):
+        return ", ".join(f"{phase}: {millis:.0f} ms" for phase, millis in self.marks.items())
+
+
+class ProfiledCursor:
+    # Cursor que mide cada execute/executemany/callproc y los fetch que le siguen;
+    # el resto de atributos (column_names, lastrowid, rowcount...) pasan directo
+    def __init__(self, cursor, profiler):
+        self.cursor = cursor
+        self.profiler = profiler
+        self.record = None
+
+    def execute(self, sql, *args, **kwargs):
+        self.record = self.profiler.start(sql)
+        return self.timed(self.cursor.execute, sql, *args, **kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        self.record = self.profiler.start(sql)
+        return self.timed(self.cursor.executemany, sql, *args, **kwargs)
+
+    def callproc(self, name, *args, **kwargs):
+        self.record = self.profiler.start(f"CALL {name}")
+        return self.timed(self.cursor.callproc, name, *args, **kwargs)
+
+    def fetchone(self):
+        row = self.timed(self.cursor.fetchone)
+        self.count_rows(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.timed(self.cursor.fetchmany, *args, **kwargs)
+        self.count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self.timed(self.cursor.fetchall)
+        self.count_rows(len(rows))
+        return rows
+
+    def timed(self, method, *args, **kwargs):
+        return self.profiler.measure(self.record, method, *args, **kwargs)
+
+    def count_rows(self, rows):
+        if self.record is not None:
+            self.record["filas"] += rows
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class ProfiledConnection:
+    # Conexión que entrega cursores medidos; lo demás pasa a la conexión real
+    def __init__(self, connection, profiler):
+        self.connection = connection
+        self.profiler = profiler
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self.connection.cursor(*args, **kwargs), self.profiler)
+
+    def commit(self):
+        self.profiler.measure(self.profiler.start("COMMIT"), self.connection.commit)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
@@ -0,0 +1,109 @@
+# Consultas de las tablas (columnas que se muestran en cada Treeview)
+REFUGEES_SELECT = """
+    SELECT r.*, 
+           c1.ciudad as ciudad_origen, c1.departamento as depto_origen,
+           c2.ciudad as ciudad_refugio, 
+           a.nombre as albergue
+    FROM refugiados r
+    JOIN ciudades c1 ON r.id_ciudad_del_despiazamiento = c1.id_ciudad
+    JOIN ciudades c2 ON r.id_ciudad_a_refugiarse = c2.id_ciudad
+    LEFT JOIN albergues a ON r.id_albergue = a.id_albergue
+"""
+
+SHELTERS_SELECT = """
+    SELECT a.*, c.ciudad as nombre_ciudad 
+    FROM albergues a
+    JOIN ciudades c ON a.id_ciudad = c.id_ciudad
+"""
+
+VOLUNTEERS_SELECT = """
+    SELECT v.*, c.ciudad as nombre_ciudad, a.nombre as nombre_albergue
+    FROM voluntarios v
+    LEFT JOIN ciudades c ON v.id_ciudad = c.id_ciudad
+    LEFT JOIN albergues a ON v.id_albergue = a.id_albergue
+"""
+
+CITIES_SELECT = """
+    SELECT c.* 
+    FROM ciudades c
+"""
+
+# Consultas de los reportes. Leen las tablas resumen (migración 005), que los
+# triggers mantienen al día, así recorren una fila por ciudad y combinación en
+# lugar de agrupar todos los refugiados y voluntarios.
+REFUGEE_DISTRIBUTION_REPORT = """
+    SELECT c.ciudad, c.departamento, 
+           CAST(COALESCE(SUM(s.cantidad), 0) AS SIGNED) as cantidad_refugiados,
+           GROUP_CONCAT(DISTINCT cd.ciudad SEPARATOR ', ') as ciudades_origen
+    FROM ciudades c
+    LEFT JOIN resumen_refugiados_origen s ON c.id_ciudad = s.id_ciudad_refugio
+    LEFT JOIN ciudades cd ON s.id_ciudad_origen = cd.id_ciudad
+    GROUP BY c.ciudad, c.departamento
+    ORDER BY cantidad_refugiados DESC
+"""
+
+# resumen_voluntarios_profesion guarda la profesión NULL como '' (es parte de la
+# llave), así que NULLIF la vuelve a omitir como antes. Diferencia con el reporte
+# original sobre voluntarios: una profesión guardada como cadena vacía tampoco
+# aparece en la lista (antes salía como un elemento vacío, "Médico, , Docente").
+VOLUNTEERS_BY_CITY_REPORT = """
+    SELECT c.ciudad, c.departamento, 
+           CAST(COALESCE(SUM(s.cantidad), 0) AS SIGNED) as cantidad_voluntarios,
+           GROUP_CONCAT(DISTINCT NULLIF(s.profesion, '') SEPARATOR ', ') as profesiones
+    FROM ciudades c
+    LEFT JOIN resumen_voluntarios_profesion s ON c.id_ciudad = s.id_ciudad
+    GROUP BY c.ciudad, c.departamento
+    ORDER BY cantidad_voluntarios DESC
+"""
+
+# Estadísticas de albergues (las calcula ActualizarEstadisticasAlbergues); se
+# muestran todos, así que el recorrido completo de albergues es esperado
+SHELTER_STATS_REPORT = """
+    SELECT a.nombre, c.ciudad, a.personas_albergadas, a.ciudad_de_procedencia
+    FROM albergues a
+    JOIN ciudades c ON a.id_ciudad = c.id_ciudad
+    ORDER BY a.personas_albergadas DESC
+"""
+
+# Los mismos reportes para SQLite, que no admite SEPARATOR junto con DISTINCT. La
+# lista se arma con GROUP_CONCAT(x, ', ') sobre un SELECT DISTINCT por ciudad (sin
+# reemplazar comas, que también cambiaría las de los nombres) y se une por ciudad.
+REFUGEE_DISTRIBUTION_REPORT_SQLITE = """
+    SELECT c.ciudad, c.departamento, 
+           COALESCE(SUM(s.cantidad), 0) as cantidad_refugiados,
+           MAX(o.ciudades_origen) as ciudades_origen
+    FROM ciudades c
+    LEFT JOIN resumen_refugiados_origen s ON c.id_ciudad = s.id_ciudad_refugio
+    LEFT JOIN (
+        SELECT ciudad, departamento, GROUP_CONCAT(origen, ', ') as ciudades_origen
+        FROM (
+            SELECT DISTINCT cr.ciudad, cr.departamento, cd.ciudad as origen
+            FROM resumen_refugiados_origen s
+            JOIN ciudades cr ON cr.id_ciudad = s.id_ciudad_refugio
+            JOIN ciudades cd ON cd.id_ciudad = s.id_ciudad_origen
+        )
+        GROUP BY ciudad, departamento
+    ) o ON o.ciudad IS c.ciudad AND o.departamento IS c.departamento
+    GROUP BY c.ciudad, c.departamento
+    ORDER BY cantidad_refugiados DESC
+"""
+
+VOLUNTEERS_BY_CITY_REPORT_SQLITE = """
+    SELECT c.ciudad, c.departamento, 
+           COALESCE(SUM(s.cantidad), 0) as cantidad_voluntarios,
+           MAX(p.profesiones) as profesiones
+    FROM ciudades c
+    LEFT JOIN resumen_voluntarios_profesion s ON c.id_ciudad = s.id_ciudad
+    LEFT JOIN (
+        SELECT ciudad, departamento, GROUP_CONCAT(profesion, ', ') as profesiones
+        FROM (
+            SELECT DISTINCT cv.ciudad, cv.departamento, s.profesion
+            FROM resumen_voluntarios_profesion s
+            JOIN ciudades cv ON cv.id_ciudad = s.id_ciudad
+            WHERE s.profesion <> ''
+        )
+        GROUP BY ciudad, departamento
+    ) p ON p.ciudad IS c.ciudad AND p.departamento IS c.departamento
+    GROUP BY c.ciudad, c.departamento
+    ORDER BY cantidad_voluntarios DESC
+"""
@@ -0,0 +1,57 @@
+import threading
+
+from mysql.connector import Error
+
+
+class ReportCache:
+    # Caché de resultados de reportes por (reporte, parámetros). Cada entrada
+    # guarda la versión de las tablas de las que depende: la versión local, que
+    # suben los métodos CRUD de esta aplicación, y la versión de la tabla
+    # versiones_tablas, que suben los triggers con cualquier escritura. Mientras
+    # ninguna cambie, el reporte se entrega sin volver a ejecutarse.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local_versions = {}
+        self.entries = {}
+
+    def bump(self, *tables):
+        with self.lock:
+            for table in tables:
+                self.local_versions[table] = self.local_versions.get(table, 0) + 1
+
+    def db_versions(self, connection, tables):
+        try:
+            cursor = connection.cursor()
+            placeholders = ", ".join(["%s"] * len(tables))
+            cursor.execute(f"SELECT tabla, version FROM versiones_tablas WHERE tabla IN ({placeholders})",
+                           tuple(tables))
+            versions = dict(cursor.fetchall())
+            cursor.close()
+            return versions
+        except Error:
+            # Sin la tabla de versiones (migración 004 sin aplicar) solo se usan las locales
+            return {}
+
+    def snapshot(self, connection, tables):
+        db_versions = self.db_versions(connection, tables)
+        with self.lock:
+            return tuple((table, self.local_versions.get(table, 0), db_versions.get(table)) for table in tables)
+
+    def get_or_compute(self, connection, report, params, tables, compute):
+        # Devuelve (filas, desde_cache). La versión se toma antes de calcular, así
+        # una escritura concurrente deja la entrada vieja y fuerza otro cálculo.
+        key = (report, params)
+        versions = self.snapshot(connection, tables)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] == versions:
+            return entry[1], True
+
+        rows = compute(connection)
+        with self.lock:
+            self.entries[key] = (versions, rows)
+        return rows, False
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,367 @@
+import re
+
+from database import execute_prepared
+from models import AlbergueDTO, CiudadDTO, RefugiadoDTO, VoluntarioDTO
+from queries import (
+    CITIES_SELECT, REFUGEE_DISTRIBUTION_REPORT, REFUGEE_DISTRIBUTION_REPORT_SQLITE, REFUGEES_SELECT,
+    SHELTER_STATS_REPORT, SHELTERS_SELECT, VOLUNTEERS_BY_CITY_REPORT, VOLUNTEERS_BY_CITY_REPORT_SQLITE,
+    VOLUNTEERS_SELECT
+)
+
+# Longitud mínima de palabra que indexa FULLTEXT en InnoDB (innodb_ft_min_token_size)
+FULLTEXT_MIN_WORD = 3
+
+# Filas por sentencia en las operaciones masivas (INSERT de varias filas, DELETE ... IN)
+BULK_CHUNK_SIZE = 1000
+
+
+def keyset_condition(after_key, name_column, id_column):
+    # Condición "(nombre, id) > (ultimo_nombre, ultimo_id)" escrita de forma
+    # que MySQL pueda recorrer el índice sobre (nombre, id)
+    if after_key is None:
+        return "", ()
+    name, row_id = after_key
+    condition = f"({name_column} > %s OR ({name_column} = %s AND {id_column} > %s))"
+    return condition, (name, name, row_id)
+
+
+def where_clause(*conditions):
+    # Une condiciones (sql, params) con AND, omitiendo las vacías
+    parts = [(sql, params) for sql, params in conditions if sql]
+    if not parts:
+        return "", ()
+    sql = "WHERE " + " AND ".join(part for part, _ in parts)
+    params = tuple(param for _, part_params in parts for param in part_params)
+    return sql, params
+
+
+def like_prefix(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Repository:
+    # Acceso a una tabla sin depender de la interfaz: lo usan la aplicación Tk,
+    # la importación y cualquier script por lotes. Las lecturas de páginas y filas
+    # devuelven diccionarios con las columnas que muestra la interfaz (incluidos
+    # los joins); list/get devuelven DTOs. Las escrituras no confirman: el llamador
+    # decide cuándo hacer commit, así varias operaciones pueden ir en una transacción.
+    # Las escrituras fila a fila y la lectura por id usan sentencias preparadas que
+    # se reutilizan en cada conexión (prepared=False vuelve al cursor de texto).
+    # dialect es el del pool ("mysql" o "sqlite") y solo cambia las búsquedas.
+    dto = None
+    table = None
+    alias = None
+    # Campo del DTO y columna de la llave primaria (se llaman igual)
+    id_field = None
+    # Columna por la que se ordenan las páginas, junto con la llave primaria
+    name_column = None
+    # Consulta con los joins que muestra la interfaz
+    select = None
+    # (campo del DTO, columna de la tabla) para todo salvo la llave primaria
+    fields = ()
+    # Columna que identifica a la persona fuera de la base (se llama igual en el
+    # DTO); el reenvío de escrituras pendientes la usa para no duplicar filas
+    natural_key = None
+
+    def __init__(self, prepared=True, dialect="mysql"):
+        self.prepared = prepared
+        self.dialect = dialect
+        columns = ", ".join(column for _, column in self.fields)
+        placeholders = ", ".join(["%s"] * len(self.fields))
+        assignments = ", ".join(f"{column} = %s" for _, column in self.fields)
+        self.insert_sql = f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders})"
+        self.update_sql = f"UPDATE {self.table} SET {assignments} WHERE {self.id_field} = %s"
+        self.delete_sql = f"DELETE FROM {self.table} WHERE {self.id_field} = %s"
+        self.row_sql = f"{self.select} WHERE {self.alias}.{self.id_field} = %s"
+        self.natural_key_sql = (
+            f"SELECT {self.id_field} FROM {self.table} WHERE {self.natural_key} = %s LIMIT 1"
+            if self.natural_key else None
+        )
+
+    def execute(self, connection, sql, params):
+        # Devuelve un cursor con la sentencia ya ejecutada; el preparado se
+        # reutiliza y no se cierra
+        if self.prepared:
+            return execute_prepared(connection, sql, params)
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def release(self, cursor):
+        if not self.prepared:
+            cursor.close()
+
+    def search_condition(self, search):
+        return "", ()
+
+    def fetch_page(self, connection, after_key=None, limit=None, search=None):
+        condition, params = where_clause(
+            self.search_condition(search),
+            keyset_condition(after_key, f"{self.alias}.{self.name_column}", f"{self.alias}.{self.id_field}")
+        )
+        limit_clause = "LIMIT %s" if limit else ""
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"""
+            {self.select}
+            {condition}
+            ORDER BY {self.alias}.{self.name_column}, {self.alias}.{self.id_field}
+            {limit_clause}
+        """, (*params, limit) if limit else params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def fetch_rows(self, connection, row_ids, search=None, chunk_size=BULK_CHUNK_SIZE):
+        # Filas actuales de esos ids que cumplen la búsqueda; las borradas no vuelven
+        rows = []
+        cursor = connection.cursor(dictionary=True)
+        for chunk in chunks(row_ids, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            condition, params = where_clause(
+                (f"{self.alias}.{self.id_field} IN ({placeholders})", tuple(chunk)),
+                self.search_condition(search)
+            )
+            cursor.execute(f"{self.select} {condition}", params)
+            rows.extend(cursor.fetchall())
+        cursor.close()
+        return rows
+
+    def fetch_row(self, connection, row_id):
+        cursor = self.execute(connection, self.row_sql, (row_id,))
+        rows = cursor.fetchall()
+        columns = cursor.column_names
+        self.release(cursor)
+        return dict(zip(columns, rows[0])) if rows else None
+
+    def find_by_natural_key(self, connection, value):
+        # Id de la fila con esa llave natural, o None
+        cursor = self.execute(connection, self.natural_key_sql, (value,))
+        rows = cursor.fetchall()
+        self.release(cursor)
+        return rows[0][0] if rows else None
+
+    def count(self, connection, search=None):
+        condition, params = where_clause(self.search_condition(search))
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {self.table} {self.alias} {condition}", params)
+        total = cursor.fetchone()[0]
+        cursor.close()
+        return total
+
+    def list(self, connection, after_key=None, limit=None, search=None):
+        return [self.to_dto(row) for row in self.fetch_page(connection, after_key, limit, search)]
+
+    def get(self, connection, row_id):
+        row = self.fetch_row(connection, row_id)
+        return self.to_dto(row) if row else None
+
+    def to_dto(self, row):
+        values = {field: row[column] for field, column in self.fields}
+        return self.dto(**{self.id_field: row[self.id_field]}, **values)
+
+    def to_params(self, dto):
+        return tuple(getattr(dto, field) for field, _ in self.fields)
+
+    def insert(self, connection, dto):
+        cursor = self.execute(connection, self.insert_sql, self.to_params(dto))
+        new_id = cursor.lastrowid
+        self.release(cursor)
+        setattr(dto, self.id_field, new_id)
+        return new_id
+
+    def update(self, connection, dto):
+        cursor = self.execute(connection, self.update_sql, (*self.to_params(dto), getattr(dto, self.id_field)))
+        updated = cursor.rowcount
+        self.release(cursor)
+        return updated
+
+    def delete(self, connection, row_id):
+        cursor = self.execute(connection, self.delete_sql, (row_id,))
+        deleted = cursor.rowcount
+        self.release(cursor)
+        return deleted
+
+    def bulk_insert(self, connection, dtos, chunk_size=BULK_CHUNK_SIZE):
+        # executemany con INSERT ... VALUES se envía como un INSERT de varias filas
+        cursor = connection.cursor()
+        inserted = 0
+        for chunk in chunks(dtos, chunk_size):
+            cursor.executemany(self.insert_sql, [self.to_params(dto) for dto in chunk])
+            inserted += len(chunk)
+        cursor.close()
+        return inserted
+
+    def bulk_update(self, connection, row_ids, values, chunk_size=BULK_CHUNK_SIZE):
+        # values: {campo del DTO: valor}, el mismo para todas las filas
+        columns = dict(self.fields)
+        assignments = ", ".join(f"{columns[field]} = %s" for field in values)
+        cursor = connection.cursor()
+        updated = 0
+        for chunk in chunks(row_ids, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"UPDATE {self.table} SET {assignments} WHERE {self.id_field} IN ({placeholders})",
+                           (*values.values(), *chunk))
+            updated += cursor.rowcount
+        cursor.close()
+        return updated
+
+    def bulk_delete(self, connection, row_ids, chunk_size=BULK_CHUNK_SIZE):
+        cursor = connection.cursor()
+        deleted = 0
+        for chunk in chunks(row_ids, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {self.table} WHERE {self.id_field} IN ({placeholders})", tuple(chunk))
+            deleted += cursor.rowcount
+        cursor.close()
+        return deleted
+
+
+class RefugeeRepository(Repository):
+    dto = RefugiadoDTO
+    table = "refugiados"
+    alias = "r"
+    id_field = "id_refugiado"
+    name_column = "nombre"
+    select = REFUGEES_SELECT
+    natural_key = "identificacion"
+    fields = (
+        ("nombre", "nombre"),
+        ("identificacion", "identificacion"),
+        ("numero_de_contacto", "numero_de_contacto"),
+        ("email", "email"),
+        ("id_ciudad_despiazamiento", "id_ciudad_del_despiazamiento"),
+        ("motivo_despiazamiento", "motivo_despiazamiento"),
+        ("id_ciudad_refugio", "id_ciudad_a_refugiarse"),
+        ("id_albergue", "id_albergue"),
+    )
+
+    def search_condition(self, search):
+        # Una sola palabra con dígitos se busca como prefijo de identificación
+        # (índice B-tree); el resto, como palabras del nombre (índice FULLTEXT)
+        search = (search or "").strip()
+        if not search:
+            return "", ()
+
+        if " " not in search and any(char.isdigit() for char in search):
+            if self.dialect == "sqlite":
+                # LIKE no distingue mayúsculas en SQLite y no usaría el índice
+                return "r.identificacion >= %s AND r.identificacion < %s", (search, search + "\uffff")
+            return "r.identificacion LIKE %s", (like_prefix(search),)
+
+        if self.dialect == "sqlite":
+            # Sin FULLTEXT: cada palabra debe aparecer en el nombre
+            words = search.split()
+            return (" AND ".join(["r.nombre LIKE %s ESCAPE '\\'"] * len(words)),
+                    tuple("%" + like_prefix(word) for word in words))
+
+        words = re.sub(r'[+\-<>()~*"@]', " ", search).split()
+        words = [word for word in words if len(word) >= FULLTEXT_MIN_WORD]
+        if words:
+            return "MATCH(r.nombre) AGAINST (%s IN BOOLEAN MODE)", (" ".join(f"+{word}*" for word in words),)
+
+        # Palabras demasiado cortas para FULLTEXT: prefijo del nombre
+        return "r.nombre LIKE %s", (like_prefix(search),)
+
+
+class ShelterRepository(Repository):
+    dto = AlbergueDTO
+    table = "albergues"
+    alias = "a"
+    id_field = "id_albergue"
+    name_column = "nombre"
+    select = SHELTERS_SELECT
+    fields = (
+        ("nombre", "nombre"),
+        ("id_ciudad", "id_ciudad"),
+        ("direccion_del_albergue", "direccion_del_albergue"),
+        ("personas_albergadas", "personas_albergadas"),
+        ("ciudad_de_procedencia", "ciudad_de_procedencia"),
+        ("capacidad", "capacidad"),
+    )
+
+    def options(self, connection):
+        # (id, nombre, id_ciudad) de todos los albergues, para los combobox
+        cursor = connection.cursor()
+        cursor.execute("SELECT id_albergue, nombre, id_ciudad FROM albergues ORDER BY nombre")
+        shelters = cursor.fetchall()
+        cursor.close()
+        return shelters
+
+
+class CityRepository(Repository):
+    dto = CiudadDTO
+    table = "ciudades"
+    alias = "c"
+    id_field = "id_ciudad"
+    name_column = "ciudad"
+    select = CITIES_SELECT
+    fields = (
+        ("departamento", "departamento"),
+        ("ciudad", "ciudad"),
+        ("localidad", "localidad"),
+        ("cantidad_de_habitantes", "cantidad_de_habitantes"),
+    )
+
+    def options(self, connection):
+        # (id, ciudad, departamento) de todas las ciudades, para los combobox
+        cursor = connection.cursor()
+        cursor.execute("SELECT id_ciudad, ciudad, departamento FROM ciudades ORDER BY ciudad")
+        cities = cursor.fetchall()
+        cursor.close()
+        return cities
+
+
+class VolunteerRepository(Repository):
+    dto = VoluntarioDTO
+    table = "voluntarios"
+    alias = "v"
+    id_field = "id_voluntario"
+    name_column = "nombre"
+    select = VOLUNTEERS_SELECT
+    natural_key = "identificacion"
+    fields = (
+        ("nombre", "nombre"),
+        ("identificacion", "identificacion"),
+        ("id_ciudad", "id_ciudad"),
+        ("id_albergue", "id_albergue"),
+        ("profesion", "profesion"),
+    )
+
+
+class ReportRepository:
+    # Reportes y el procedimiento de estadísticas de albergues
+    def __init__(self, dialect="mysql"):
+        sqlite = dialect == "sqlite"
+        self.refugee_distribution_sql = REFUGEE_DISTRIBUTION_REPORT_SQLITE if sqlite else REFUGEE_DISTRIBUTION_REPORT
+        self.volunteers_by_city_sql = VOLUNTEERS_BY_CITY_REPORT_SQLITE if sqlite else VOLUNTEERS_BY_CITY_REPORT
+
+    def fetch_all(self, connection, sql):
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def refugee_distribution(self, connection):
+        return self.fetch_all(connection, self.refugee_distribution_sql)
+
+    def volunteers_by_city(self, connection):
+        return self.fetch_all(connection, self.volunteers_by_city_sql)
+
+    def update_shelter_stats(self, connection):
+        cursor = connection.cursor()
+        cursor.callproc("ActualizarEstadisticasAlbergues")
+        cursor.close()
+
+    def shelter_stats(self, connection):
+        cursor = connection.cursor()
+        cursor.execute(SHELTER_STATS_REPORT)
+        results = cursor.fetchall()
+        cursor.close()
+        return results
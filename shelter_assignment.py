@@ -0,0 +1,190 @@
+import heapq
+from dataclasses import dataclass, field
+
+from database import collation_key, dialect_of
+from repositories import BULK_CHUNK_SIZE, chunks
+
+# Albergues con capacidad definida y cuántos refugiados tienen hoy
+SHELTERS_SQL = """
+    SELECT a.id_albergue, a.nombre, a.id_ciudad, c.ciudad, c.departamento, a.capacidad,
+           COUNT(r.id_refugiado)
+    FROM albergues a
+    JOIN ciudades c ON c.id_ciudad = a.id_ciudad
+    LEFT JOIN refugiados r ON r.id_albergue = a.id_albergue
+    WHERE a.capacidad IS NOT NULL
+    GROUP BY a.id_albergue, a.nombre, a.id_ciudad, c.ciudad, c.departamento, a.capacidad
+"""
+
+# Refugiados sin albergue, en orden de llegada
+PENDING_SQL = """
+    SELECT r.id_refugiado, r.id_ciudad_a_refugiarse, c.ciudad, c.departamento
+    FROM refugiados r
+    JOIN ciudades c ON c.id_ciudad = r.id_ciudad_a_refugiarse
+    WHERE r.id_albergue IS NULL
+    ORDER BY r.id_refugiado
+"""
+
+
+class PlanOutdated(Exception):
+    # Otro cliente asignó refugiados o cambió capacidades después de la vista previa
+    pass
+
+
+@dataclass
+class AssignmentPlan:
+    # assignments: id_albergue -> ids de refugiados.
+    # shelters: id_albergue -> datos del albergue con lo asignado en el plan.
+    # unplaced: ciudad de refugio -> refugiados que no caben en su departamento.
+    pending: int = 0
+    assignments: dict = field(default_factory=dict)
+    shelters: dict = field(default_factory=dict)
+    unplaced: dict = field(default_factory=dict)
+
+    def placed(self):
+        return sum(len(refugee_ids) for refugee_ids in self.assignments.values())
+
+    def moved(self):
+        return sum(shelter["otra_ciudad"] for shelter in self.shelters.values())
+
+    def preview_rows(self):
+        # Una fila por albergue que recibe refugiados, para la vista previa
+        rows = []
+        for shelter in self.shelters.values():
+            if shelter["asignados"]:
+                rows.append((
+                    shelter["nombre"], shelter["ciudad"], shelter["capacidad"], shelter["ocupados"],
+                    shelter["asignados"], shelter["otra_ciudad"],
+                    shelter["capacidad"] - shelter["ocupados"] - shelter["asignados"],
+                ))
+        rows.sort(key=lambda row: (collation_key(row[1]), collation_key(row[0])))
+        return rows
+
+
+def build_heaps(shelters, free, group):
+    # Un montículo por grupo (ciudad o departamento) con (-cupo libre, id_albergue)
+    heaps = {}
+    for shelter_id, shelter in shelters.items():
+        if free[shelter_id] > 0:
+            heaps.setdefault(group(shelter), []).append((-free[shelter_id], shelter_id))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+    return heaps
+
+
+def take(heap, free):
+    # Albergue con más cupo libre del montículo, o None si ya no queda cupo. Cada
+    # albergue está en un solo montículo por fase, así que la cima siempre es exacta.
+    if not heap:
+        return None
+    negative_free, shelter_id = heap[0]
+    free[shelter_id] -= 1
+    if free[shelter_id]:
+        heapq.heapreplace(heap, (negative_free + 1, shelter_id))
+    else:
+        heapq.heappop(heap)
+    return shelter_id
+
+
+class ShelterAssignment:
+    # Ubica a los refugiados sin albergue en albergues de su ciudad de refugio sin
+    # pasar la capacidad. Primero cada ciudad llena sus albergues con su gente, y
+    # lo que sobra pasa a albergues de otras ciudades del mismo departamento (no
+    # hay coordenadas; el departamento es la noción de cercanía disponible). Cada
+    # refugiado va al albergue con más cupo libre, así la ocupación queda pareja.
+    # Como todos los sobrantes de un departamento pueden usar cualquier cupo que
+    # quede en él, este reparto voraz ubica a tantas personas como un flujo
+    # máximo: O(n log k) con n refugiados y k albergues.
+    def plan(self, connection):
+        cursor = connection.cursor()
+        cursor.execute(SHELTERS_SQL)
+        shelters = {}
+        for shelter_id, name, city_id, city, department, capacity, occupied in cursor.fetchall():
+            shelters[shelter_id] = {
+                "nombre": name, "id_ciudad": city_id, "ciudad": city,
+                "departamento": collation_key(department), "capacidad": capacity,
+                "ocupados": occupied, "asignados": 0, "otra_ciudad": 0,
+            }
+        cursor.execute(PENDING_SQL)
+        pending = cursor.fetchall()
+        cursor.close()
+
+        plan = AssignmentPlan(pending=len(pending), shelters=shelters)
+        free = {shelter_id: max(shelter["capacidad"] - shelter["ocupados"], 0)
+                for shelter_id, shelter in shelters.items()}
+
+        waiting = []
+        heaps = build_heaps(shelters, free, lambda shelter: shelter["id_ciudad"])
+        for refugee_id, city_id, city, department in pending:
+            shelter_id = take(heaps.get(city_id), free)
+            if shelter_id is None:
+                waiting.append((refugee_id, city, department))
+            else:
+                self.assign(plan, refugee_id, shelter_id, moved=False)
+
+        heaps = build_heaps(shelters, free, lambda shelter: shelter["departamento"])
+        for refugee_id, city, department in waiting:
+            shelter_id = take(heaps.get(collation_key(department)), free)
+            if shelter_id is None:
+                plan.unplaced[city] = plan.unplaced.get(city, 0) + 1
+            else:
+                self.assign(plan, refugee_id, shelter_id, moved=True)
+        return plan
+
+    def assign(self, plan, refugee_id, shelter_id, moved):
+        shelter = plan.shelters[shelter_id]
+        shelter["asignados"] += 1
+        if moved:
+            shelter["otra_ciudad"] += 1
+        plan.assignments.setdefault(shelter_id, []).append(refugee_id)
+
+    def apply(self, connection, plan, chunk_size=BULK_CHUNK_SIZE):
+        # Escribe el plan tal como se mostró, en la transacción de la conexión (no
+        # confirma). Solo cambia id_albergue: la ciudad de refugio registrada (la
+        # que agrupan los reportes) se mantiene aunque el albergue esté en otra
+        # ciudad. Si desde la vista previa alguien ocupó esos cupos o asignó a esos
+        # refugiados, lanza PlanOutdated.
+        shelter_ids = [shelter_id for shelter_id, shelter in plan.shelters.items() if shelter["asignados"]]
+        # En MySQL FOR UPDATE frena a otra asignación hasta el final; SQLite ya
+        # admite un solo escritor a la vez
+        lock = " FOR UPDATE" if dialect_of(connection) == "mysql" else ""
+        cursor = connection.cursor()
+        for chunk in chunks(shelter_ids, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT a.id_albergue, a.capacidad,
+                       (SELECT COUNT(*) FROM refugiados r WHERE r.id_albergue = a.id_albergue)
+                FROM albergues a WHERE a.id_albergue IN ({placeholders}){lock}
+            """, tuple(chunk))
+            rows = cursor.fetchall()
+            if len(rows) != len(chunk):
+                cursor.close()
+                raise PlanOutdated("se eliminó un albergue del plan")
+            for shelter_id, capacity, occupied in rows:
+                if capacity is None or occupied + plan.shelters[shelter_id]["asignados"] > capacity:
+                    cursor.close()
+                    raise PlanOutdated(f"el albergue {plan.shelters[shelter_id]['nombre']} ya no tiene ese cupo")
+
+        updated = 0
+        for shelter_id, refugee_ids in plan.assignments.items():
+            for chunk in chunks(refugee_ids, chunk_size):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"""
+                    UPDATE refugiados SET id_albergue = %s
+                    WHERE id_albergue IS NULL AND id_refugiado IN ({placeholders})
+                """, (shelter_id, *chunk))
+                updated += cursor.rowcount
+        if updated != plan.placed():
+            cursor.close()
+            raise PlanOutdated(f"{plan.placed() - updated} refugiados ya no están sin albergue")
+
+        # Ocupación de los albergues que recibieron gente
+        for chunk in chunks(shelter_ids, chunk_size):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                UPDATE albergues SET personas_albergadas = (
+                    SELECT COUNT(*) FROM refugiados r WHERE r.id_albergue = albergues.id_albergue
+                )
+                WHERE id_albergue IN ({placeholders})
+            """, tuple(chunk))
+        cursor.close()
+        return updated
@@ -0,0 +1,23 @@
+-- Asignación explícita de cada refugiado a un albergue.
+-- Antes el albergue se deducía de la ciudad de refugio (JOIN por id_ciudad), lo
+-- que repetía a cada refugiado una vez por cada albergue de esa ciudad.
+
+ALTER TABLE refugiados
+    ADD COLUMN id_albergue INT NULL,
+    ADD CONSTRAINT fk_refugiados_albergue
+        FOREIGN KEY (id_albergue) REFERENCES albergues (id_albergue)
+        ON DELETE SET NULL;
+
+-- Datos existentes: solo donde la ciudad de refugio tiene un único albergue, que
+-- es lo que ya mostraba el JOIN por ciudad. Con varios albergues no hay forma de
+-- saber en cuál está cada persona; quedan sin albergue (NULL) para asignarlos a
+-- mano o con la asignación por capacidad.
+UPDATE refugiados r
+JOIN (
+    SELECT id_ciudad, MIN(id_albergue) AS id_albergue
+    FROM albergues
+    GROUP BY id_ciudad
+    HAVING COUNT(*) = 1
+) a ON a.id_ciudad = r.id_ciudad_a_refugiarse
+SET r.id_albergue = a.id_albergue
+WHERE r.id_albergue IS NULL;
@@ -0,0 +1,6 @@
+-- Índices para la búsqueda de refugiados de la pestaña Refugiados:
+-- prefijo de identificación (B-tree) y palabras del nombre (FULLTEXT).
+
+CREATE INDEX idx_refugiados_identificacion ON refugiados (identificacion);
+
+CREATE FULLTEXT INDEX ft_refugiados_nombre ON refugiados (nombre);
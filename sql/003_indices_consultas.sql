@@ -0,0 +1,14 @@
+-- Índices para las columnas por las que la aplicación une, filtra y ordena.
+
+-- Llaves foráneas usadas en los JOIN de las tablas y los reportes
+CREATE INDEX idx_refugiados_ciudad_refugio ON refugiados (id_ciudad_a_refugiarse);
+CREATE INDEX idx_refugiados_ciudad_desplazamiento ON refugiados (id_ciudad_del_despiazamiento);
+CREATE INDEX idx_voluntarios_ciudad ON voluntarios (id_ciudad);
+CREATE INDEX idx_voluntarios_albergue ON voluntarios (id_albergue);
+CREATE INDEX idx_albergues_ciudad ON albergues (id_ciudad);
+
+-- Orden y paginación por keyset (nombre, id) de cada Treeview
+CREATE INDEX idx_refugiados_nombre ON refugiados (nombre, id_refugiado);
+CREATE INDEX idx_voluntarios_nombre ON voluntarios (nombre, id_voluntario);
+CREATE INDEX idx_albergues_nombre ON albergues (nombre, id_albergue);
+CREATE INDEX idx_ciudades_ciudad ON ciudades (ciudad, id_ciudad);
@@ -0,0 +1,51 @@
+-- Contador de versión por tabla. Cada escritura (de esta aplicación, de otro
+-- cliente o de un procedimiento almacenado) incrementa la versión de su tabla, y
+-- la caché de reportes la compara para saber si un resultado sigue vigente.
+
+CREATE TABLE IF NOT EXISTS versiones_tablas (
+    tabla VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO versiones_tablas (tabla)
+VALUES ('refugiados'), ('albergues'), ('ciudades'), ('voluntarios');
+
+DELIMITER $$
+
+CREATE TRIGGER trg_refugiados_version_ins AFTER INSERT ON refugiados FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados'$$
+
+CREATE TRIGGER trg_refugiados_version_upd AFTER UPDATE ON refugiados FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados'$$
+
+CREATE TRIGGER trg_refugiados_version_del AFTER DELETE ON refugiados FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados'$$
+
+CREATE TRIGGER trg_albergues_version_ins AFTER INSERT ON albergues FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues'$$
+
+CREATE TRIGGER trg_albergues_version_upd AFTER UPDATE ON albergues FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues'$$
+
+CREATE TRIGGER trg_albergues_version_del AFTER DELETE ON albergues FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues'$$
+
+CREATE TRIGGER trg_ciudades_version_ins AFTER INSERT ON ciudades FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades'$$
+
+CREATE TRIGGER trg_ciudades_version_upd AFTER UPDATE ON ciudades FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades'$$
+
+CREATE TRIGGER trg_ciudades_version_del AFTER DELETE ON ciudades FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades'$$
+
+CREATE TRIGGER trg_voluntarios_version_ins AFTER INSERT ON voluntarios FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios'$$
+
+CREATE TRIGGER trg_voluntarios_version_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios'$$
+
+CREATE TRIGGER trg_voluntarios_version_del AFTER DELETE ON voluntarios FOR EACH ROW
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios'$$
+
+DELIMITER ;
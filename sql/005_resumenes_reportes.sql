@@ -0,0 +1,109 @@
+-- Tablas resumen para los reportes de distribución. Los triggers las mantienen
+-- al día fila a fila, así los reportes leen O(#ciudades) filas en lugar de
+-- agrupar refugiados y voluntarios completos. "python summaries.py --verify"
+-- compara su contenido con las tablas base y "--rebuild" las recalcula.
+
+-- Refugiados por (ciudad de refugio, ciudad de origen)
+CREATE TABLE resumen_refugiados_origen (
+    id_ciudad_refugio INT NOT NULL,
+    id_ciudad_origen INT NOT NULL,
+    cantidad INT NOT NULL,
+    PRIMARY KEY (id_ciudad_refugio, id_ciudad_origen)
+);
+
+-- Voluntarios por (ciudad, profesión); '' representa profesión vacía
+CREATE TABLE resumen_voluntarios_profesion (
+    id_ciudad INT NOT NULL,
+    profesion VARCHAR(255) NOT NULL,
+    cantidad INT NOT NULL,
+    PRIMARY KEY (id_ciudad, profesion)
+);
+
+INSERT INTO resumen_refugiados_origen (id_ciudad_refugio, id_ciudad_origen, cantidad)
+SELECT id_ciudad_a_refugiarse, id_ciudad_del_despiazamiento, COUNT(*)
+FROM refugiados
+WHERE id_ciudad_a_refugiarse IS NOT NULL AND id_ciudad_del_despiazamiento IS NOT NULL
+GROUP BY id_ciudad_a_refugiarse, id_ciudad_del_despiazamiento;
+
+INSERT INTO resumen_voluntarios_profesion (id_ciudad, profesion, cantidad)
+SELECT id_ciudad, IFNULL(profesion, ''), COUNT(*)
+FROM voluntarios
+WHERE id_ciudad IS NOT NULL
+GROUP BY id_ciudad, IFNULL(profesion, '');
+
+DELIMITER $$
+
+CREATE TRIGGER trg_refugiados_resumen_ins AFTER INSERT ON refugiados FOR EACH ROW
+BEGIN
+    IF NEW.id_ciudad_a_refugiarse IS NOT NULL AND NEW.id_ciudad_del_despiazamiento IS NOT NULL THEN
+        INSERT INTO resumen_refugiados_origen (id_ciudad_refugio, id_ciudad_origen, cantidad)
+        VALUES (NEW.id_ciudad_a_refugiarse, NEW.id_ciudad_del_despiazamiento, 1)
+        ON DUPLICATE KEY UPDATE cantidad = cantidad + 1;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_refugiados_resumen_del AFTER DELETE ON refugiados FOR EACH ROW
+BEGIN
+    UPDATE resumen_refugiados_origen SET cantidad = cantidad - 1
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento;
+    DELETE FROM resumen_refugiados_origen
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento
+      AND cantidad <= 0;
+END$$
+
+CREATE TRIGGER trg_refugiados_resumen_upd AFTER UPDATE ON refugiados FOR EACH ROW
+BEGIN
+    IF NOT (NEW.id_ciudad_a_refugiarse <=> OLD.id_ciudad_a_refugiarse)
+       OR NOT (NEW.id_ciudad_del_despiazamiento <=> OLD.id_ciudad_del_despiazamiento) THEN
+        UPDATE resumen_refugiados_origen SET cantidad = cantidad - 1
+        WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+          AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento;
+        DELETE FROM resumen_refugiados_origen
+        WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+          AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento
+          AND cantidad <= 0;
+
+        IF NEW.id_ciudad_a_refugiarse IS NOT NULL AND NEW.id_ciudad_del_despiazamiento IS NOT NULL THEN
+            INSERT INTO resumen_refugiados_origen (id_ciudad_refugio, id_ciudad_origen, cantidad)
+            VALUES (NEW.id_ciudad_a_refugiarse, NEW.id_ciudad_del_despiazamiento, 1)
+            ON DUPLICATE KEY UPDATE cantidad = cantidad + 1;
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_ins AFTER INSERT ON voluntarios FOR EACH ROW
+BEGIN
+    IF NEW.id_ciudad IS NOT NULL THEN
+        INSERT INTO resumen_voluntarios_profesion (id_ciudad, profesion, cantidad)
+        VALUES (NEW.id_ciudad, IFNULL(NEW.profesion, ''), 1)
+        ON DUPLICATE KEY UPDATE cantidad = cantidad + 1;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_del AFTER DELETE ON voluntarios FOR EACH ROW
+BEGIN
+    UPDATE resumen_voluntarios_profesion SET cantidad = cantidad - 1
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '');
+    DELETE FROM resumen_voluntarios_profesion
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '') AND cantidad <= 0;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+BEGIN
+    IF NOT (NEW.id_ciudad <=> OLD.id_ciudad) OR NOT (NEW.profesion <=> OLD.profesion) THEN
+        UPDATE resumen_voluntarios_profesion SET cantidad = cantidad - 1
+        WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '');
+        DELETE FROM resumen_voluntarios_profesion
+        WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '') AND cantidad <= 0;
+
+        IF NEW.id_ciudad IS NOT NULL THEN
+            INSERT INTO resumen_voluntarios_profesion (id_ciudad, profesion, cantidad)
+            VALUES (NEW.id_ciudad, IFNULL(NEW.profesion, ''), 1)
+            ON DUPLICATE KEY UPDATE cantidad = cantidad + 1;
+        END IF;
+    END IF;
+END$$
+
+DELIMITER ;
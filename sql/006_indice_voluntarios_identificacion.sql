@@ -0,0 +1,4 @@
+-- Búsqueda de voluntarios por identificación: la usa el reenvío de las
+-- escrituras pendientes para no insertar dos veces a la misma persona.
+
+CREATE INDEX idx_voluntarios_identificacion ON voluntarios (identificacion);
@@ -0,0 +1,52 @@
+-- Registro de cambios para que cada cliente vea las escrituras de los demás.
+-- Cada inserción, modificación o borrado en las cuatro tablas agrega una fila
+-- (tabla, id de la fila, operación I/U/D); los clientes leen periódicamente las
+-- filas con id mayor al último que vieron y actualizan solo esas filas.
+
+CREATE TABLE IF NOT EXISTS registro_cambios (
+    id_cambio BIGINT AUTO_INCREMENT PRIMARY KEY,
+    tabla VARCHAR(64) NOT NULL,
+    id_fila INT NOT NULL,
+    operacion CHAR(1) NOT NULL,
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+DELIMITER $$
+
+CREATE TRIGGER trg_refugiados_cambios_ins AFTER INSERT ON refugiados FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', NEW.id_refugiado, 'I')$$
+
+CREATE TRIGGER trg_refugiados_cambios_upd AFTER UPDATE ON refugiados FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', NEW.id_refugiado, 'U')$$
+
+CREATE TRIGGER trg_refugiados_cambios_del AFTER DELETE ON refugiados FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', OLD.id_refugiado, 'D')$$
+
+CREATE TRIGGER trg_albergues_cambios_ins AFTER INSERT ON albergues FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', NEW.id_albergue, 'I')$$
+
+CREATE TRIGGER trg_albergues_cambios_upd AFTER UPDATE ON albergues FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', NEW.id_albergue, 'U')$$
+
+CREATE TRIGGER trg_albergues_cambios_del AFTER DELETE ON albergues FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', OLD.id_albergue, 'D')$$
+
+CREATE TRIGGER trg_ciudades_cambios_ins AFTER INSERT ON ciudades FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', NEW.id_ciudad, 'I')$$
+
+CREATE TRIGGER trg_ciudades_cambios_upd AFTER UPDATE ON ciudades FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', NEW.id_ciudad, 'U')$$
+
+CREATE TRIGGER trg_ciudades_cambios_del AFTER DELETE ON ciudades FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', OLD.id_ciudad, 'D')$$
+
+CREATE TRIGGER trg_voluntarios_cambios_ins AFTER INSERT ON voluntarios FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', NEW.id_voluntario, 'I')$$
+
+CREATE TRIGGER trg_voluntarios_cambios_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', NEW.id_voluntario, 'U')$$
+
+CREATE TRIGGER trg_voluntarios_cambios_del AFTER DELETE ON voluntarios FOR EACH ROW
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', OLD.id_voluntario, 'D')$$
+
+DELIMITER ;
@@ -0,0 +1,9 @@
+-- Capacidad de cada albergue, para la asignación automática de refugiados.
+-- personas_albergadas es la ocupación (la recalcula ActualizarEstadisticasAlbergues),
+-- pero el formulario guardaba ahí la capacidad: ese valor es el mejor dato que
+-- hay para llenar la columna nueva. Un albergue sin capacidad (NULL) no recibe
+-- asignaciones automáticas.
+
+ALTER TABLE albergues ADD COLUMN capacidad INT NULL;
+
+UPDATE albergues SET capacidad = personas_albergadas WHERE personas_albergadas > 0;
@@ -0,0 +1,41 @@
+-- Detección de refugiados registrados dos veces (duplicates.py).
+-- identificacion_normalizada: la identificación sin puntos, guiones, comas,
+-- barras ni espacios, en mayúsculas, para buscar con índice "1.023.456" igual
+-- que "1023456". Es una columna generada, así la mantiene el servidor en toda
+-- escritura.
+-- claves_refugiados: claves de bloqueo fonéticas del nombre (las calcula la
+-- aplicación); solo se comparan registros que comparten una clave.
+-- candidatos_duplicados: cola de pares por revisar. Un par marcado como
+-- 'distintos' no se vuelve a proponer.
+
+ALTER TABLE refugiados
+    ADD COLUMN identificacion_normalizada VARCHAR(255) AS (
+        UPPER(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(identificacion, '.', ''), '-', ''), ' ', ''), ',', ''), '/', ''))
+    ) STORED;
+
+CREATE INDEX idx_refugiados_identificacion_normalizada ON refugiados (identificacion_normalizada);
+
+CREATE TABLE IF NOT EXISTS claves_refugiados (
+    clave VARCHAR(64) NOT NULL,
+    id_refugiado INT NOT NULL,
+    PRIMARY KEY (clave, id_refugiado),
+    INDEX idx_claves_refugiados_refugiado (id_refugiado),
+    CONSTRAINT fk_claves_refugiados_refugiado
+        FOREIGN KEY (id_refugiado) REFERENCES refugiados (id_refugiado) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS candidatos_duplicados (
+    id_candidato INT AUTO_INCREMENT PRIMARY KEY,
+    id_refugiado_a INT NOT NULL,
+    id_refugiado_b INT NOT NULL,
+    motivo VARCHAR(64) NOT NULL,
+    puntaje DECIMAL(4, 3) NOT NULL,
+    estado VARCHAR(16) NOT NULL DEFAULT 'pendiente',
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_candidatos_duplicados_par (id_refugiado_a, id_refugiado_b),
+    INDEX idx_candidatos_duplicados_estado (estado, puntaje),
+    CONSTRAINT fk_candidatos_duplicados_a
+        FOREIGN KEY (id_refugiado_a) REFERENCES refugiados (id_refugiado) ON DELETE CASCADE,
+    CONSTRAINT fk_candidatos_duplicados_b
+        FOREIGN KEY (id_refugiado_b) REFERENCES refugiados (id_refugiado) ON DELETE CASCADE
+);
@@ -0,0 +1,59 @@
+-- Las vistas de refugiados, voluntarios y albergues muestran nombres de ciudades
+-- y albergues (JOIN). Al renombrar o borrar una ciudad o un albergue cambian esas
+-- filas, pero su tabla no se escribe (o la escribe una acción de llave foránea
+-- como ON DELETE SET NULL, que en MySQL no dispara triggers), así que los demás
+-- clientes las seguían mostrando con el nombre viejo. Estos triggers registran
+-- también las filas dependientes como modificadas. Solo un cambio de nombre las
+-- registra: la ocupación de los albergues se recalcula a menudo y no se muestra
+-- en esas vistas.
+
+DELIMITER $$
+
+CREATE TRIGGER trg_ciudades_dependientes_upd AFTER UPDATE ON ciudades FOR EACH ROW
+BEGIN
+    IF NOT (CAST(NEW.ciudad AS BINARY) <=> CAST(OLD.ciudad AS BINARY)
+            AND CAST(NEW.departamento AS BINARY) <=> CAST(OLD.departamento AS BINARY)) THEN
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_del_despiazamiento = NEW.id_ciudad;
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_a_refugiarse = NEW.id_ciudad;
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'albergues', id_albergue, 'U' FROM albergues WHERE id_ciudad = NEW.id_ciudad;
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_ciudad = NEW.id_ciudad;
+    END IF;
+END$$
+
+-- Antes de borrar, mientras las filas dependientes todavía apuntan al padre. Si
+-- una llave foránea impide el borrado, estas filas se deshacen con la sentencia.
+CREATE TRIGGER trg_ciudades_dependientes_del BEFORE DELETE ON ciudades FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_del_despiazamiento = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_a_refugiarse = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'albergues', id_albergue, 'U' FROM albergues WHERE id_ciudad = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_ciudad = OLD.id_ciudad;
+END$$
+
+CREATE TRIGGER trg_albergues_dependientes_upd AFTER UPDATE ON albergues FOR EACH ROW
+BEGIN
+    IF NOT (CAST(NEW.nombre AS BINARY) <=> CAST(OLD.nombre AS BINARY)) THEN
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_albergue = NEW.id_albergue;
+        INSERT INTO registro_cambios (tabla, id_fila, operacion)
+            SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_albergue = NEW.id_albergue;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_albergues_dependientes_del BEFORE DELETE ON albergues FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_albergue = OLD.id_albergue;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_albergue = OLD.id_albergue;
+END$$
+
+DELIMITER ;
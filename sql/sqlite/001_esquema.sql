@@ -0,0 +1,211 @@
+-- Esquema completo para el motor SQLite local (backend = sqlite en config.ini).
+-- Reúne en un solo script las tablas base y lo que en MySQL agregan las
+-- migraciones 001 a 005: albergue del refugiado, índices, versiones de tabla y
+-- tablas resumen de los reportes. Los nombres de persona y ciudad usan NOCASE
+-- para ordenar y comparar sin distinguir mayúsculas, como la intercalación de MySQL.
+
+CREATE TABLE ciudades (
+    id_ciudad INTEGER PRIMARY KEY AUTOINCREMENT,
+    departamento TEXT NOT NULL COLLATE NOCASE,
+    ciudad TEXT NOT NULL COLLATE NOCASE,
+    localidad TEXT,
+    cantidad_de_habitantes INTEGER
+);
+
+CREATE TABLE albergues (
+    id_albergue INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL COLLATE NOCASE,
+    id_ciudad INTEGER NOT NULL REFERENCES ciudades (id_ciudad),
+    direccion_del_albergue TEXT,
+    personas_albergadas INTEGER NOT NULL DEFAULT 0,
+    ciudad_de_procedencia TEXT
+);
+
+CREATE TABLE refugiados (
+    id_refugiado INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL COLLATE NOCASE,
+    identificacion TEXT NOT NULL,
+    numero_de_contacto TEXT,
+    email TEXT,
+    id_ciudad_del_despiazamiento INTEGER REFERENCES ciudades (id_ciudad),
+    motivo_despiazamiento TEXT,
+    id_ciudad_a_refugiarse INTEGER REFERENCES ciudades (id_ciudad),
+    id_albergue INTEGER REFERENCES albergues (id_albergue) ON DELETE SET NULL
+);
+
+CREATE TABLE voluntarios (
+    id_voluntario INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL COLLATE NOCASE,
+    identificacion TEXT NOT NULL,
+    id_ciudad INTEGER REFERENCES ciudades (id_ciudad),
+    id_albergue INTEGER REFERENCES albergues (id_albergue) ON DELETE SET NULL,
+    profesion TEXT COLLATE NOCASE
+);
+
+-- Búsqueda y llaves foráneas (002, 003)
+CREATE INDEX idx_refugiados_identificacion ON refugiados (identificacion);
+CREATE INDEX idx_refugiados_ciudad_refugio ON refugiados (id_ciudad_a_refugiarse);
+CREATE INDEX idx_refugiados_ciudad_desplazamiento ON refugiados (id_ciudad_del_despiazamiento);
+CREATE INDEX idx_refugiados_albergue ON refugiados (id_albergue);
+CREATE INDEX idx_voluntarios_ciudad ON voluntarios (id_ciudad);
+CREATE INDEX idx_voluntarios_albergue ON voluntarios (id_albergue);
+CREATE INDEX idx_albergues_ciudad ON albergues (id_ciudad);
+
+-- Orden y paginación por keyset (nombre, id) de cada Treeview
+CREATE INDEX idx_refugiados_nombre ON refugiados (nombre, id_refugiado);
+CREATE INDEX idx_voluntarios_nombre ON voluntarios (nombre, id_voluntario);
+CREATE INDEX idx_albergues_nombre ON albergues (nombre, id_albergue);
+CREATE INDEX idx_ciudades_ciudad ON ciudades (ciudad, id_ciudad);
+
+-- Versiones de tabla para la caché de reportes (004)
+CREATE TABLE versiones_tablas (
+    tabla TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO versiones_tablas (tabla)
+VALUES ('refugiados'), ('albergues'), ('ciudades'), ('voluntarios');
+
+-- Tablas resumen de los reportes (005)
+CREATE TABLE resumen_refugiados_origen (
+    id_ciudad_refugio INTEGER NOT NULL,
+    id_ciudad_origen INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (id_ciudad_refugio, id_ciudad_origen)
+);
+
+CREATE TABLE resumen_voluntarios_profesion (
+    id_ciudad INTEGER NOT NULL,
+    profesion TEXT NOT NULL COLLATE NOCASE,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (id_ciudad, profesion)
+);
+
+DELIMITER $$
+
+CREATE TRIGGER trg_refugiados_version_ins AFTER INSERT ON refugiados FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados';
+END$$
+
+CREATE TRIGGER trg_refugiados_version_upd AFTER UPDATE ON refugiados FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados';
+END$$
+
+CREATE TRIGGER trg_refugiados_version_del AFTER DELETE ON refugiados FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'refugiados';
+END$$
+
+CREATE TRIGGER trg_albergues_version_ins AFTER INSERT ON albergues FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues';
+END$$
+
+CREATE TRIGGER trg_albergues_version_upd AFTER UPDATE ON albergues FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues';
+END$$
+
+CREATE TRIGGER trg_albergues_version_del AFTER DELETE ON albergues FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'albergues';
+END$$
+
+CREATE TRIGGER trg_ciudades_version_ins AFTER INSERT ON ciudades FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades';
+END$$
+
+CREATE TRIGGER trg_ciudades_version_upd AFTER UPDATE ON ciudades FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades';
+END$$
+
+CREATE TRIGGER trg_ciudades_version_del AFTER DELETE ON ciudades FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'ciudades';
+END$$
+
+CREATE TRIGGER trg_voluntarios_version_ins AFTER INSERT ON voluntarios FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios';
+END$$
+
+CREATE TRIGGER trg_voluntarios_version_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios';
+END$$
+
+CREATE TRIGGER trg_voluntarios_version_del AFTER DELETE ON voluntarios FOR EACH ROW
+BEGIN
+    UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'voluntarios';
+END$$
+
+CREATE TRIGGER trg_refugiados_resumen_ins AFTER INSERT ON refugiados FOR EACH ROW
+WHEN NEW.id_ciudad_a_refugiarse IS NOT NULL AND NEW.id_ciudad_del_despiazamiento IS NOT NULL
+BEGIN
+    INSERT INTO resumen_refugiados_origen (id_ciudad_refugio, id_ciudad_origen, cantidad)
+    VALUES (NEW.id_ciudad_a_refugiarse, NEW.id_ciudad_del_despiazamiento, 1)
+    ON CONFLICT (id_ciudad_refugio, id_ciudad_origen) DO UPDATE SET cantidad = cantidad + 1;
+END$$
+
+CREATE TRIGGER trg_refugiados_resumen_del AFTER DELETE ON refugiados FOR EACH ROW
+BEGIN
+    UPDATE resumen_refugiados_origen SET cantidad = cantidad - 1
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento;
+    DELETE FROM resumen_refugiados_origen
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento
+      AND cantidad <= 0;
+END$$
+
+CREATE TRIGGER trg_refugiados_resumen_upd AFTER UPDATE ON refugiados FOR EACH ROW
+WHEN NEW.id_ciudad_a_refugiarse IS NOT OLD.id_ciudad_a_refugiarse
+  OR NEW.id_ciudad_del_despiazamiento IS NOT OLD.id_ciudad_del_despiazamiento
+BEGIN
+    UPDATE resumen_refugiados_origen SET cantidad = cantidad - 1
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento;
+    DELETE FROM resumen_refugiados_origen
+    WHERE id_ciudad_refugio = OLD.id_ciudad_a_refugiarse
+      AND id_ciudad_origen = OLD.id_ciudad_del_despiazamiento
+      AND cantidad <= 0;
+    INSERT INTO resumen_refugiados_origen (id_ciudad_refugio, id_ciudad_origen, cantidad)
+    SELECT NEW.id_ciudad_a_refugiarse, NEW.id_ciudad_del_despiazamiento, 1
+    WHERE NEW.id_ciudad_a_refugiarse IS NOT NULL AND NEW.id_ciudad_del_despiazamiento IS NOT NULL
+    ON CONFLICT (id_ciudad_refugio, id_ciudad_origen) DO UPDATE SET cantidad = cantidad + 1;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_ins AFTER INSERT ON voluntarios FOR EACH ROW
+WHEN NEW.id_ciudad IS NOT NULL
+BEGIN
+    INSERT INTO resumen_voluntarios_profesion (id_ciudad, profesion, cantidad)
+    VALUES (NEW.id_ciudad, IFNULL(NEW.profesion, ''), 1)
+    ON CONFLICT (id_ciudad, profesion) DO UPDATE SET cantidad = cantidad + 1;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_del AFTER DELETE ON voluntarios FOR EACH ROW
+BEGIN
+    UPDATE resumen_voluntarios_profesion SET cantidad = cantidad - 1
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '');
+    DELETE FROM resumen_voluntarios_profesion
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '') AND cantidad <= 0;
+END$$
+
+CREATE TRIGGER trg_voluntarios_resumen_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+WHEN NEW.id_ciudad IS NOT OLD.id_ciudad OR NEW.profesion IS NOT OLD.profesion
+BEGIN
+    UPDATE resumen_voluntarios_profesion SET cantidad = cantidad - 1
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '');
+    DELETE FROM resumen_voluntarios_profesion
+    WHERE id_ciudad = OLD.id_ciudad AND profesion = IFNULL(OLD.profesion, '') AND cantidad <= 0;
+    INSERT INTO resumen_voluntarios_profesion (id_ciudad, profesion, cantidad)
+    SELECT NEW.id_ciudad, IFNULL(NEW.profesion, ''), 1
+    WHERE NEW.id_ciudad IS NOT NULL
+    ON CONFLICT (id_ciudad, profesion) DO UPDATE SET cantidad = cantidad + 1;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,3 @@
+-- Igual que sql/006_indice_voluntarios_identificacion.sql
+
+CREATE INDEX idx_voluntarios_identificacion ON voluntarios (identificacion);
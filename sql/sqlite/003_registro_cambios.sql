@@ -0,0 +1,73 @@
+-- Igual que sql/007_registro_cambios.sql
+
+CREATE TABLE registro_cambios (
+    id_cambio INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,
+    id_fila INTEGER NOT NULL,
+    operacion TEXT NOT NULL,
+    fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+DELIMITER $$
+
+CREATE TRIGGER trg_refugiados_cambios_ins AFTER INSERT ON refugiados FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', NEW.id_refugiado, 'I');
+END$$
+
+CREATE TRIGGER trg_refugiados_cambios_upd AFTER UPDATE ON refugiados FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', NEW.id_refugiado, 'U');
+END$$
+
+CREATE TRIGGER trg_refugiados_cambios_del AFTER DELETE ON refugiados FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('refugiados', OLD.id_refugiado, 'D');
+END$$
+
+CREATE TRIGGER trg_albergues_cambios_ins AFTER INSERT ON albergues FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', NEW.id_albergue, 'I');
+END$$
+
+CREATE TRIGGER trg_albergues_cambios_upd AFTER UPDATE ON albergues FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', NEW.id_albergue, 'U');
+END$$
+
+CREATE TRIGGER trg_albergues_cambios_del AFTER DELETE ON albergues FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('albergues', OLD.id_albergue, 'D');
+END$$
+
+CREATE TRIGGER trg_ciudades_cambios_ins AFTER INSERT ON ciudades FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', NEW.id_ciudad, 'I');
+END$$
+
+CREATE TRIGGER trg_ciudades_cambios_upd AFTER UPDATE ON ciudades FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', NEW.id_ciudad, 'U');
+END$$
+
+CREATE TRIGGER trg_ciudades_cambios_del AFTER DELETE ON ciudades FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('ciudades', OLD.id_ciudad, 'D');
+END$$
+
+CREATE TRIGGER trg_voluntarios_cambios_ins AFTER INSERT ON voluntarios FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', NEW.id_voluntario, 'I');
+END$$
+
+CREATE TRIGGER trg_voluntarios_cambios_upd AFTER UPDATE ON voluntarios FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', NEW.id_voluntario, 'U');
+END$$
+
+CREATE TRIGGER trg_voluntarios_cambios_del AFTER DELETE ON voluntarios FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion) VALUES ('voluntarios', OLD.id_voluntario, 'D');
+END$$
+
+DELIMITER ;
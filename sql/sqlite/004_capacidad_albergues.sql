@@ -0,0 +1,5 @@
+-- Igual que sql/008_capacidad_albergues.sql
+
+ALTER TABLE albergues ADD COLUMN capacidad INTEGER;
+
+UPDATE albergues SET capacidad = personas_albergadas WHERE personas_albergadas > 0;
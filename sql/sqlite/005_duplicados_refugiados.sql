@@ -0,0 +1,29 @@
+-- Igual que sql/009_duplicados_refugiados.sql. SQLite solo permite agregar
+-- columnas generadas VIRTUAL; el índice guarda el valor igual.
+
+ALTER TABLE refugiados ADD COLUMN identificacion_normalizada TEXT GENERATED ALWAYS AS (
+    UPPER(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(identificacion, '.', ''), '-', ''), ' ', ''), ',', ''), '/', ''))
+) VIRTUAL;
+
+CREATE INDEX idx_refugiados_identificacion_normalizada ON refugiados (identificacion_normalizada);
+
+CREATE TABLE IF NOT EXISTS claves_refugiados (
+    clave TEXT NOT NULL,
+    id_refugiado INTEGER NOT NULL REFERENCES refugiados (id_refugiado) ON DELETE CASCADE,
+    PRIMARY KEY (clave, id_refugiado)
+);
+
+CREATE INDEX idx_claves_refugiados_refugiado ON claves_refugiados (id_refugiado);
+
+CREATE TABLE IF NOT EXISTS candidatos_duplicados (
+    id_candidato INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_refugiado_a INTEGER NOT NULL REFERENCES refugiados (id_refugiado) ON DELETE CASCADE,
+    id_refugiado_b INTEGER NOT NULL REFERENCES refugiados (id_refugiado) ON DELETE CASCADE,
+    motivo TEXT NOT NULL,
+    puntaje REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (id_refugiado_a, id_refugiado_b)
+);
+
+CREATE INDEX idx_candidatos_duplicados_estado ON candidatos_duplicados (estado, puntaje);
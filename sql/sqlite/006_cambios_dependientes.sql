@@ -0,0 +1,48 @@
+-- Igual que sql/010_cambios_dependientes.sql. SQLite no tiene IF dentro de un
+-- trigger: la condición va en WHEN.
+
+DELIMITER $$
+
+CREATE TRIGGER trg_ciudades_dependientes_upd AFTER UPDATE ON ciudades FOR EACH ROW
+WHEN NEW.ciudad IS NOT OLD.ciudad COLLATE BINARY OR NEW.departamento IS NOT OLD.departamento COLLATE BINARY
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_del_despiazamiento = NEW.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_a_refugiarse = NEW.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'albergues', id_albergue, 'U' FROM albergues WHERE id_ciudad = NEW.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_ciudad = NEW.id_ciudad;
+END$$
+
+CREATE TRIGGER trg_ciudades_dependientes_del BEFORE DELETE ON ciudades FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_del_despiazamiento = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_ciudad_a_refugiarse = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'albergues', id_albergue, 'U' FROM albergues WHERE id_ciudad = OLD.id_ciudad;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_ciudad = OLD.id_ciudad;
+END$$
+
+CREATE TRIGGER trg_albergues_dependientes_upd AFTER UPDATE ON albergues FOR EACH ROW
+WHEN NEW.nombre IS NOT OLD.nombre COLLATE BINARY
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_albergue = NEW.id_albergue;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_albergue = NEW.id_albergue;
+END$$
+
+CREATE TRIGGER trg_albergues_dependientes_del BEFORE DELETE ON albergues FOR EACH ROW
+BEGIN
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'refugiados', id_refugiado, 'U' FROM refugiados WHERE id_albergue = OLD.id_albergue;
+    INSERT INTO registro_cambios (tabla, id_fila, operacion)
+        SELECT 'voluntarios', id_voluntario, 'U' FROM voluntarios WHERE id_albergue = OLD.id_albergue;
+END$$
+
+DELIMITER ;
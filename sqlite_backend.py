@@ -0,0 +1,152 @@
+import sqlite3
+
+from mysql.connector import errors
+
+# Mismo código que usa MySQL para una sentencia interrumpida (KILL QUERY), así
+# DedicatedCall trata igual la cancelación en los dos motores
+QUERY_INTERRUPTED = 1317
+
+# Procedimientos almacenados de MySQL reescritos como sentencias SQLite.
+# ActualizarEstadisticasAlbergues: personas alojadas en cada albergue y la
+# ciudad de origen más frecuente entre ellas.
+PROCEDURES = {
+    "ActualizarEstadisticasAlbergues": [
+        """
+        UPDATE albergues SET personas_albergadas = (
+            SELECT COUNT(*) FROM refugiados r WHERE r.id_albergue = albergues.id_albergue
+        )
+        """,
+        """
+        UPDATE albergues SET ciudad_de_procedencia = COALESCE((
+            SELECT c.ciudad
+            FROM refugiados r
+            JOIN ciudades c ON c.id_ciudad = r.id_ciudad_del_despiazamiento
+            WHERE r.id_albergue = albergues.id_albergue
+            GROUP BY c.id_ciudad
+            ORDER BY COUNT(*) DESC, c.ciudad
+            LIMIT 1
+        ), '')
+        """,
+    ],
+}
+
+
+def translate_error(error):
+    # Las capas superiores capturan los errores de mysql.connector
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=message)
+    if message == "interrupted":
+        return errors.DatabaseError(msg="Query execution was interrupted", errno=QUERY_INTERRUPTED)
+    if isinstance(error, sqlite3.OperationalError):
+        return errors.OperationalError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+class SQLiteCursor:
+    # Cursor de sqlite3 con la interfaz que usa la aplicación de mysql.connector:
+    # parámetros %s, filas como diccionario, column_names, with_rows y callproc
+    def __init__(self, connection, dictionary=False):
+        self.cursor = connection.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        try:
+            self.cursor.execute(sql.replace("%s", "?"), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise translate_error(e) from e
+
+    def executemany(self, sql, seq_params):
+        try:
+            self.cursor.executemany(sql.replace("%s", "?"), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise translate_error(e) from e
+
+    def callproc(self, name, args=()):
+        for statement in PROCEDURES[name]:
+            self.execute(statement, args)
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self.cursor.description or ())
+
+    @property
+    def with_rows(self):
+        return self.cursor.description is not None
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def convert(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self.convert(self.cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self.convert(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self.convert(row) for row in self.cursor.fetchall()]
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    # Conexión a la base local con la interfaz de MySQLConnection que usan el pool,
+    # los repositorios y el worker. WAL permite leer mientras otro hilo escribe.
+    connection_id = None
+    dialect = "sqlite"
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.connect()
+
+    def connect(self):
+        self.raw = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        self.raw.execute("PRAGMA journal_mode = WAL")
+        self.raw.execute("PRAGMA synchronous = NORMAL")
+        self.raw.execute("PRAGMA foreign_keys = ON")
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None):
+        # sqlite3 ya guarda en caché las sentencias compiladas de cada conexión
+        return SQLiteCursor(self.raw, dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect=False):
+        pass
+
+    def reconnect(self, attempts=1):
+        self.close()
+        self.connect()
+
+    def interrupt(self):
+        # Equivalente local de KILL QUERY; puede llamarse desde otro hilo
+        self.raw.interrupt()
+
+    def get_server_info(self):
+        return f"SQLite {sqlite3.sqlite_version}"
+
+    def close(self):
+        self.raw.close()
@@ -0,0 +1,105 @@
+import argparse
+import configparser
+import sys
+
+from database import collation_key, create_pool
+
+# Para cada tabla resumen: columnas clave y el agregado equivalente calculado
+# sobre la tabla base (el mismo que usa la migración 005 para llenarla)
+SUMMARIES = {
+    "resumen_refugiados_origen": (
+        ("id_ciudad_refugio", "id_ciudad_origen"),
+        """
+            SELECT id_ciudad_a_refugiarse, id_ciudad_del_despiazamiento, COUNT(*)
+            FROM refugiados
+            WHERE id_ciudad_a_refugiarse IS NOT NULL AND id_ciudad_del_despiazamiento IS NOT NULL
+            GROUP BY id_ciudad_a_refugiarse, id_ciudad_del_despiazamiento
+        """,
+    ),
+    "resumen_voluntarios_profesion": (
+        ("id_ciudad", "profesion"),
+        """
+            SELECT id_ciudad, IFNULL(profesion, ''), COUNT(*)
+            FROM voluntarios
+            WHERE id_ciudad IS NOT NULL
+            GROUP BY id_ciudad, IFNULL(profesion, '')
+        """,
+    ),
+}
+
+
+def summary_key(row):
+    # La clave de agrupación sigue la intercalación de MySQL: "Médico" y "medico"
+    # caen en la misma fila del resumen
+    return tuple(collation_key(value) if isinstance(value, str) else value for value in row[:-1])
+
+
+class SummaryMaintenance:
+    # Recalcula o verifica las tablas resumen que mantienen los triggers de la
+    # migración 005. Verificar compara cada clave del resumen con el agregado de
+    # la tabla base; reconstruir las vacía y las vuelve a llenar en una sola
+    # transacción (el INSERT ... SELECT bloquea las filas leídas, así que las
+    # escrituras concurrentes esperan y sus triggers se aplican después).
+    def __init__(self, connection):
+        self.connection = connection
+
+    def verify(self):
+        # Devuelve (tabla, clave, cantidad_en_resumen, cantidad_real) por cada diferencia
+        differences = []
+        cursor = self.connection.cursor()
+        for table, (key_columns, aggregate_sql) in SUMMARIES.items():
+            cursor.execute(aggregate_sql)
+            expected = {summary_key(row): row[-1] for row in cursor.fetchall()}
+
+            cursor.execute(f"SELECT {', '.join(key_columns)}, cantidad FROM {table}")
+            actual = {summary_key(row): row[-1] for row in cursor.fetchall()}
+
+            for key in sorted(expected.keys() | actual.keys(), key=str):
+                if expected.get(key, 0) != actual.get(key, 0):
+                    differences.append((table, key, actual.get(key, 0), expected.get(key, 0)))
+        cursor.close()
+        self.connection.rollback()
+        return differences
+
+    def rebuild(self):
+        cursor = self.connection.cursor()
+        try:
+            for table, (key_columns, aggregate_sql) in SUMMARIES.items():
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(f"INSERT INTO {table} ({', '.join(key_columns)}, cantidad) {aggregate_sql}")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de las tablas resumen de los reportes")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--rebuild", action="store_true", help="recalcular las tablas resumen desde las tablas base")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    pool = create_pool(config["mysql"])
+
+    with pool.connection() as connection:
+        maintenance = SummaryMaintenance(connection)
+        if args.rebuild:
+            maintenance.rebuild()
+            print("Tablas resumen reconstruidas")
+
+        differences = maintenance.verify()
+        for table, key, actual, expected in differences:
+            print(f"{table} {key}: resumen={actual}, real={expected}")
+        if differences:
+            print(f"{len(differences)} diferencias; ejecute con --rebuild para corregirlas")
+            return 1
+        print("Las tablas resumen coinciden con las tablas base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
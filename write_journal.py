@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+
+from mysql.connector import DataError, IntegrityError, InterfaceError, OperationalError, errorcode
+
+# Errores del cliente que indican que el servidor no responde, no que el dato sea inválido
+CONNECTIVITY_ERRORS = {
+    errorcode.CR_CONNECTION_ERROR, errorcode.CR_CONN_HOST_ERROR, errorcode.CR_UNKNOWN_HOST,
+    errorcode.CR_SERVER_GONE_ERROR, errorcode.CR_SERVER_LOST, errorcode.CR_SERVER_LOST_EXTENDED,
+}
+
+
+def is_connectivity_error(error):
+    return isinstance(error, (InterfaceError, OperationalError)) and error.errno in CONNECTIVITY_ERRORS
+
+
+class WriteJournal:
+    # Altas que no llegaron al servidor por falta de conexión, guardadas en un
+    # archivo JSON Lines (una por línea, con fsync) para reenviarlas cuando vuelva.
+    # El reenvío va por lotes, cada uno en una transacción, y la llave natural del
+    # repositorio (identificación) hace de llave de idempotencia: si la fila ya
+    # existe, por ejemplo porque un lote se confirmó pero se cortó antes de
+    # borrarse del diario, no se inserta de nuevo. Las filas que el servidor
+    # rechaza (llave foránea, dato inválido) pasan a <diario>.rechazadas.
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.rejected_path = path + ".rechazadas"
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.replaying = threading.Lock()
+        self.pending = len(self._read())
+
+    def append(self, table, dto):
+        entry = {"tabla": table, "fecha": time.strftime("%Y-%m-%d %H:%M:%S"), "datos": asdict(dto)}
+        with self.lock:
+            self._write_lines(self.path, "a", [entry])
+            self.pending += 1
+
+    def entries(self):
+        with self.lock:
+            return self._read()
+
+    def replay(self, connection, repositories, duplicate_detector=None):
+        # repositories: tabla -> repositorio. Devuelve (insertadas, ya_existentes,
+        # rechazadas en este reenvío), o None si otro hilo ya está reenviando el diario.
+        # Con duplicate_detector, cada refugiado reenviado se indexa y sus posibles
+        # duplicados pasan a la cola de revisión en la transacción del lote.
+        if not self.replaying.acquire(blocking=False):
+            return None
+        try:
+            inserted = skipped = rejected_total = 0
+            rejected = []
+            while True:
+                batch = self.entries()[:self.batch_size]
+                if not batch:
+                    break
+                for entry in batch:
+                    repository = repositories[entry["tabla"]]
+                    dto = repository.dto(**entry["datos"])
+                    if repository.find_by_natural_key(connection, getattr(dto, repository.natural_key)):
+                        skipped += 1
+                        continue
+                    try:
+                        new_id = repository.insert(connection, dto)
+                    except (IntegrityError, DataError) as e:
+                        # Solo se deshace esa sentencia; el resto del lote sigue
+                        rejected.append(dict(entry, error=str(e)))
+                        continue
+                    inserted += 1
+                    if duplicate_detector and entry["tabla"] == "refugiados":
+                        duplicate_detector.check_inserted(connection, new_id, dto.nombre, dto.identificacion)
+                connection.commit()
+                self._discard(len(batch), rejected)
+                rejected_total += len(rejected)
+                rejected = []
+            return inserted, skipped, rejected_total
+        finally:
+            self.replaying.release()
+
+    def _discard(self, count, rejected):
+        # Quita las primeras count entradas (las nuevas siempre se agregan al final)
+        with self.lock:
+            if rejected:
+                self._write_lines(self.rejected_path, "a", rejected)
+            remaining = self._read()[count:]
+            temporary = self.path + ".tmp"
+            self._write_lines(temporary, "w", remaining)
+            os.replace(temporary, self.path)
+            self.pending = len(remaining)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as journal:
+                lines = journal.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Línea incompleta por un corte mientras se escribía
+                continue
+        return entries
+
+    def _write_lines(self, path, mode, entries):
+        with open(path, mode, encoding="utf-8") as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())